@@ -47,6 +47,12 @@
 extern void macputs(char *);
 #endif
 
+#ifdef NEW_STYLE
+extern int load_image(char *fName, int w, char *msg); /* image.c */
+#else
+extern int load_image();
+#endif
+
 #define concat(a, b)                                                           \
   (strlen(a) + strlen(b) < MAXALLCHAR ? pstrcat((a), (b)) : NULL)
 
@@ -160,6 +166,7 @@ typedef struct ref_st {
   line_st *sline;
   uShrt value, visit;
   RType reftype;
+  int predef; /* 1 + enum predef of a predefined constant, else 0 */
   struct ref_st *nextref;
 } ref_st;
 
@@ -267,7 +274,7 @@ static ref_st *lookup(char *);
 static grp_st *addsym(char *, grp_st *);
 static src_st *addlinesrc(char *, uShrt);
 static void newtbl(void);
-static void addpredef(char *, U32_T);
+static void addpredef(char *, U32_T, int);
 static void addpredefs(void);
 static void addline(char *, src_st *, uShrt);
 static void show_info(uShrt), show_lbl(void);
@@ -305,8 +312,11 @@ char *symn;
 
   for (curtbl = reftbl; curtbl; curtbl = curtbl->nextref)
     for (symtable = curtbl->grpsym; symtable; symtable = symtable->nextsym)
-      if (!strcmp(symtable->symn, symn))
+      if (!strcmp(symtable->symn, symn)) {
+        if (curtbl->predef) /* the warrior depends on this setting */
+          predefUsed |= (U32_T)1 << (curtbl->predef - 1);
         return curtbl;
+      }
 
   return NULL;
 }
@@ -319,6 +329,7 @@ static void newtbl() {
     curtbl->grpsym = NULL;
     curtbl->sline = NULL;
     curtbl->visit = FALSE; /* needed to detect recursive reference */
+    curtbl->predef = 0;
     curtbl->nextref = reftbl;
     reftbl = curtbl;
   } else
@@ -346,8 +357,9 @@ grp_st *curgroup;
 
 /* ******************************************************************* */
 
-static void addpredef(symn, value) char *symn;
+static void addpredef(symn, value, which) char *symn;
 U32_T value;
+int which;
 {
   grp_st *lsymtbl = NULL;
   line_st *aline;
@@ -357,6 +369,7 @@ U32_T value;
   newtbl();
   reftbl->grpsym = lsymtbl;
   reftbl->reftype = RTEXT;
+  reftbl->predef = which + 1;
   if (((aline = (line_st *)MALLOC(sizeof(line_st))) != NULL) &&
       ((aline->vline = pstrdup(token)) != NULL)) {
     aline->nextline = NULL;
@@ -369,20 +382,20 @@ U32_T value;
 
 static void addpredefs() {
   /* predefined constants */
-  addpredef("CORESIZE", (U32_T)coreSize);
-  addpredef("MAXPROCESSES", (U32_T)taskNum);
-  addpredef("MAXCYCLES", (U32_T)cycles);
-  addpredef("MAXLENGTH", (U32_T)instrLim);
-  addpredef("MINDISTANCE", (U32_T)separation);
-  addpredef("VERSION", (U32_T)PMARSVER);
-  addpredef("WARRIORS", (U32_T)warriors);
-  addpredef("ROUNDS", (U32_T)rounds);
+  addpredef("CORESIZE", (U32_T)coreSize, PD_CORESIZE);
+  addpredef("MAXPROCESSES", (U32_T)taskNum, PD_MAXPROCESSES);
+  addpredef("MAXCYCLES", (U32_T)cycles, PD_MAXCYCLES);
+  addpredef("MAXLENGTH", (U32_T)instrLim, PD_MAXLENGTH);
+  addpredef("MINDISTANCE", (U32_T)separation, PD_MINDISTANCE);
+  addpredef("VERSION", (U32_T)PMARSVER, PD_VERSION);
+  addpredef("WARRIORS", (U32_T)warriors, PD_WARRIORS);
+  addpredef("ROUNDS", (U32_T)rounds, PD_ROUNDS);
 #ifdef RWLIMIT
-  addpredef("READLIMIT", (U32_T)readLimit);
-  addpredef("WRITELIMIT", (U32_T)writeLimit);
+  addpredef("READLIMIT", (U32_T)readLimit, PD_READLIMIT);
+  addpredef("WRITELIMIT", (U32_T)writeLimit, PD_WRITELIMIT);
 #endif
 #ifdef PSPACE
-  addpredef("PSPACESIZE", (U32_T)pSpaceSize);
+  addpredef("PSPACESIZE", (U32_T)pSpaceSize, PD_PSPACESIZE);
 #endif
 }
 
@@ -2086,6 +2099,7 @@ int aWarrior;
   errnum = warnum = 0;
 
   pass = 0;
+  predefUsed = 0;
 
   srctbl = NULL;
   sline[0] = sline[1] = NULL;
@@ -2140,6 +2154,19 @@ int aWarrior;
 
   addpredefs();
 
+  /* a load image written by -I needs no assembly */
+  if (*fName)
+    switch (load_image(fName, curWarrior, outs)) {
+    case -1:
+      errprn(MISC, (line_st *)NULL, outs);
+      errorcode = PARSEERR;
+      reset_regs();
+      return (errorcode);
+    case 1:
+      reset_regs();
+      return (errorcode);
+    }
+
 #ifdef ASM_DEBUG
   printf("Entering file reading module\n");
 #endif
@@ -39,6 +39,7 @@
  *******************************************************************/
 
 #include "global.h"
+#include "visualizer.h"
 #include <ctype.h>
 #include <string.h>
 
@@ -72,7 +73,8 @@ extern char *credits_screen1, *credits_screen2, *credits_screen3, *usage_screen,
     *fFExclusive, *coreSizeTooSmall, *dLessThanl, *FLessThand, *outOfMemory,
     *badScoreFormula, *optPSpaceSize, *pSpaceTooBig, *optPermutate,
     *permutateMultiWarrior, *optAssemble, *optEnergy, *optEnergyAmount,
-    *optRecord;
+    *optRecord, *optRecordVersion, *optRecordFrameCycles, *optRecordWindow,
+    *badRecordTarget, *badRecordWindow, *optJobs, *optImage;
 
 #ifdef RWLIMIT
 extern char *optReadLimit, *optWriteLimit, *badRWLimit;
@@ -459,7 +461,7 @@ char **largv;
    ********************************************************************/
 
 #define OPTNUM                                                                 \
-  25 /* don't forget to increase when adding new                               \
+  31 /* don't forget to increase when adding new                               \
       * options */
   static clp_opt_t options[OPTNUM];
   int optI = 0; /* used by record() macro */
@@ -498,6 +500,8 @@ char **largv;
   record('W', clp_addr, &writeLimit, 1, MAXCORESIZE, 0, optReadLimit);
 #endif
   record('A', clp_bool, &SWITCH_A, 0, 1, 0, optAssemble);
+  record('j', clp_int, &SWITCH_j, 1, MAXJOBS, 1, optJobs);
+  record('I', clp_bool, &SWITCH_I, 0, 1, 0, optImage);
   record('E', clp_bool, &SWITCH_E, 0, 1, 1, optEnergy);
   record('N', clp_long, &defaultEnergy, 1, 2147483647L, DEFAULT_ENERGY,
          optEnergyAmount);
@@ -517,7 +521,11 @@ char **largv;
   record('D', clp_bool, &SWITCH_D, 0, 1, 0, optDIAOutput);
 #endif
   record('g', clp_bool, &SWITCH_g, 0, 1, 0, "Enable graphics display (ncurses)");
-  record('T', clp_str, &SWITCH_R, 0, 0, 0, "record simulation to file");
+  record('T', clp_str, &SWITCH_R, 0, 0, 0, "record simulation to file[:event,...]");
+  record('Y', clp_int, &SWITCH_Y, VIZ_VERSION_FLAT, VIZ_VERSION_FRAMES,
+         VIZ_VERSION_FLAT, optRecordVersion);
+  record('K', clp_long, &SWITCH_K, 1, MAXCYCLE, 1, optRecordFrameCycles);
+  record('Z', clp_str, &SWITCH_Z, 0, 0, 0, optRecordWindow);
   record((char)0, (clp_dtype_t)0, NULL, 0, 0, 0, NULL);
   /*******************************************************************/
   /* initializing default values                                     */
@@ -628,6 +636,16 @@ char **largv;
         result = CLP_NOGOOD;
       }
 #endif
+      if (SWITCH_R && !viz_parse_target(SWITCH_R)) {
+        print_usage(options);
+        errout(badRecordTarget);
+        result = CLP_NOGOOD;
+      }
+      if (SWITCH_Z && !viz_parse_window(SWITCH_Z)) {
+        print_usage(options);
+        errout(badRecordWindow);
+        result = CLP_NOGOOD;
+      }
       /* further checks of the values */
 
 #ifndef OS2PMGRAPHX /* jk - we can load files after the fact... */
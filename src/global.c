@@ -30,6 +30,7 @@
 int errorcode = SUCCESS;
 int errorlevel = WARNING;
 char errmsg[MAXALLCHAR];
+U32_T predefUsed;
 
 /* Some parameters */
 int warriors;
@@ -66,9 +67,14 @@ int SWITCH_D;
 int SWITCH_P;
 #endif
 int SWITCH_A;
+int SWITCH_j; /* worker processes sharing the rounds */
+int SWITCH_I; /* write load images of the warriors */
 
 /* Visualization recording global variables */
 char *SWITCH_R = NULL; /* visualization recording filename */
+int SWITCH_Y;          /* visualization recording format version */
+char *SWITCH_Z = NULL; /* visualization recording cycle window */
+long SWITCH_K;         /* visualization cycles per aggregated frame */
 
 /* Visualization switches */
 int SWITCH_viz = 0;          /* enable visualization output */
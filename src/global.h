@@ -210,6 +210,7 @@ extern PMARS_FATAL, PMARS_BADCOMLIN, PMARS_PARSEERR;
 #define MAXWARRIOR 1000 /* Maximum number of warriors allowed */
 #define MAXTASKNUM INT_MAX
 #define MAXROUND INT_MAX
+#define MAXJOBS 256 /* Maximum number of -j worker processes */
 #define MAXCYCLE LONG_MAX
 #define MAXINSTR 1000
 
@@ -217,6 +218,23 @@ extern PMARS_FATAL, PMARS_BADCOMLIN, PMARS_PARSEERR;
 
 #define MAXALLCHAR 8000
 
+/* Predefined constants of the assembler, numbered by their bit in
+   predefUsed */
+enum predef {
+  PD_CORESIZE,
+  PD_MAXPROCESSES,
+  PD_MAXCYCLES,
+  PD_MAXLENGTH,
+  PD_MINDISTANCE,
+  PD_VERSION,
+  PD_WARRIORS,
+  PD_ROUNDS,
+  PD_READLIMIT,
+  PD_WRITELIMIT,
+  PD_PSPACESIZE,
+  PREDEFS
+};
+
 /* The following holds the order in which opcodes, modifiers, and addr_modes
    are represented as in parser. The enumerated field should start from zero */
 enum addr_mode {
@@ -369,6 +387,7 @@ typedef struct warrior_struct {
 extern int errorcode;
 extern int errorlevel;
 extern char errmsg[MAXALLCHAR];
+extern U32_T predefUsed; /* predefined constants the last warrior uses */
 
 /* Some parameters */
 extern int warriors;
@@ -408,9 +427,14 @@ extern int SWITCH_D;
 extern int SWITCH_P;
 #endif
 extern int SWITCH_A;
+extern int SWITCH_j; /* worker processes sharing the rounds */
+extern int SWITCH_I; /* write load images of the warriors */
 
 /* Visualization recording global variables */
 extern char *SWITCH_R; /* visualization recording filename */
+extern int SWITCH_Y;   /* visualization recording format version */
+extern char *SWITCH_Z; /* visualization recording cycle window */
+extern long SWITCH_K;  /* visualization cycles per aggregated frame */
 
 extern int inCdb;
 extern int debugState;
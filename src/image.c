@@ -0,0 +1,340 @@
+/* pMARS -- a portable Memory Array Redcode Simulator
+ * Copyright (C) 1993-1996 Albert Ma, Na'ndor Sieben, Stefan Strack and
+ * Mintardjo Wangsawidjaja
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+ */
+
+/*
+ * image.c: load images of assembled warriors. pmars -I writes one for
+ * every warrior it assembles (dwarf.red -> dwarf.rci); assemble() loads
+ * any warrior file that is an image instead of parsing it.
+ *
+ * An image holds what assembly produced: the instructions, start offset,
+ * PIN, name, author, version and date. It also records the predefined
+ * constants (CORESIZE, ROUNDS, ...) and which of them the source used;
+ * it is only loaded while those have the same values. CORESIZE always
+ * counts, as it is the modulus of every field. Layout, in the byte order
+ * of the host like .viz recordings:
+ *
+ *   char  magic[8]                  "pMARSimg"
+ *   U32_T version, build, used      IMAGE_VERSION, IMAGE_BUILD, predefUsed
+ *   U32_T key[PREDEFS]              predefined constants, see image_key()
+ *   U32_T instLen, offset, pinned, pin
+ *   U32_T length[4]                 of name, author, version and date
+ *   the four strings, without terminating NULs
+ *   instLen * (S32_T A_value, B_value; FIELD_T opcode, A_mode, B_mode,
+ *              debuginfo)
+ */
+
+#include <stdio.h>
+#include <string.h>
+#include "global.h"
+
+#define IMAGE_MAGIC "pMARSimg"
+#define IMAGE_MAGIC_LEN 8
+#define IMAGE_VERSION 1
+#define IMAGE_SUFFIX ".rci"
+#define IMAGE_STRINGS 4
+
+/* Instruction sets and limits this pMARS was built with */
+#ifdef EXT94
+#define IMAGE_EXT94 1
+#else
+#define IMAGE_EXT94 0
+#endif
+#ifdef PSPACE
+#define IMAGE_PSPACE 2
+#else
+#define IMAGE_PSPACE 0
+#endif
+#ifdef RWLIMIT
+#define IMAGE_RWLIMIT 4
+#else
+#define IMAGE_RWLIMIT 0
+#endif
+#define IMAGE_BUILD (IMAGE_EXT94 | IMAGE_PSPACE | IMAGE_RWLIMIT)
+
+/* Fields as assemble() produces them: opcode << 3 | modifier, the
+ * addressing modes (with NEW_MODES also the A-field indirect ones) and
+ * the debug flag */
+#define IMAGE_OPCODE(x) (((x) >> 3) <= ZAP && ((x) & 7) <= mI)
+#ifdef NEW_MODES
+#define IMAGE_MODE(x)                                                          \
+  ((x) <= POSTINC ||                                                           \
+   (INDIR_A(x) && RAW_MODE(x) >= INDIRECT && RAW_MODE(x) <= POSTINC))
+#else
+#define IMAGE_MODE(x) ((x) <= POSTINC)
+#endif
+
+#ifdef NEW_STYLE
+int load_image(char *fName, int w, char *msg);
+int save_image(int w);
+#else
+int load_image();
+int save_image();
+#endif
+
+extern char *imageDamaged, *imageIncompatible, *imageMismatch,
+    *cantWriteImage;
+
+static char *keyName[PREDEFS] = { /* by enum predef */
+    "CORESIZE", "MAXPROCESSES", "MAXCYCLES", "MAXLENGTH",
+    "MINDISTANCE", "VERSION", "WARRIORS", "ROUNDS",
+    "READLIMIT", "WRITELIMIT", "PSPACESIZE"};
+
+/* The predefined constants as addpredefs() (asm.c) sets them; 0 for those
+ * not compiled in */
+#ifdef NEW_STYLE
+static void image_key(U32_T *key)
+#else
+static void image_key(key)
+U32_T *key;
+#endif
+{
+  key[PD_CORESIZE] = (U32_T)coreSize;
+  key[PD_MAXPROCESSES] = (U32_T)taskNum;
+  key[PD_MAXCYCLES] = (U32_T)cycles;
+  key[PD_MAXLENGTH] = (U32_T)instrLim;
+  key[PD_MINDISTANCE] = (U32_T)separation;
+  key[PD_VERSION] = (U32_T)PMARSVER;
+  key[PD_WARRIORS] = (U32_T)warriors;
+  key[PD_ROUNDS] = (U32_T)rounds;
+#ifdef RWLIMIT
+  key[PD_READLIMIT] = (U32_T)readLimit;
+  key[PD_WRITELIMIT] = (U32_T)writeLimit;
+#else
+  key[PD_READLIMIT] = key[PD_WRITELIMIT] = 0;
+#endif
+#ifdef PSPACE
+  key[PD_PSPACESIZE] = (U32_T)pSpaceSize;
+#else
+  key[PD_PSPACESIZE] = 0;
+#endif
+}
+
+/* Read a string of len characters into a new buffer; NULL at end of file
+ * or without memory */
+#ifdef NEW_STYLE
+static char *read_string(FILE *fp, U32_T len)
+#else
+static char *read_string(fp, len)
+FILE *fp;
+U32_T len;
+#endif
+{
+  char *s;
+
+  if (len >= MAXALLCHAR || (s = (char *)MALLOC(len + 1)) == NULL)
+    return NULL;
+  if (fread(s, 1, (size_t)len, fp) != (size_t)len) {
+    FREE(s);
+    return NULL;
+  }
+  s[len] = '\0';
+  return s;
+}
+
+/* Load warrior w from fName if it is an image. Returns 0 if it is not one
+ * (assemble it), 1 if loaded, or -1 with the reason in msg. */
+#ifdef NEW_STYLE
+int load_image(char *fName, int w, char *msg)
+#else
+int load_image(fName, w, msg)
+char *fName;
+int w;
+char *msg;
+#endif
+{
+  FILE *fp;
+  char magic[IMAGE_MAGIC_LEN];
+  U32_T head[3], key[PREDEFS], want[PREDEFS], info[4];
+  U32_T length[IMAGE_STRINGS];
+  char *str[IMAGE_STRINGS];
+  S32_T value[2];
+  FIELD_T field[4];
+  mem_struct *bank = NULL;
+  int i;
+
+  if ((fp = fopen(fName, "rb")) == NULL)
+    return 0;
+  if (fread(magic, 1, IMAGE_MAGIC_LEN, fp) != IMAGE_MAGIC_LEN ||
+      memcmp(magic, IMAGE_MAGIC, IMAGE_MAGIC_LEN)) {
+    fclose(fp);
+    return 0;
+  }
+
+  if (fread(head, sizeof(U32_T), 3, fp) != 3 ||
+      fread(key, sizeof(U32_T), PREDEFS, fp) != PREDEFS ||
+      fread(info, sizeof(U32_T), 4, fp) != 4 ||
+      fread(length, sizeof(U32_T), IMAGE_STRINGS, fp) != IMAGE_STRINGS) {
+    fclose(fp);
+    sprintf(msg, imageDamaged, fName);
+    return -1;
+  }
+  if (head[0] != IMAGE_VERSION || head[1] != IMAGE_BUILD) {
+    fclose(fp);
+    sprintf(msg, imageIncompatible, fName);
+    return -1;
+  }
+  image_key(want);
+  head[2] |= (U32_T)1 << PD_CORESIZE;
+  if (info[0] > (U32_T)instrLim) /* too long now */
+    head[2] |= (U32_T)1 << PD_MAXLENGTH;
+  for (i = 0; i < PREDEFS; i++)
+    if ((head[2] >> i & 1) && key[i] != want[i]) {
+      fclose(fp);
+      sprintf(msg, imageMismatch, fName, keyName[i], (unsigned long)key[i],
+              (unsigned long)want[i]);
+      return -1;
+    }
+  if (info[1] >= (U32_T)coreSize) {
+    fclose(fp);
+    sprintf(msg, imageDamaged, fName);
+    return -1;
+  }
+
+  for (i = 0; i < IMAGE_STRINGS; i++)
+    str[i] = NULL;
+  for (i = 0; i < IMAGE_STRINGS; i++)
+    if ((str[i] = read_string(fp, length[i])) == NULL)
+      goto damaged;
+  if (info[0] &&
+      (bank = (mem_struct *)MALLOC(sizeof(mem_struct) * info[0])) == NULL)
+    goto damaged;
+  for (i = 0; i < (int)info[0]; i++) {
+    if (fread(value, sizeof(S32_T), 2, fp) != 2 ||
+        fread(field, sizeof(FIELD_T), 4, fp) != 4 || value[0] < 0 ||
+        value[0] >= coreSize || value[1] < 0 || value[1] >= coreSize ||
+        !IMAGE_OPCODE(field[0]) || !IMAGE_MODE(field[1]) ||
+        !IMAGE_MODE(field[2]) || field[3] > TRUE)
+      goto damaged;
+    bank[i].A_value = (ADDR_T)value[0];
+    bank[i].B_value = (ADDR_T)value[1];
+    bank[i].opcode = field[0];
+    bank[i].A_mode = field[1];
+    bank[i].B_mode = field[2];
+    bank[i].debuginfo = field[3];
+  }
+  fclose(fp);
+
+  FREE(warrior[w].name);
+  FREE(warrior[w].authorName);
+  FREE(warrior[w].version);
+  FREE(warrior[w].date);
+  FREE(warrior[w].instBank);
+  warrior[w].name = str[0];
+  warrior[w].authorName = str[1];
+  warrior[w].version = str[2];
+  warrior[w].date = str[3];
+  warrior[w].instBank = bank;
+  warrior[w].instLen = (int)info[0];
+  warrior[w].offset = (int)info[1];
+#ifdef PSPACE
+  if (info[2]) {
+    warrior[w].pSpaceIDNumber = (long)(S32_T)info[3];
+    warrior[w].pSpaceIndex = PIN_APPEARED;
+  }
+#endif
+  return 1;
+
+damaged:
+  fclose(fp);
+  for (i = 0; i < IMAGE_STRINGS; i++)
+    if (str[i])
+      FREE(str[i]);
+  if (bank)
+    FREE(bank);
+  sprintf(msg, imageDamaged, fName);
+  return -1;
+}
+
+/* pmars -I: write the image of assembled warrior w next to its source.
+ * Returns SUCCESS, or FNOFOUND if the image cannot be written. */
+#ifdef NEW_STYLE
+int save_image(int w)
+#else
+int save_image(w)
+int w;
+#endif
+{
+  FILE *fp;
+  char iName[MAXALLCHAR], *ext, *str[IMAGE_STRINGS];
+  U32_T head[3], key[PREDEFS], info[4], length[IMAGE_STRINGS];
+  S32_T value[2];
+  FIELD_T field[4];
+  mem_struct *inst;
+  int i, ok;
+
+  /* nothing to do for standard input or a warrior loaded from its image */
+  if (!warrior[w].fileName || !*warrior[w].fileName ||
+      strlen(warrior[w].fileName) + sizeof(IMAGE_SUFFIX) > MAXALLCHAR)
+    return SUCCESS;
+  strcpy(iName, warrior[w].fileName);
+  if ((ext = strrchr(iName, '.')) != NULL &&
+      (strchr(ext, '/') || strchr(ext, '\\')))
+    ext = NULL; /* the dot is in a directory name */
+  strcpy(ext ? ext : iName + strlen(iName), IMAGE_SUFFIX);
+  if (!strcmp(iName, warrior[w].fileName))
+    return SUCCESS;
+
+  str[0] = warrior[w].name;
+  str[1] = warrior[w].authorName;
+  str[2] = warrior[w].version;
+  str[3] = warrior[w].date;
+  for (i = 0; i < IMAGE_STRINGS; i++)
+    length[i] = str[i] ? (U32_T)strlen(str[i]) : 0;
+  head[0] = IMAGE_VERSION;
+  head[1] = IMAGE_BUILD;
+  head[2] = predefUsed;
+  image_key(key);
+  info[0] = (U32_T)warrior[w].instLen;
+  info[1] = (U32_T)warrior[w].offset;
+#ifdef PSPACE
+  info[2] = warrior[w].pSpaceIndex == PIN_APPEARED;
+  info[3] = info[2] ? (U32_T)warrior[w].pSpaceIDNumber : 0;
+#else
+  info[2] = info[3] = 0;
+#endif
+
+  if ((fp = fopen(iName, "wb")) == NULL) {
+    fprintf(stderr, cantWriteImage, iName);
+    return FNOFOUND;
+  }
+  ok = fwrite(IMAGE_MAGIC, 1, IMAGE_MAGIC_LEN, fp) == IMAGE_MAGIC_LEN &&
+       fwrite(head, sizeof(U32_T), 3, fp) == 3 &&
+       fwrite(key, sizeof(U32_T), PREDEFS, fp) == PREDEFS &&
+       fwrite(info, sizeof(U32_T), 4, fp) == 4 &&
+       fwrite(length, sizeof(U32_T), IMAGE_STRINGS, fp) == IMAGE_STRINGS;
+  for (i = 0; ok && i < IMAGE_STRINGS; i++)
+    ok = fwrite(str[i], 1, (size_t)length[i], fp) == (size_t)length[i];
+  for (i = 0, inst = warrior[w].instBank; ok && i < warrior[w].instLen;
+       i++, inst++) {
+    value[0] = (S32_T)inst->A_value;
+    value[1] = (S32_T)inst->B_value;
+    field[0] = inst->opcode;
+    field[1] = inst->A_mode;
+    field[2] = inst->B_mode;
+    field[3] = inst->debuginfo;
+    ok = fwrite(value, sizeof(S32_T), 2, fp) == 2 &&
+         fwrite(field, sizeof(FIELD_T), 4, fp) == 4;
+  }
+  if (fclose(fp) || !ok) {
+    remove(iName);
+    fprintf(stderr, cantWriteImage, iName);
+    return FNOFOUND;
+  }
+  return SUCCESS;
+}
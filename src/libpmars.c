@@ -0,0 +1,154 @@
+/* pMARS -- a portable Memory Array Redcode Simulator
+ * Copyright (C) 1993-1996 Albert Ma, Na'ndor Sieben, Stefan Strack and
+ * Mintardjo Wangsawidjaja
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+ */
+
+/*
+ * libpmars.c: pMARS as a shared library ("make lib"), for playing matches
+ * inside another process, e.g. from Python with visualizer/pmars_sim.py
+ *
+ *   pmars_run(argc, argv)    parse a pMARS command line, assemble the
+ *                            warriors and play all rounds; returns 0 or the
+ *                            pMARS error code
+ *   pmars_warriors()         number of warriors of the last run
+ *   pmars_name(w)            name of warrior w
+ *   pmars_score(w)           score of warrior w by the -= formula
+ *   pmars_results(out)       warriors * (2 * warriors - 1) counts: for each
+ *                            warrior the rounds it survived with 1 ..
+ *                            warriors survivors, then its deaths by order
+ *   pmars_recording(size)    the -T recording of the last run, a complete
+ *                            .viz file held in memory
+ *   pmars_release()          free everything the last run allocated
+ *
+ * The simulator keeps its state in globals, so runs must not overlap.
+ * Fatal errors that would end the pmars program (Exit) end the run instead,
+ * as for pmars --serve (serve.c).
+ */
+
+#include "global.h"
+#include "visualizer.h"
+
+#ifdef NEW_STYLE
+extern void match_reset(void);
+extern int play_match(int argc, char **argv);
+int pmars_run(int argc, char **argv);
+int pmars_warriors(void);
+char *pmars_name(int w);
+int pmars_score(int w);
+void pmars_results(int *out);
+char *pmars_recording(long *size);
+void pmars_release(void);
+#else
+extern void match_reset();
+extern int play_match();
+int pmars_run();
+int pmars_warriors();
+char *pmars_name();
+int pmars_score();
+void pmars_results();
+char *pmars_recording();
+void pmars_release();
+#endif
+
+/* Forget the recording of the previous run */
+#ifdef NEW_STYLE
+static void lib_free_recording(void)
+#else
+static void lib_free_recording()
+#endif
+{
+  free(viz_memory);
+  viz_memory = NULL;
+  viz_memory_size = 0;
+}
+
+#ifdef NEW_STYLE
+int pmars_run(int argc, char **argv)
+#else
+int pmars_run(argc, argv)
+int argc;
+char **argv;
+#endif
+{
+  lib_free_recording();
+  return play_match(argc, argv); /* serve.c */
+}
+
+#ifdef NEW_STYLE
+int pmars_warriors(void)
+#else
+int pmars_warriors()
+#endif
+{
+  return warriors;
+}
+
+#ifdef NEW_STYLE
+char *pmars_name(int w)
+#else
+char *pmars_name(w)
+int w;
+#endif
+{
+  return w >= 0 && w < warriors && warrior[w].name ? warrior[w].name : "";
+}
+
+#ifdef NEW_STYLE
+int pmars_score(int w)
+#else
+int pmars_score(w)
+int w;
+#endif
+{
+  set_reg('W', (long)warriors); /* 'W' used in score calculation */
+  return score(w);
+}
+
+#ifdef NEW_STYLE
+void pmars_results(int *out)
+#else
+void pmars_results(out)
+int *out;
+#endif
+{
+  int w, i;
+
+  for (w = 0; w < warriors; w++)
+    for (i = 0; i < 2 * warriors - 1; i++)
+      *out++ = warrior[w].score[i];
+}
+
+#ifdef NEW_STYLE
+char *pmars_recording(long *size)
+#else
+char *pmars_recording(size)
+long *size;
+#endif
+{
+  *size = (long)viz_memory_size;
+  return viz_memory;
+}
+
+#ifdef NEW_STYLE
+void pmars_release(void)
+#else
+void pmars_release()
+#endif
+{
+  match_reset();
+  lib_free_recording();
+}
@@ -23,6 +23,7 @@
  */
 
 #include <stdio.h>
+#include <string.h>
 #if defined(unix) || defined(VMS)
 #include <signal.h>
 #else
@@ -67,6 +68,7 @@ void _cdecl sighandler(int);
 #ifdef NEW_STYLE
 void init(void);
 extern void results(FILE *outp);
+void load_warriors(void);
 void body(void);
 void Exit(int);
 int returninfo(void);
@@ -82,6 +84,7 @@ extern void end_curses(void);
 #else
 void init();
 extern void results();
+void load_warriors();
 void body();
 void Exit();
 int returninfo();
@@ -96,6 +99,17 @@ extern void end_curses();
 #endif
 #endif
 
+#ifdef NEW_STYLE
+extern void match_exit(int code); /* serve.c: end the current match */
+extern int serve(char *target);
+extern int save_image(int w);
+#else
+extern void match_exit();
+extern int serve();
+extern int save_image();
+#endif
+extern int inMatch;
+
 /* external strings */
 extern char *stub386, *info01, *outOfMemory;
 #if defined(LINUXGRAPHX)
@@ -165,8 +179,9 @@ void init() {
 #endif
 }
 
-void body() {
-  int i, j;
+/* assemble all warriors, listing each one unless -b */
+void load_warriors() {
+  int i;
 
   for (i = 0; (i < warriors) && (errorcode == SUCCESS); i++) {
     /* Initialize energy system for each warrior */
@@ -178,7 +193,9 @@ void body() {
       warrior[i].maxEnergy = -1;
     }
 
-    if ((!assemble(warrior[i].fileName, i)) && (!SWITCH_b)) {
+    if (!assemble(warrior[i].fileName, i) && SWITCH_I)
+      errorcode = save_image(i); /* image.c */
+    if ((errorcode == SUCCESS) && (!SWITCH_b)) {
       if (!SWITCH_A) {
         fprintf(STDOUT, info01, warrior[i].name, warrior[i].instLen,
                 warrior[i].authorName);
@@ -194,6 +211,12 @@ void body() {
       }
     }
   }
+}
+
+void body() {
+  int i, j;
+
+  load_warriors();
 #ifdef PSPACE /* set up pSpace */
   pspace_init();
 #endif
@@ -249,6 +272,8 @@ void
 
 void Exit(errorcode) int errorcode;
 {
+  if (inMatch) /* pmars --serve and the library outlive a match */
+    match_exit(errorcode);
 #if defined(CURSESGRAPHX)
   end_curses(); /* Restore terminal to sane mode */
 #else
@@ -276,6 +301,7 @@ void Exit(errorcode) int errorcode;
 #endif
 }
 
+#ifndef PMARSLIB
 int main(argc, argv)
 int argc;
 char **argv;
@@ -320,6 +346,8 @@ char **argv;
   xWinArgv = argv;
 #endif
 
+  if (argc > 1 && !strcmp(argv[1], "--serve"))
+    return serve(argc > 2 ? argv[2] : NULL);
   if ((errorcode = parse_param(argc, argv)) == 0) {
     init();
 #ifdef OS2PMGRAPHX /* jk */
@@ -331,6 +359,7 @@ char **argv;
   }
   return SWITCH_Q >= 0 ? returninfo() : errorcode;
 }
+#endif /* PMARSLIB */
 
 /* return exitcode based on SWITCH_Q setting, useful mainly in scripts */
 int returninfo() {
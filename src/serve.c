@@ -0,0 +1,320 @@
+/* pMARS -- a portable Memory Array Redcode Simulator
+ * Copyright (C) 1993-1996 Albert Ma, Na'ndor Sieben, Stefan Strack and
+ * Mintardjo Wangsawidjaja
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+ */
+
+/*
+ * serve.c: play several matches in one process. play_match() runs one
+ * pMARS command line and is shared with the library build (libpmars.c);
+ * serve() implements pmars --serve [unix:PATH].
+ *
+ * Every request line holds the options and warrior files of one match,
+ * as on the command line (words with blanks in double quotes). The reply
+ * is "error CODE" with the pMARS exit code, or
+ *
+ *   ok WARRIORS
+ *   SCORE RESULT ... NAME          one line per warrior
+ *
+ * with the 2 * WARRIORS - 1 counts of results(): rounds survived with
+ * 1 .. WARRIORS survivors, then deaths by order. Assembly and other
+ * messages go to stderr; the core and task queue stay allocated between
+ * matches.
+ */
+
+#include <setjmp.h>
+#include <string.h>
+#include "global.h"
+#include "sim.h"
+#include "visualizer.h"
+
+#if defined(unix) && !defined(DJGPP)
+#include <signal.h>
+#include <unistd.h>
+#include <sys/socket.h>
+#include <sys/un.h>
+#define SERVE_SOCKETS
+#endif
+
+#define MAXREQUEST MAXALLCHAR /* longest request line */
+#define MAXREQARGS 512        /* most words in a request */
+
+#ifdef NEW_STYLE
+extern void init(void);
+extern void load_warriors(void);
+#ifdef PSPACE
+extern void pspace_init(void);
+#endif
+void match_reset(void);
+void match_exit(int code);
+int play_match(int argc, char **argv);
+int serve(char *target);
+#else
+extern void init();
+extern void load_warriors();
+#ifdef PSPACE
+extern void pspace_init();
+#endif
+void match_reset();
+void match_exit();
+int play_match();
+int serve();
+#endif
+
+extern int pspP;
+extern char *badServeTarget, *cantServe, *requestTooLong;
+
+int inMatch = 0;            /* Exit() returns to play_match() */
+static jmp_buf matchAbort;  /* where to */
+static int matchCode;       /* with this error code */
+static char *defaultScore;  /* SWITCH_eq as initialized by global.c */
+
+/* Free the strings, warriors and P-spaces of the previous match and
+ * restore the defaults that parse_param() does not set */
+#ifdef NEW_STYLE
+void match_reset(void)
+#else
+void match_reset()
+#endif
+{
+  int i;
+
+  for (i = 0; i < MAXWARRIOR; i++) {
+    FREE(warrior[i].fileName);
+    FREE(warrior[i].name);
+    FREE(warrior[i].authorName);
+    FREE(warrior[i].version);
+    FREE(warrior[i].date);
+    FREE(warrior[i].instBank);
+    memset(&warrior[i], 0, sizeof(warrior_struct));
+#ifdef PSPACE
+    FREE(pSpace[i]);
+    pSpace[i] = NULL;
+#endif
+  }
+  pspP = 0;
+  warriors = 0;
+
+  if (!defaultScore)
+    defaultScore = SWITCH_eq;
+  else if (SWITCH_eq != defaultScore)
+    FREE(SWITCH_eq);
+  FREE(SWITCH_F);
+  FREE(SWITCH_R);
+  FREE(SWITCH_Z);
+  SWITCH_eq = defaultScore;
+  SWITCH_F = SWITCH_R = SWITCH_Z = NULL;
+  SWITCH_Fnum = 0;
+  useExtRNG = 0;
+  viz_filter = viz_mask = 0;
+  viz_window_lo = viz_window_hi = 0;
+  progCnt = 0; /* logged by the first round's VIZ_SPL events */
+  debugState = NOBREAK;
+  errorcode = SUCCESS;
+}
+
+/* Called by Exit() during a match: give up the match and return code from
+ * play_match() */
+#ifdef NEW_STYLE
+void match_exit(int code)
+#else
+void match_exit(code)
+int code;
+#endif
+{
+  inMatch = 0;
+  matchCode = code;
+  longjmp(matchAbort, 1);
+}
+
+/* Play the match of a pMARS command line without assembly listings or
+ * results; returns 0 or the pMARS error code */
+#ifdef NEW_STYLE
+int play_match(int argc, char **argv)
+#else
+int play_match(argc, argv)
+int argc;
+char **argv;
+#endif
+{
+  match_reset();
+  if (setjmp(matchAbort)) {
+    /* Exit() was called, possibly in the middle of a round */
+    viz_close();
+    if (alloc_p && !keep_p) {
+      free(memory);
+      free(taskQueue);
+      alloc_p = 0;
+    }
+    return matchCode ? matchCode : SERIOUS;
+  }
+  inMatch = 1;
+
+  if ((errorcode = parse_param(argc, argv)) == SUCCESS) {
+    init();
+    SWITCH_b = TRUE; /* no assembly listings */
+    load_warriors();
+#ifdef PSPACE
+    pspace_init();
+#endif
+    if (rounds && !SWITCH_A && errorcode == SUCCESS)
+      simulator1();
+  }
+  inMatch = 0;
+  return errorcode;
+}
+
+/* Split a request line into argv after the program name; returns argc, 1
+ * for an empty line */
+#ifdef NEW_STYLE
+static int split_request(char *line, char **argv)
+#else
+static int split_request(line, argv)
+char *line;
+char **argv;
+#endif
+{
+  int argc = 1;
+
+  argv[0] = "pmars";
+  for (;;) {
+    line += strspn(line, " \t\r\n");
+    if (!*line || argc == MAXREQARGS - 1)
+      break;
+    if (*line == '"') {
+      argv[argc++] = ++line;
+      line += strcspn(line, "\"");
+    } else {
+      argv[argc++] = line;
+      line += strcspn(line, " \t\r\n");
+    }
+    if (*line)
+      *line++ = '\0';
+  }
+  argv[argc] = NULL;
+  return argc;
+}
+
+/* Answer the requests read from in on out until end of file */
+#ifdef NEW_STYLE
+static void serve_stream(FILE *in, FILE *out)
+#else
+static void serve_stream(in, out)
+FILE *in;
+FILE *out;
+#endif
+{
+  static char line[MAXREQUEST];
+  char *argv[MAXREQARGS];
+  int argc, code, w, i;
+
+  while (fgets(line, MAXREQUEST, in)) {
+    if (!strchr(line, '\n') && !feof(in)) {
+      errout(requestTooLong);
+      while (fgets(line, MAXREQUEST, in) && !strchr(line, '\n'))
+        ;
+      fprintf(out, "error %d\n", CLP_NOGOOD);
+      fflush(out);
+      continue;
+    }
+    if ((argc = split_request(line, argv)) == 1)
+      continue;
+
+    if ((code = play_match(argc, argv)) != SUCCESS)
+      fprintf(out, "error %d\n", code);
+    else {
+      set_reg('W', (long)warriors); /* 'W' used in score calculation */
+      fprintf(out, "ok %d\n", warriors);
+      for (w = 0; w < warriors; w++) {
+        fprintf(out, "%d", score(w));
+        for (i = 0; i < 2 * warriors - 1; i++)
+          fprintf(out, " %d", warrior[w].score[i]);
+        fprintf(out, " %s\n", warrior[w].name ? warrior[w].name : "");
+      }
+    }
+    fflush(out);
+  }
+}
+
+/* pmars --serve: answer requests from stdin on stdout, or from each client
+ * of a Unix socket in turn with target "unix:PATH". Returns the exit code. */
+#ifdef NEW_STYLE
+int serve(char *target)
+#else
+int serve(target)
+char *target;
+#endif
+{
+#ifdef SERVE_SOCKETS
+  struct sockaddr_un addr;
+  int listener, fd;
+  FILE *in, *out;
+#endif
+
+  keep_p = 1;
+#ifdef SERVE_SOCKETS
+  signal(SIGINT, SIG_DFL); /* no debugger to break into */
+#endif
+  if (!target || !strcmp(target, "-")) {
+#ifdef SERVE_SOCKETS
+    /* replies keep stdout; everything else pMARS prints goes to stderr */
+    fflush(stdout);
+    if ((fd = dup(fileno(stdout))) < 0 || !(out = fdopen(fd, "w")))
+      return SERIOUS;
+    dup2(fileno(stderr), fileno(stdout));
+    serve_stream(stdin, out);
+    fclose(out);
+#else
+    serve_stream(stdin, stdout);
+#endif
+    return SUCCESS;
+  }
+  if (strncmp(target, "unix:", 5)) {
+    fprintf(stderr, badServeTarget, target);
+    return CLP_NOGOOD;
+  }
+
+#ifdef SERVE_SOCKETS
+  memset(&addr, 0, sizeof(addr));
+  addr.sun_family = AF_UNIX;
+  strncpy(addr.sun_path, target + 5, sizeof(addr.sun_path) - 1);
+  unlink(addr.sun_path); /* left behind by an earlier server */
+  if ((listener = socket(AF_UNIX, SOCK_STREAM, 0)) < 0 ||
+      bind(listener, (struct sockaddr *)&addr, sizeof(addr)) < 0 ||
+      listen(listener, 16) < 0) {
+    fprintf(stderr, cantServe, target + 5);
+    return FNOFOUND;
+  }
+  signal(SIGPIPE, SIG_IGN); /* a client going away ends only its stream */
+  for (;;) {
+    if ((fd = accept(listener, NULL, NULL)) < 0)
+      continue;
+    in = fdopen(fd, "r");
+    out = fdopen(dup(fd), "w");
+    if (in && out)
+      serve_stream(in, out);
+    if (out)
+      fclose(out);
+    if (in)
+      fclose(in);
+    else
+      close(fd);
+  }
+#else
+  fprintf(stderr, cantServe, target + 5);
+  return FNOFOUND;
+#endif
+}
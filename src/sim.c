@@ -28,9 +28,17 @@
 #include "sim.h"
 #include "global.h"
 #include "visualizer.h"
+#include <string.h>
 #include <time.h>
 #include <unistd.h>
 
+/* -j: rounds played by forked processes */
+#if defined(unix) && !defined(DJGPP) && !defined(DOS16)
+#include <signal.h>
+#include <sys/wait.h>
+#define SIM_JOBS
+#endif
+
 #ifdef DOS16
 #include <dos.h>
 #endif
@@ -164,6 +172,7 @@ extern int posit();
 extern void npos();
 extern S32_T rng();
 #endif
+extern int inMatch; /* serve.c: Exit() returns to play_match() */
 
 /* strings */
 extern char *outOfMemory;
@@ -171,6 +180,7 @@ extern char *warriorTerminated;
 extern char *fatalErrorInSimulator;
 extern char *warriorTerminatedEndOfRound;
 extern char *endOfRound;
+extern char *jobFailed;
 
 warrior_struct *W; /* indicate which warrior is running */
 U32_T totaltask;   /* size of the taskQueue */
@@ -194,6 +204,11 @@ long cycle;
 int sim_round;
 
 char alloc_p = 0; /* indicate whether memory has been allocated */
+char keep_p = 0;  /* keep it for the next simulator1() (pmars --serve) */
+#ifndef DOS16
+static ADDR_T allocCore; /* core size and task queue length allocated */
+static U32_T allocTask;
+#endif
 int warriorsLeft; /* number of warriors still left in core */
 
 warrior_struct *endWar; /* end of the warriors array */
@@ -250,6 +265,108 @@ static ADDR_T foldw(ADDR_T a) {
 }
 #endif
 
+#ifdef SIM_JOBS
+static int jobPipe = -1; /* where a -j process sends its results */
+
+/* Rounds are independent and may be shared by -j processes unless a
+ * warrior uses P-space or the battle is recorded, displayed or debugged */
+static int jobs_possible() {
+  warrior_struct *w;
+  mem_struct *inst;
+
+  if (SWITCH_R || SWITCH_g || debugState)
+    return 0;
+#ifdef PSPACE
+  for (w = warrior; w < endWar; ++w)
+    for (inst = w->instBank; inst < w->instBank + w->instLen; ++inst)
+      if ((inst->opcode >> 3) == LDP || (inst->opcode >> 3) == STP)
+        return 0;
+#endif
+  return 1;
+}
+
+static int pipe_io(int fd, char *buf, size_t n, int out) {
+  ssize_t done;
+
+  for (; n; buf += done, n -= done)
+    if ((done = out ? write(fd, buf, n) : read(fd, buf, n)) <= 0)
+      return 0;
+  return 1;
+}
+
+/*
+ * Fork SWITCH_j processes that play consecutive shares of the rounds. A
+ * process returns 1 with its first and last round; it places the warriors
+ * of the rounds before its first one without playing them, so seed and
+ * starter follow the same series as in a single process. The parent adds
+ * up their scores and returns 0.
+ */
+static int start_jobs(int *first, int *last) {
+  int jobs = SWITCH_j < rounds ? SWITCH_j : rounds;
+  int share = rounds / jobs, extra = rounds % jobs;
+  int fd[2], pipes[MAXJOBS], job, i, ok = 1;
+  pid_t pids[MAXJOBS];
+  short part[MAXWARRIOR * 2 - 1];
+  long energy[MAXWARRIOR];
+  warrior_struct *w;
+
+  fflush(stdout);
+  fflush(stderr);
+  for (job = 0; job < jobs; job++) {
+    if (pipe(fd) < 0 || (pids[job] = fork()) < 0) {
+      errout(jobFailed);
+      Exit(SERIOUS);
+    }
+    if (!pids[job]) {
+      signal(SIGINT, SIG_DFL); /* no debugger in a job */
+      inMatch = 0;             /* Exit() ends the job, not a match */
+      for (i = 0; i < job; i++)
+        close(pipes[i]);
+      close(fd[0]);
+      jobPipe = fd[1];
+      *first = 1 + job * share + (job < extra ? job : extra);
+      *last = *first + share - (job >= extra);
+      for (w = warrior; w < endWar; ++w)
+        memset(w->score, 0, sizeof(w->score)); /* send this job's only */
+      return 1;
+    }
+    close(fd[1]);
+    pipes[job] = fd[0];
+  }
+
+  for (job = 0; job < jobs; job++) {
+    for (w = warrior; w < endWar && ok; ++w) {
+      ok = pipe_io(pipes[job], (char *)part, sizeof(short) * (2 * warriors - 1), 0) &&
+           pipe_io(pipes[job], (char *)&energy[w - warrior], sizeof(long), 0);
+      for (i = 0; ok && i < 2 * warriors - 1; i++)
+        w->score[i] += part[i];
+    }
+    close(pipes[job]);
+  }
+  for (job = 0; job < jobs; job++)
+    ok = waitpid(pids[job], &i, 0) == pids[job] && WIFEXITED(i) &&
+         !WEXITSTATUS(i) && ok;
+  if (!ok) {
+    errout(jobFailed);
+    Exit(SERIOUS);
+  }
+  for (w = warrior; w < endWar; ++w)
+    w->energy = energy[w - warrior]; /* as left by the last round */
+  return 0;
+}
+
+/* Send this process's scores and energies to the parent and end it */
+static void end_job() {
+  warrior_struct *w;
+  int ok = 1;
+
+  for (w = warrior; w < endWar && ok; ++w)
+    ok = pipe_io(jobPipe, (char *)w->score, sizeof(short) * (2 * warriors - 1), 1) &&
+         pipe_io(jobPipe, (char *)&w->energy, sizeof(long), 1);
+  _exit(!ok);
+}
+#endif
+
 void simulator1() {
 #ifdef PERMUTATE
   int permidx = 0, permtmp, *permbuf = NULL;
@@ -275,6 +392,7 @@ void simulator1() {
 #ifdef RWLIMIT
   ADDR_T raddrB = 0;
 #endif
+  int firstRound = 1, lastRound = rounds; /* rounds played here */
 
   endWar = warrior + warriors;
 
@@ -298,22 +416,29 @@ void simulator1() {
     endQueue = taskQueue + totaltask; /* memory; */
   }
 #else
+  totaltask = (U32_T)taskNum * warriors + 1;
+  if (alloc_p && (coreSize > allocCore || totaltask > allocTask)) {
+    free(memory); /* kept from a smaller match */
+    free(taskQueue);
+    alloc_p = 0;
+  }
   if (!alloc_p) {
     memory = (mem_struct *)malloc((size_t)coreSize * sizeof(mem_struct));
     if (!memory) {
       errout(outOfMemory);
       Exit(MEMERR);
     }
-    totaltask = (U32_T)taskNum * warriors + 1;
     taskQueue = (TaskEntry *)malloc((size_t)totaltask * sizeof(TaskEntry));
     if (!taskQueue) {
       free(memory);
       errout(outOfMemory);
       Exit(MEMERR);
     }
+    allocCore = coreSize;
+    allocTask = totaltask;
     alloc_p = 1;
-    endQueue = taskQueue + totaltask;
   }
+  endQueue = taskQueue + totaltask;
 #endif
   if (SWITCH_e)
     debugState = STEP; /* automatically enter debugger */
@@ -332,6 +457,11 @@ void simulator1() {
     display_init();
   }
   viz_init(); /* Initialize visualization recording */
+#ifdef SIM_JOBS
+  if (SWITCH_j > 1 && rounds > 1 && jobs_possible() &&
+      !start_jobs(&firstRound, &lastRound))
+    goto roundsdone; /* played by the -j processes */
+#endif
 
   sim_round = 1;
   do { /* each round */
@@ -347,6 +477,7 @@ void simulator1() {
 #endif
     warriorsLeft = warriors;
     cycle = cycles2;
+    VIZ_WINDOW(); /* Recording filter for the first cycle */
     if (warriors > 1) {
       if (warriors == 2) {
 #ifdef PERMUTATE
@@ -369,6 +500,8 @@ void simulator1() {
                    * fails */
       }
     }
+    if (sim_round < firstRound)
+      goto skipround; /* another -j process plays this round */
     /* create nextWarrior links each round */
     /* leave oldW pointing to last warrior */
     for (oldW = warrior; oldW < endWar - 1; ++oldW)
@@ -377,6 +510,7 @@ void simulator1() {
     W = starter;
     if (starter != warrior)
       oldW = starter - 1;
+    VIZ_ROUND_START(); /* Round index entry with this round's positions */
     addrA = warrior[0].instLen;
     /* clear the core following warrior 0 */
     do {
@@ -1683,6 +1817,7 @@ void simulator1() {
       //      --cycle;
     } while (--cycle); /* next cycle */
   nextround:
+    VIZ_ROUND_END(); /* Close the last frame and record the round's outcome */
     for (temp = 0; temp < warriors; temp++) {
       if (warrior[temp].tasks) {
         warrior[temp].score[warriorsLeft - 1]++;
@@ -1694,6 +1829,7 @@ void simulator1() {
       }
 #endif
     }
+  skipround:
     if (starter == endWar - 1)
       starter = warrior;
     else
@@ -1708,7 +1844,12 @@ void simulator1() {
       debugState = cdb(outs);
     }
 #endif
-  } while (++sim_round <= rounds);
+  } while (++sim_round <= lastRound);
+#ifdef SIM_JOBS
+  if (jobPipe >= 0)
+    end_job();
+roundsdone:
+#endif
 
   /* Display energy information if energy system is enabled */
   if (SWITCH_E) {
@@ -1730,8 +1871,10 @@ void simulator1() {
 #endif
 #ifndef DOS16
   /* DOS taskQueue may not be free'd because of segment wrap-around */
-  free(memory);
-  free(taskQueue);
-  alloc_p = 0;
+  if (!keep_p) {
+    free(memory);
+    free(taskQueue);
+    alloc_p = 0;
+  }
 #endif
 }
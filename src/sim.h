@@ -96,6 +96,7 @@ extern long cycle;
 extern ADDR_T progCnt;    /* program counter */
 extern warrior_struct *W; /* indicate which warrior is running */
 extern char alloc_p;
+extern char keep_p;
 extern int warriorsLeft;
 
 extern TaskEntry FAR *endQueue;
@@ -374,7 +374,9 @@ char *usage_screen = "Usage:\n   pmarsv [options] file1 [files ..]\n   The "
                      "special file - stands for standard input\n\n";
 #else
 char *usage_screen = "Usage:\n   pmars [options] file1 [files ..]\n   The "
-                     "special file - stands for standard input\n\n";
+                     "special file - stands for standard input\n"
+                     "   pmars --serve [unix:PATH] plays one match per "
+                     "line of options\n\n";
 #endif
 #endif
 
@@ -433,6 +435,8 @@ char *optReadLimit = "Read limit size";
 char *optWriteLimit = "Write limit size";
 #endif
 char *optAssemble = "Assemble warriors only";
+char *optJobs = "Processes sharing the rounds [1]";
+char *optImage = "Write load images (.rci) of the warriors";
 char *optEnergy = "Disable energy system (on by default)";
 char *optEnergyAmount = "Initial energy per warrior [80000]";
 #if defined(XWINGRAPHX)
@@ -474,5 +478,19 @@ char *EndMod = "END MODULE\n";
 #endif /* VMS */
 
 char *optRecord = "\nrecord simulation to file\n";
+char *optRecordVersion = "Recording format version, 2 = blocks, 3 = frames [1]";
+char *optRecordFrameCycles = "Cycles per recorded frame (-Y 3) [1]";
+char *optRecordWindow = "Record only cycles X-Y";
+char *badRecordTarget = "\nCannot record to standard output\n";
+char *badRecordWindow = "\nRecording cycle window must be X-Y\n";
+char *jobFailed = "A -j process failed\n";
+char *badServeTarget = "--serve takes - or unix:PATH, not %s\n";
+char *cantServe = "Cannot listen on socket %s\n";
+char *requestTooLong = "Request line too long\n";
+char *imageDamaged = "Load image '%s' is damaged";
+char *imageIncompatible =
+    "Load image '%s' was written by an incompatible pMARS";
+char *imageMismatch = "Load image '%s' was assembled for %s %lu, not %lu";
+char *cantWriteImage = "Cannot write load image %s\n";
 
 #endif /* PMARSLANG == ENGLISH */
@@ -3,15 +3,904 @@
  */
 
 #include "visualizer.h"
+#include "sim.h"
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
 #include <stdint.h>
 
+/* Live targets: -T - and -T unix:PATH */
+#if defined(unix) && !defined(DJGPP)
+#include <signal.h>
+#include <unistd.h>
+#include <sys/socket.h>
+#include <sys/un.h>
+#define VIZ_SOCKETS
+#endif
+
+#ifdef VIZ_ZLIB
+#include <zlib.h>
+#ifndef VIZ_ZLIB_LEVEL
+#define VIZ_ZLIB_LEVEL Z_DEFAULT_COMPRESSION
+#endif
+#endif
+
+/* With VIZ_THREADS full slots are written by a background thread while the
+ * simulator keeps filling the next one; otherwise a single slot is written
+ * inline whenever it fills up */
+#ifdef VIZ_THREADS
+#include <pthread.h>
+#define VIZ_RING_SLOTS 4
+#else
+#define VIZ_RING_SLOTS 1
+#endif
+
+/* Smaller blocks for live targets (pipes, FIFOs, sockets), so a reader
+ * sees events shortly after they happen */
+#define VIZ_LIVE_BLOCK_EVENTS 4096L
+#define VIZ_LIVE_BLOCK_FRAMES 256L
+
+/* Worst-case encoded size of one 32-bit varint */
+#define VIZ_VARINT_MAX 5
+
+/* Zigzag-map a signed 32-bit difference so small magnitudes encode short */
+#define VIZ_ZIGZAG(d) (((uint32_t)(d) << 1) ^ (0u - ((uint32_t)(d) >> 31)))
+
+/* Event as buffered in memory until its slot is written in either format */
+typedef struct {
+    uint32_t cycle;
+    uint32_t address;
+    uint32_t data;
+    uint16_t type;
+    uint8_t warrior_id;
+    uint8_t unused;
+} viz_record_t;
+
 /* Global variables for visualization */
 FILE *viz_file = NULL;        /* File handle for recording */
 long viz_event_count = 0;     /* Number of events recorded */
 static viz_header_t viz_header; /* File header */
+unsigned viz_filter = 0;      /* Event types selected with -T */
+unsigned viz_mask = 0;        /* Event types recorded this cycle */
+long viz_window_lo = 0;       /* Cycle window selected with -Z */
+long viz_window_hi = 0;
+#ifdef PMARSLIB
+char *viz_memory = NULL;      /* Last recording, see viz_open_target */
+size_t viz_memory_size = 0;
+#endif
+
+/* Names accepted in the -T event list, indexed by viz_event_type_t */
+static char *viz_event_names[] = {
+    "exec", "read", "write", "dec", "inc", "spl", "dat", "die", "cycle", "push"
+};
+
+/* Ring of event slots, VIZ_BLOCK_MAX_EVENTS records each */
+static viz_record_t *viz_ring[VIZ_RING_SLOTS];
+static long viz_ring_count[VIZ_RING_SLOTS]; /* Events in a submitted slot, 0 if free */
+static int viz_head, viz_tail;               /* Slot being filled / written next */
+static viz_record_t *viz_slot;               /* viz_ring[viz_head] */
+static long viz_slot_fill;
+static long viz_written_events;              /* Events already handed to the file */
+static long viz_slot_max;                    /* Events per slot and block */
+
+/* Output state: the file may be a pipe or socket that cannot seek, so its
+ * position is counted rather than asked for */
+static uint64_t viz_offset;                  /* Bytes written so far */
+static int viz_live;                         /* Cannot seek: header is final as written */
+static FILE *viz_stdout = NULL;              /* Original stdout, claimed by -T - */
+static int viz_error;                        /* The block index ran out of memory */
+
+#ifdef VIZ_THREADS
+static pthread_t viz_writer;
+static pthread_mutex_t viz_lock = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t viz_ready = PTHREAD_COND_INITIALIZER; /* A slot was submitted */
+static pthread_cond_t viz_freed = PTHREAD_COND_INITIALIZER; /* A slot was written */
+static int viz_threaded, viz_stopping;
+#endif
+
+/* v1 output buffer, one slot of viz_event_t */
+static viz_event_t *viz_flat;
+
+/* v2 block columns, concatenated into blk_raw when the block is written */
+static unsigned char *blk_tags, *blk_warriors;     /* One byte per event */
+static unsigned char *blk_cycles, *blk_counts;     /* Per-cycle groups */
+static unsigned char *blk_addresses, *blk_data;    /* Varint event fields */
+static unsigned char *blk_raw, *blk_out;           /* Flush buffers */
+static unsigned long blk_raw_max, blk_out_max;
+
+/* v3 frame under construction. Executed (kind 0) and written (kind 1)
+ * cells are tracked separately: a cell is part of the frame when its stamp
+ * equals frm_number, and frm_owner holds the warrior that touched it last */
+static uint32_t *frm_stamp[2];
+static unsigned short *frm_owner[2];
+static uint32_t *frm_touched[2];                   /* Cells in first-touch order */
+static long frm_touched_count[2];
+static long *frm_cells;                            /* Cells per kind and warrior */
+static uint32_t frm_number;
+static int frm_open;
+static uint32_t frm_cycle;                         /* Cycle counter at the frame start */
+static long frm_span;                              /* Counter steps per frame */
+static unsigned long frm_core_bytes;               /* Bytes per bitmap */
+
+/* v3 block columns, concatenated into blk_raw when the block is written */
+static unsigned char *frm_cycles, *frm_tasks, *frm_sets, *frm_addresses, *frm_bitmaps;
+static unsigned char *frm_cycles_end, *frm_tasks_end, *frm_sets_end;
+static unsigned char *frm_addresses_end, *frm_bitmaps_end;
+static unsigned long frm_column_max;               /* Addresses and bitmaps capacity */
+static long frm_block_frames, frm_block_max;
+static uint32_t frm_prev_cycle, frm_first_cycle;
+
+/* Index of the event blocks written so far */
+static viz_index_entry_t *viz_index = NULL;
+static long viz_index_count, viz_index_max;
+
+/* Round index, with warriors entries of viz_round_warriors per round */
+static viz_round_t *viz_rounds = NULL;
+static viz_round_warrior_t *viz_round_warriors = NULL;
+static long viz_round_count, viz_round_max;
+
+#ifdef NEW_STYLE
+static unsigned char *viz_put_varint(unsigned char *p, uint32_t value)
+#else
+static unsigned char *viz_put_varint(p, value)
+unsigned char *p;
+uint32_t value;
+#endif
+{
+    while (value >= 0x80) {
+        *p++ = (unsigned char)(value | 0x80);
+        value >>= 7;
+    }
+    *p++ = (unsigned char)value;
+    return p;
+}
+
+/* Allocate the ring and the buffers of the chosen format, returning 0 when
+ * out of memory */
+#ifdef NEW_STYLE
+static int viz_alloc(void)
+#else
+static int viz_alloc()
+#endif
+{
+    unsigned long column = VIZ_BLOCK_MAX_EVENTS * VIZ_VARINT_MAX;
+    int ok = 1;
+    int i;
+
+    for (i = 0; i < VIZ_RING_SLOTS; i++) {
+        viz_ring[i] = (viz_record_t *) malloc(VIZ_BLOCK_MAX_EVENTS * sizeof(viz_record_t));
+        viz_ring_count[i] = 0;
+        ok = ok && viz_ring[i];
+    }
+    viz_head = viz_tail = 0;
+    viz_slot = viz_ring[0];
+    viz_slot_fill = 0;
+    viz_slot_max = viz_live ? VIZ_LIVE_BLOCK_EVENTS : VIZ_BLOCK_MAX_EVENTS;
+    viz_written_events = 0;
+
+    viz_round_count = 0;
+    viz_round_max = rounds > 0 && rounds < 1024 ? rounds : 1024;
+    viz_rounds = (viz_round_t *) malloc(viz_round_max * sizeof(viz_round_t));
+    viz_round_warriors = (viz_round_warrior_t *)
+        malloc(viz_round_max * warriors * sizeof(viz_round_warrior_t));
+    ok = ok && viz_rounds && viz_round_warriors;
+
+    if (viz_header.version == VIZ_VERSION_FLAT) {
+        viz_flat = (viz_event_t *) malloc(VIZ_BLOCK_MAX_EVENTS * sizeof(viz_event_t));
+        return ok && viz_flat;
+    }
+
+    if (viz_header.version == VIZ_VERSION_FRAMES) {
+        /* A list set is only used while it is smaller than a bitmap, so one
+         * frame needs at most 2 * warriors bitmaps in either column */
+        frm_core_bytes = (coreSize + 7) / 8;
+        frm_column_max = 2 * warriors * frm_core_bytes;
+        if (frm_column_max < column)
+            frm_column_max = column;
+        frm_block_max = (viz_live ? VIZ_LIVE_BLOCK_FRAMES : VIZ_BLOCK_MAX_FRAMES) * 2 / warriors;
+        if (frm_block_max < 1)
+            frm_block_max = 1;
+        blk_raw_max = 7 * VIZ_VARINT_MAX + frm_block_max * (1 + 3 * warriors) * VIZ_VARINT_MAX +
+                      2 * frm_column_max;
+        for (i = 0; i < 2; i++) {
+            frm_stamp[i] = (uint32_t *) calloc(coreSize, sizeof(uint32_t));
+            frm_owner[i] = (unsigned short *) malloc(coreSize * sizeof(unsigned short));
+            frm_touched[i] = (uint32_t *) malloc(coreSize * sizeof(uint32_t));
+            frm_touched_count[i] = 0;
+            ok = ok && frm_stamp[i] && frm_owner[i] && frm_touched[i];
+        }
+        frm_cells = (long *) malloc(2 * warriors * sizeof(long));
+        frm_cycles = (unsigned char *) malloc(frm_block_max * VIZ_VARINT_MAX);
+        frm_tasks = (unsigned char *) malloc(frm_block_max * warriors * VIZ_VARINT_MAX);
+        frm_sets = (unsigned char *) malloc(frm_block_max * 2 * warriors * VIZ_VARINT_MAX);
+        frm_addresses = (unsigned char *) malloc(frm_column_max);
+        frm_bitmaps = (unsigned char *) malloc(frm_column_max);
+        frm_cycles_end = frm_cycles;
+        frm_tasks_end = frm_tasks;
+        frm_sets_end = frm_sets;
+        frm_addresses_end = frm_addresses;
+        frm_bitmaps_end = frm_bitmaps;
+        frm_number = 1;
+        frm_open = 0;
+        frm_block_frames = 0;
+        frm_prev_cycle = 0;
+        ok = ok && frm_cells && frm_cycles && frm_tasks && frm_sets && frm_addresses && frm_bitmaps;
+    } else {
+        blk_raw_max = 6 * VIZ_VARINT_MAX + 2 * VIZ_BLOCK_MAX_EVENTS + 4 * column;
+        blk_tags = (unsigned char *) malloc(VIZ_BLOCK_MAX_EVENTS);
+        blk_warriors = (unsigned char *) malloc(VIZ_BLOCK_MAX_EVENTS);
+        blk_cycles = (unsigned char *) malloc(column);
+        blk_counts = (unsigned char *) malloc(column);
+        blk_addresses = (unsigned char *) malloc(column);
+        blk_data = (unsigned char *) malloc(column);
+        ok = ok && blk_tags && blk_warriors && blk_cycles && blk_counts && blk_addresses && blk_data;
+    }
+#ifdef VIZ_ZLIB
+    blk_out_max = compressBound(blk_raw_max);
+#else
+    blk_out_max = 0;
+#endif
+    blk_raw = (unsigned char *) malloc(blk_raw_max);
+    blk_out = blk_out_max ? (unsigned char *) malloc(blk_out_max) : NULL;
+    viz_index_count = 0;
+    viz_index_max = 64;
+    viz_index = (viz_index_entry_t *) malloc(viz_index_max * sizeof(viz_index_entry_t));
+
+    return ok && blk_raw && viz_index && (blk_out || !blk_out_max);
+}
+
+#ifdef NEW_STYLE
+static void viz_free(void)
+#else
+static void viz_free()
+#endif
+{
+    int i;
+
+    for (i = 0; i < VIZ_RING_SLOTS; i++) {
+        free(viz_ring[i]);
+        viz_ring[i] = NULL;
+    }
+    free(viz_flat);
+    free(blk_tags);
+    free(blk_warriors);
+    free(blk_cycles);
+    free(blk_counts);
+    free(blk_addresses);
+    free(blk_data);
+    free(blk_raw);
+    free(blk_out);
+    free(viz_index);
+    free(viz_rounds);
+    free(viz_round_warriors);
+    for (i = 0; i < 2; i++) {
+        free(frm_stamp[i]);
+        free(frm_owner[i]);
+        free(frm_touched[i]);
+        frm_stamp[i] = NULL;
+        frm_owner[i] = NULL;
+        frm_touched[i] = NULL;
+    }
+    free(frm_cells);
+    free(frm_cycles);
+    free(frm_tasks);
+    free(frm_sets);
+    free(frm_addresses);
+    free(frm_bitmaps);
+    frm_cells = NULL;
+    frm_cycles = frm_tasks = frm_sets = frm_addresses = frm_bitmaps = NULL;
+    viz_slot = NULL;
+    viz_flat = NULL;
+    blk_tags = blk_warriors = blk_cycles = blk_counts = NULL;
+    blk_addresses = blk_data = blk_raw = blk_out = NULL;
+    viz_index = NULL;
+    viz_rounds = NULL;
+    viz_round_warriors = NULL;
+}
+
+/* Write a v2 block header and payload, compressing it when that helps */
+#ifdef NEW_STYLE
+static void viz_write_block(int kind, unsigned char *payload, unsigned long size, uint32_t events)
+#else
+static void viz_write_block(kind, payload, size, events)
+int kind;
+unsigned char *payload;
+unsigned long size;
+uint32_t events;
+#endif
+{
+    viz_block_t block;
+#ifdef VIZ_ZLIB
+    uLongf out_size = blk_out_max;
+#endif
+
+    block.kind = (uint8_t)kind;
+    block.codec = VIZ_CODEC_STORED;
+    block.flags = 0;
+    block.raw_size = (uint32_t)size;
+    block.event_count = events;
+#ifdef VIZ_ZLIB
+    if (size <= blk_raw_max &&
+        compress2(blk_out, &out_size, payload, size, VIZ_ZLIB_LEVEL) == Z_OK &&
+        out_size < size) {
+        block.codec = VIZ_CODEC_ZLIB;
+        payload = blk_out;
+        size = out_size;
+    }
+#endif
+    block.stored_size = (uint32_t)size;
+    fwrite(&block, sizeof(viz_block_t), 1, viz_file);
+    fwrite(payload, 1, size, viz_file);
+    viz_offset += sizeof(viz_block_t) + size;
+    if (viz_live)
+        fflush(viz_file);
+}
+
+/* Add the block about to be written at the current file position to the
+ * block index. Returns 0 and sets viz_error when out of memory: this may run
+ * on the writer thread, so leaving is up to the main thread. */
+#ifdef NEW_STYLE
+static int viz_index_block(long count, uint32_t first_cycle)
+#else
+static int viz_index_block(count, first_cycle)
+long count;
+uint32_t first_cycle;
+#endif
+{
+    viz_index_entry_t *entry;
+
+    if (viz_index_count == viz_index_max) {
+        entry = (viz_index_entry_t *)
+            realloc(viz_index, 2 * viz_index_max * sizeof(viz_index_entry_t));
+        if (!entry) {
+            viz_error = 1;
+            return 0;
+        }
+        viz_index = entry;
+        viz_index_max *= 2;
+    }
+    entry = &viz_index[viz_index_count++];
+    entry->offset = viz_offset;
+    entry->first_event = (uint64_t)viz_written_events;
+    entry->event_count = (uint32_t)count;
+    entry->first_cycle = first_cycle;
+    return 1;
+}
+
+/* Encode a slot of events as one v2 event block and write it */
+#ifdef NEW_STYLE
+static void viz_write_event_block(viz_record_t *records, long count)
+#else
+static void viz_write_event_block(records, count)
+viz_record_t *records;
+long count;
+#endif
+{
+    unsigned char *cycles = blk_cycles, *counts = blk_counts;
+    unsigned char *addresses = blk_addresses, *data = blk_data;
+    unsigned char *p = blk_raw;
+    uint32_t groups = 0, group_events = 0;
+    uint32_t group_cycle = records[0].cycle, prev_cycle = 0, prev_address = 0;
+    viz_record_t *record;
+    unsigned char tag;
+    long i;
+
+    for (i = 0; i < count; i++) {
+        record = &records[i];
+        tag = (unsigned char)(record->type & VIZ_TAG_TYPE);
+
+        /* Events sharing a cycle form one group */
+        if (record->cycle != group_cycle) {
+            cycles = viz_put_varint(cycles, VIZ_ZIGZAG(group_cycle - prev_cycle));
+            counts = viz_put_varint(counts, group_events);
+            prev_cycle = group_cycle;
+            group_cycle = record->cycle;
+            group_events = 0;
+            groups++;
+        }
+        group_events++;
+
+        if (record->address) {
+            addresses = viz_put_varint(addresses, VIZ_ZIGZAG(record->address - prev_address));
+            prev_address = record->address;
+        } else
+            tag |= VIZ_TAG_NO_ADDRESS;
+
+        if (record->data == record->cycle && record->data)
+            tag |= VIZ_TAG_DATA_CYCLE;
+        else if (record->data) {
+            data = viz_put_varint(data, record->data);
+            tag |= VIZ_TAG_DATA_VARINT;
+        }
+
+        blk_tags[i] = tag;
+        blk_warriors[i] = record->warrior_id;
+    }
+    cycles = viz_put_varint(cycles, VIZ_ZIGZAG(group_cycle - prev_cycle));
+    counts = viz_put_varint(counts, group_events);
+    groups++;
+
+    if (!viz_index_block(count, records[0].cycle))
+        return;
+
+    p = viz_put_varint(p, (uint32_t)count);
+    p = viz_put_varint(p, groups);
+    p = viz_put_varint(p, (uint32_t)(cycles - blk_cycles));
+    p = viz_put_varint(p, (uint32_t)(counts - blk_counts));
+    p = viz_put_varint(p, (uint32_t)(addresses - blk_addresses));
+    p = viz_put_varint(p, (uint32_t)(data - blk_data));
+    memcpy(p, blk_cycles, cycles - blk_cycles);
+    p += cycles - blk_cycles;
+    memcpy(p, blk_counts, counts - blk_counts);
+    p += counts - blk_counts;
+    memcpy(p, blk_tags, count);
+    p += count;
+    memcpy(p, blk_warriors, count);
+    p += count;
+    memcpy(p, blk_addresses, addresses - blk_addresses);
+    p += addresses - blk_addresses;
+    memcpy(p, blk_data, data - blk_data);
+    p += data - blk_data;
+
+    viz_write_block(VIZ_BLOCK_EVENTS, blk_raw, (unsigned long)(p - blk_raw), (uint32_t)count);
+}
+
+/* Write a slot of events in the file's format */
+#ifdef NEW_STYLE
+static void viz_write_records(viz_record_t *records, long count)
+#else
+static void viz_write_records(records, count)
+viz_record_t *records;
+long count;
+#endif
+{
+    long i;
+
+    if (viz_error)
+        return; /* Drop the slot, the recording is given up */
+    if (viz_header.version == VIZ_VERSION_BLOCKS)
+        viz_write_event_block(records, count);
+    else {
+        for (i = 0; i < count; i++) {
+            viz_flat[i].cycle = records[i].cycle;
+            viz_flat[i].address = (uint16_t)(records[i].address & 0xFFFF);
+            viz_flat[i].event_type = records[i].type;
+            viz_flat[i].warrior_id = records[i].warrior_id;
+            viz_flat[i].padding1 = 0;
+            viz_flat[i].address_high = (uint16_t)(records[i].address >> 16);
+            viz_flat[i].data = records[i].data;
+        }
+        fwrite(viz_flat, sizeof(viz_event_t), count, viz_file);
+        viz_offset += count * sizeof(viz_event_t);
+    }
+    viz_written_events += count;
+}
+
+#ifdef NEW_STYLE
+static int viz_compare_cells(const void *a, const void *b)
+#else
+static int viz_compare_cells(a, b)
+void *a;
+void *b;
+#endif
+{
+    uint32_t x = *(const uint32_t *) a, y = *(const uint32_t *) b;
+    return x < y ? -1 : x > y;
+}
+
+/* Write the frames collected so far as one v3 frame block */
+#ifdef NEW_STYLE
+static void viz_frame_flush(void)
+#else
+static void viz_frame_flush()
+#endif
+{
+    unsigned char *p = blk_raw;
+
+    if (!frm_block_frames)
+        return;
+
+    if (!viz_index_block(frm_block_frames, frm_first_cycle)) {
+        viz_close(); /* Does not return */
+        return;
+    }
+
+    p = viz_put_varint(p, (uint32_t)frm_block_frames);
+    p = viz_put_varint(p, (uint32_t)warriors);
+    p = viz_put_varint(p, (uint32_t)(frm_cycles_end - frm_cycles));
+    p = viz_put_varint(p, (uint32_t)(frm_tasks_end - frm_tasks));
+    p = viz_put_varint(p, (uint32_t)(frm_sets_end - frm_sets));
+    p = viz_put_varint(p, (uint32_t)(frm_addresses_end - frm_addresses));
+    p = viz_put_varint(p, (uint32_t)(frm_bitmaps_end - frm_bitmaps));
+    memcpy(p, frm_cycles, frm_cycles_end - frm_cycles);
+    p += frm_cycles_end - frm_cycles;
+    memcpy(p, frm_tasks, frm_tasks_end - frm_tasks);
+    p += frm_tasks_end - frm_tasks;
+    memcpy(p, frm_sets, frm_sets_end - frm_sets);
+    p += frm_sets_end - frm_sets;
+    memcpy(p, frm_addresses, frm_addresses_end - frm_addresses);
+    p += frm_addresses_end - frm_addresses;
+    memcpy(p, frm_bitmaps, frm_bitmaps_end - frm_bitmaps);
+    p += frm_bitmaps_end - frm_bitmaps;
+
+    viz_write_block(VIZ_BLOCK_FRAMES, blk_raw, (unsigned long)(p - blk_raw),
+                    (uint32_t)frm_block_frames);
+    viz_written_events += frm_block_frames;
+
+    frm_cycles_end = frm_cycles;
+    frm_tasks_end = frm_tasks;
+    frm_sets_end = frm_sets;
+    frm_addresses_end = frm_addresses;
+    frm_bitmaps_end = frm_bitmaps;
+    frm_block_frames = 0;
+    frm_prev_cycle = 0;
+}
+
+/* Encode the open frame into the block columns: the cycle it started at,
+ * the current process counts and each warrior's executed and written cells,
+ * as a sorted delta list or a bitmap, whichever is smaller */
+#ifdef NEW_STYLE
+static void viz_frame_close(void)
+#else
+static void viz_frame_close()
+#endif
+{
+    unsigned long need_addresses = 0, need_bitmaps = 0;
+    unsigned char *bitmap;
+    uint32_t *touched;
+    uint32_t address, prev;
+    long count, cells, i;
+    int kind, w;
+
+    if (!frm_open)
+        return;
+    frm_open = 0;
+
+    for (i = 0; i < 2 * warriors; i++)
+        frm_cells[i] = 0;
+    for (kind = 0; kind < 2; kind++) {
+        qsort(frm_touched[kind], frm_touched_count[kind], sizeof(uint32_t), viz_compare_cells);
+        for (i = 0; i < frm_touched_count[kind]; i++)
+            frm_cells[kind * warriors + frm_owner[kind][frm_touched[kind][i]]]++;
+    }
+    for (i = 0; i < 2 * warriors; i++) {
+        if (frm_cells[i] * VIZ_VARINT_MAX >= (long) frm_core_bytes)
+            need_bitmaps += frm_core_bytes;
+        else
+            need_addresses += frm_cells[i] * VIZ_VARINT_MAX;
+    }
+    if (frm_block_frames == frm_block_max ||
+        (unsigned long) (frm_addresses_end - frm_addresses) + need_addresses > frm_column_max ||
+        (unsigned long) (frm_bitmaps_end - frm_bitmaps) + need_bitmaps > frm_column_max)
+        viz_frame_flush();
+
+    if (!frm_block_frames)
+        frm_first_cycle = frm_cycle;
+    frm_cycles_end = viz_put_varint(frm_cycles_end, VIZ_ZIGZAG(frm_cycle - frm_prev_cycle));
+    frm_prev_cycle = frm_cycle;
+    for (w = 0; w < warriors; w++)
+        frm_tasks_end = viz_put_varint(frm_tasks_end, (uint32_t) warrior[w].tasks);
+
+    for (kind = 0; kind < 2; kind++) {
+        touched = frm_touched[kind];
+        count = frm_touched_count[kind];
+        for (w = 0; w < warriors; w++) {
+            cells = frm_cells[kind * warriors + w];
+            if (cells * VIZ_VARINT_MAX >= (long) frm_core_bytes) {
+                frm_sets_end = viz_put_varint(frm_sets_end, (uint32_t) (cells << 1 | VIZ_SET_BITMAP));
+                bitmap = frm_bitmaps_end;
+                memset(bitmap, 0, frm_core_bytes);
+                for (i = 0; i < count; i++)
+                    if (frm_owner[kind][touched[i]] == w)
+                        bitmap[touched[i] >> 3] |= (unsigned char) (1 << (touched[i] & 7));
+                frm_bitmaps_end += frm_core_bytes;
+            } else {
+                frm_sets_end = viz_put_varint(frm_sets_end, (uint32_t) (cells << 1));
+                for (i = 0, prev = 0; cells && i < count; i++)
+                    if (frm_owner[kind][address = touched[i]] == w) {
+                        frm_addresses_end = viz_put_varint(frm_addresses_end, address - prev);
+                        prev = address;
+                    }
+            }
+        }
+        frm_touched_count[kind] = 0;
+    }
+
+    frm_block_frames++;
+    frm_number++;
+    viz_event_count++;
+}
+
+/* Fold an event into the open frame, starting a new frame on the first cycle
+ * past the frame's span */
+#ifdef NEW_STYLE
+static void viz_frame_event(viz_event_type_t type, int address, int warrior_id)
+#else
+static void viz_frame_event(type, address, warrior_id)
+viz_event_type_t type;
+int address;
+int warrior_id;
+#endif
+{
+    int kind;
+
+    if (type == VIZ_EVENT_CYCLE) {
+        if (frm_open && (long) frm_cycle - cycle >= frm_span)
+            viz_frame_close();
+    } else if (type != VIZ_EVENT_EXEC && type != VIZ_EVENT_WRITE)
+        return;
+    if (!frm_open) {
+        frm_open = 1;
+        frm_cycle = (uint32_t) cycle;
+    }
+    if (type == VIZ_EVENT_CYCLE)
+        return;
+
+    kind = type == VIZ_EVENT_WRITE;
+    if (frm_stamp[kind][address] != frm_number) {
+        frm_stamp[kind][address] = frm_number;
+        frm_touched[kind][frm_touched_count[kind]++] = (uint32_t) address;
+    }
+    frm_owner[kind][address] = (unsigned short) warrior_id;
+}
+
+/* Write the warrior table and the round index as trailer blocks */
+#ifdef NEW_STYLE
+static void viz_write_trailer(void)
+#else
+static void viz_write_trailer()
+#endif
+{
+    viz_warrior_entry_t *table;
+    unsigned char *payload;
+    unsigned long table_size = warriors * sizeof(viz_warrior_entry_t);
+    unsigned long rounds_size = viz_round_count * sizeof(viz_round_t);
+    unsigned long positions_size = viz_round_count * warriors * sizeof(viz_round_warrior_t);
+    int w;
+
+    table = (viz_warrior_entry_t *) calloc(warriors, sizeof(viz_warrior_entry_t));
+    payload = (unsigned char *) malloc(rounds_size + positions_size + 1);
+    if (!table || !payload) {
+        errout("Error: Out of memory for visualization round index\n");
+        free(table);
+        free(payload);
+        return;
+    }
+
+    for (w = 0; w < warriors; w++) {
+        strncpy(table[w].name, warrior[w].name ? warrior[w].name : "", 63);
+        strncpy(table[w].author, warrior[w].authorName ? warrior[w].authorName : "", 63);
+        table[w].length = (uint32_t) warrior[w].instLen;
+        table[w].offset = (uint32_t) warrior[w].offset;
+    }
+    viz_write_block(VIZ_BLOCK_WARRIORS, (unsigned char *) table, table_size, (uint32_t) warriors);
+
+    memcpy(payload, viz_rounds, rounds_size);
+    memcpy(payload + rounds_size, viz_round_warriors, positions_size);
+    viz_write_block(VIZ_BLOCK_ROUNDS, payload, rounds_size + positions_size, (uint32_t) viz_round_count);
+
+    free(table);
+    free(payload);
+}
+
+#ifdef VIZ_THREADS
+/* Background writer: write submitted slots in order until stopped */
+#ifdef NEW_STYLE
+static void *viz_writer_main(void *unused)
+#else
+static void *viz_writer_main(unused)
+void *unused;
+#endif
+{
+    long count;
+
+    pthread_mutex_lock(&viz_lock);
+    for (;;) {
+        while (!viz_ring_count[viz_tail] && !viz_stopping)
+            pthread_cond_wait(&viz_ready, &viz_lock);
+        count = viz_ring_count[viz_tail];
+        if (!count)
+            break; /* stopping and every submitted slot is written */
+
+        pthread_mutex_unlock(&viz_lock);
+        viz_write_records(viz_ring[viz_tail], count);
+        pthread_mutex_lock(&viz_lock);
+
+        viz_ring_count[viz_tail] = 0;
+        viz_tail = (viz_tail + 1) % VIZ_RING_SLOTS;
+        pthread_cond_signal(&viz_freed);
+    }
+    pthread_mutex_unlock(&viz_lock);
+    return NULL;
+}
+#endif
+
+/* Hand the filled slot over to be written and continue in the next one.
+ * Gives up the recording and exits once a slot could not be indexed. */
+#ifdef NEW_STYLE
+static void viz_submit_slot(void)
+#else
+static void viz_submit_slot()
+#endif
+{
+    int failed;
+
+    if (!viz_slot_fill)
+        return;
+#ifdef VIZ_THREADS
+    if (viz_threaded) {
+        pthread_mutex_lock(&viz_lock);
+        viz_ring_count[viz_head] = viz_slot_fill;
+        pthread_cond_signal(&viz_ready);
+        viz_head = (viz_head + 1) % VIZ_RING_SLOTS;
+        while (viz_ring_count[viz_head]) /* writer has fallen a full ring behind */
+            pthread_cond_wait(&viz_freed, &viz_lock);
+        failed = viz_error;
+        pthread_mutex_unlock(&viz_lock);
+        viz_slot = viz_ring[viz_head];
+        viz_slot_fill = 0;
+        if (failed)
+            viz_close(); /* Does not return */
+        return;
+    }
+#endif
+    viz_write_records(viz_slot, viz_slot_fill);
+    viz_slot_fill = 0;
+    if (viz_error)
+        viz_close(); /* Does not return */
+}
+
+/* Take over stdout for -T -: the stream keeps the original descriptor and
+ * everything pMARS prints goes to stderr from now on, so neither assembly
+ * listings nor results end up in the recording. Returns 0 on failure. */
+#ifdef NEW_STYLE
+static int viz_claim_stdout(void)
+#else
+static int viz_claim_stdout()
+#endif
+{
+#ifdef VIZ_SOCKETS
+    int fd;
+
+    if (viz_stdout)
+        return 1;
+    fflush(stdout);
+    fd = dup(fileno(stdout));
+    if (fd < 0 || !(viz_stdout = fdopen(fd, "wb")))
+        return 0;
+    dup2(fileno(stderr), fileno(stdout));
+#else
+    viz_stdout = stdout;
+#endif
+    return 1;
+}
+
+/* Open the recording target: "-" for stdout, "unix:PATH" to connect to a
+ * listening Unix socket, otherwise a file or FIFO. The library records into
+ * a memory buffer (viz_memory) whatever the name, for pmars_recording(). */
+#ifdef NEW_STYLE
+static FILE *viz_open_target(char *target)
+#else
+static FILE *viz_open_target(target)
+char *target;
+#endif
+{
+#ifdef VIZ_SOCKETS
+    struct sockaddr_un addr;
+    FILE *stream;
+    int fd;
+#endif
+
+#ifdef PMARSLIB
+    free(viz_memory);
+    viz_memory = NULL;
+    viz_memory_size = 0;
+    return open_memstream(&viz_memory, &viz_memory_size);
+#endif
+    if (!strcmp(target, "-"))
+        return viz_stdout;
+    if (strncmp(target, "unix:", 5))
+        return fopen(target, "wb");
+#ifdef VIZ_SOCKETS
+    memset(&addr, 0, sizeof(addr));
+    addr.sun_family = AF_UNIX;
+    strncpy(addr.sun_path, target + 5, sizeof(addr.sun_path) - 1);
+    fd = socket(AF_UNIX, SOCK_STREAM, 0);
+    if (fd < 0)
+        return NULL;
+    if (connect(fd, (struct sockaddr *) &addr, sizeof(addr)) < 0 || !(stream = fdopen(fd, "wb"))) {
+        close(fd);
+        return NULL;
+    }
+    return stream;
+#else
+    return NULL;
+#endif
+}
+
+/* Event types named in a comma-separated list, each "all" or one of
+ * viz_event_names; 0 if any name is not */
+#ifdef NEW_STYLE
+static unsigned viz_event_list(char *list)
+#else
+static unsigned viz_event_list(list)
+char *list;
+#endif
+{
+    unsigned filter = 0;
+    char *name = list;
+    size_t len;
+    int i;
+
+    do {
+        len = strcspn(name, ",");
+        if (len == 3 && !strncmp(name, "all", 3))
+            filter |= VIZ_MASK_ALL;
+        else {
+            for (i = 0; i <= VIZ_EVENT_PUSH; i++)
+                if (strlen(viz_event_names[i]) == len && !strncmp(name, viz_event_names[i], len))
+                    break;
+            if (i > VIZ_EVENT_PUSH)
+                return 0;
+            filter |= VIZ_MASK(i);
+        }
+        name += len;
+    } while (*name++);
+    return filter;
+}
+
+/* Split an optional event list off the -T argument ("file.viz:exec,write")
+ * and select those event types, or all of them without a list. The part
+ * after the last ':' is only a list when every name in it is an event type;
+ * otherwise it belongs to the file name, as does the ':' of "unix:PATH".
+ * Returns 0 when stdout cannot be claimed for "-". */
+#ifdef NEW_STYLE
+int viz_parse_target(char *target)
+#else
+int viz_parse_target(target)
+char *target;
+#endif
+{
+    char *name = strncmp(target, "unix:", 5) ? target : target + 5;
+    char *list = strrchr(name, ':');
+    unsigned filter;
+
+    viz_filter = VIZ_MASK_ALL;
+    if (list && list != name && (filter = viz_event_list(list + 1))) {
+        *list = '\0';
+        viz_filter = filter;
+    }
+    return strcmp(target, "-") || viz_claim_stdout();
+}
+
+/* Parse the -Z cycle window "X-Y" (or "X..Y"), in the simulator's cycle
+ * counter as stored in the recording. Returns 0 if malformed. */
+#ifdef NEW_STYLE
+int viz_parse_window(char *window)
+#else
+int viz_parse_window(window)
+char *window;
+#endif
+{
+    char *end;
+    long lo, hi;
+
+    lo = strtol(window, &end, 10);
+    if (end == window || (*end != '-' && *end != '.'))
+        return 0;
+    window = end + (end[0] == '.' && end[1] == '.' ? 2 : 1);
+    hi = strtol(window, &end, 10);
+    if (end == window || *end || lo < 0 || hi < 0)
+        return 0;
+    if (lo > hi) {
+        viz_window_lo = hi;
+        viz_window_hi = lo;
+    } else {
+        viz_window_lo = lo;
+        viz_window_hi = hi;
+    }
+    return viz_window_hi > 0;
+}
 
 /* Initialize visualization recording */
 #ifdef NEW_STYLE
@@ -23,20 +912,41 @@ void viz_init()
     if (!SWITCH_R)
         return;
 
-    viz_file = fopen(SWITCH_R, "wb");
+    viz_file = viz_open_target(SWITCH_R);
     if (!viz_file) {
         errout("Error: Cannot open visualization file for writing\n");
+        viz_filter = 0;
         return;
     }
 
+    /* Pipes, FIFOs and sockets cannot seek back to complete the header, and
+     * their readers find events by block, so they are always recorded in a
+     * block format. A reader that goes away must not end the battle. */
+    viz_live = fseek(viz_file, 0L, SEEK_CUR) != 0;
+#ifdef VIZ_SOCKETS
+    if (viz_live)
+        signal(SIGPIPE, SIG_IGN);
+#endif
+
     /* Initialize header */
     memset(&viz_header, 0, sizeof(viz_header_t));
     strcpy(viz_header.magic, "PMARSREC");
-    viz_header.version = 1;
+    viz_header.version = SWITCH_Y >= VIZ_VERSION_BLOCKS && SWITCH_Y <= VIZ_VERSION_FRAMES ? SWITCH_Y : VIZ_VERSION_FLAT;
+    if (viz_live && viz_header.version == VIZ_VERSION_FLAT)
+        viz_header.version = VIZ_VERSION_BLOCKS;
     viz_header.core_size = coreSize;
     viz_header.total_cycles = cycles;
     viz_header.total_events = 0; /* Will be filled at close */
 
+    if (!viz_alloc()) {
+        errout("Error: Out of memory for visualization recording\n");
+        viz_free();
+        fclose(viz_file);
+        viz_file = NULL;
+        viz_filter = 0;
+        return;
+    }
+
     /* Set warrior names and starting positions */
     if (warriors >= 1) {
         strncpy(viz_header.warrior1_name, warrior[0].name ? warrior[0].name : "Warrior1", 63);
@@ -50,31 +960,182 @@ void viz_init()
     }
     /* Write header (will be updated at close) */
     fwrite(&viz_header, sizeof(viz_header_t), 1, viz_file);
+    viz_offset = sizeof(viz_header_t);
     viz_event_count = 0;
+
+    if (viz_header.version == VIZ_VERSION_FRAMES) {
+        /* Frames only need executions, writes and the cycle counter, which
+         * counts down once per warrior turn */
+        viz_filter = (viz_filter & VIZ_MASK_FRAMES) | VIZ_MASK(VIZ_EVENT_CYCLE);
+        frm_span = SWITCH_K * warriors;
+    }
+    viz_mask = viz_filter;
+
+#ifdef VIZ_THREADS
+    viz_stopping = 0;
+    viz_threaded = viz_header.version != VIZ_VERSION_FRAMES &&
+                   pthread_create(&viz_writer, NULL, viz_writer_main, NULL) == 0;
+#endif
 }
 
-/* Close visualization recording and update header */
+/* Close visualization recording and update header. When the block index
+ * ran out of memory the recording is abandoned and pMARS exits instead. */
 #ifdef NEW_STYLE
 void viz_close(void)
 #else
 void viz_close()
 #endif
 {
+    uint64_t index_offset;
+
     if (!viz_file)
         return;
+    viz_filter = viz_mask = 0;
+
+    /* Write out the partial last slot and wait for the writer to drain */
+    if (viz_error)
+        viz_slot_fill = 0;
+    else if (viz_header.version == VIZ_VERSION_FRAMES) {
+        viz_frame_close();
+        viz_frame_flush();
+    } else
+        viz_submit_slot();
+#ifdef VIZ_THREADS
+    if (viz_threaded) {
+        pthread_mutex_lock(&viz_lock);
+        viz_stopping = 1;
+        pthread_cond_signal(&viz_ready);
+        pthread_mutex_unlock(&viz_lock);
+        pthread_join(viz_writer, NULL);
+        viz_threaded = 0;
+    }
+#endif
+    if (viz_error) {
+        viz_error = 0;
+        viz_free();
+        if (viz_file == viz_stdout)
+            viz_stdout = NULL;
+        fclose(viz_file);
+        viz_file = NULL;
+        errout("Error: Out of memory for visualization block index\n");
+        Exit(MEMERR);
+    }
+
+    /* Append the block index, then the trailer. In v1 the trailer takes the
+     * index's place in the header, marking the end of the events. */
+    index_offset = viz_offset;
+    if (viz_header.version >= VIZ_VERSION_BLOCKS)
+        viz_write_block(VIZ_BLOCK_INDEX, (unsigned char *) viz_index,
+                        viz_index_count * sizeof(viz_index_entry_t), 0);
+    viz_write_trailer();
+    viz_header.index_offset[0] = (uint32_t)(index_offset & 0xFFFFFFFFUL);
+    viz_header.index_offset[1] = (uint32_t)(index_offset >> 32);
+
+    /* The header shows the first round's positions */
+    if (viz_round_count && warriors >= 1)
+        viz_header.warrior1_start = viz_round_warriors[0].position;
+    if (viz_round_count && warriors >= 2)
+        viz_header.warrior2_start = viz_round_warriors[1].position;
+    viz_free();
 
     /* Update header with final event count */
     viz_header.total_events = viz_event_count;
-    
-    /* Seek to beginning and rewrite header */
-    fseek(viz_file, 0, SEEK_SET);
-    fwrite(&viz_header, sizeof(viz_header_t), 1, viz_file);
-    
+
+    /* Seek to beginning and rewrite header. A live stream ends with the
+     * index and trailer instead. */
+    if (!viz_live) {
+        fseek(viz_file, 0, SEEK_SET);
+        fwrite(&viz_header, sizeof(viz_header_t), 1, viz_file);
+        fseek(viz_file, (long)viz_offset, SEEK_SET); /* A memory stream ends where it is closed */
+    }
+
+    if (ferror(viz_file))
+        errout("Error: Visualization recording incomplete, write failed\n");
+    if (viz_file == viz_stdout)
+        viz_stdout = NULL;
     fclose(viz_file);
     viz_file = NULL;
 }
 
-/* Log a generic event */
+/* Start of a round, once the warriors are positioned: add its entry to the
+ * round index */
+#ifdef NEW_STYLE
+void viz_begin_round(void)
+#else
+void viz_begin_round()
+#endif
+{
+    viz_round_t *entry;
+    viz_round_warrior_t *positions;
+    int w;
+
+    if (!viz_file)
+        return;
+    if (viz_round_count == viz_round_max) {
+        entry = (viz_round_t *) realloc(viz_rounds, 2 * viz_round_max * sizeof(viz_round_t));
+        if (entry)
+            viz_rounds = entry;
+        positions = (viz_round_warrior_t *)
+            realloc(viz_round_warriors, 2 * viz_round_max * warriors * sizeof(viz_round_warrior_t));
+        if (positions)
+            viz_round_warriors = positions;
+        if (!entry || !positions) {
+            errout("Error: Out of memory for visualization round index\n");
+            Exit(MEMERR);
+        }
+        viz_round_max *= 2;
+    }
+
+    entry = &viz_rounds[viz_round_count];
+    entry->first_event = (uint64_t)viz_event_count;
+    entry->event_count = 0;
+    entry->round = (uint32_t)sim_round;
+    entry->survivors = (uint32_t)warriors;
+    entry->end_cycle = 0;
+    entry->starter = (uint32_t)(W - warrior);
+    positions = &viz_round_warriors[viz_round_count * warriors];
+    for (w = 0; w < warriors; w++) {
+        positions[w].position = (uint32_t)warrior[w].position;
+        positions[w].tasks = 1;
+    }
+    viz_round_count++;
+}
+
+/* End of a round: close the open frame so its process counts are final and
+ * record the round's outcome. Live streams also hand out the round's last
+ * events right away. */
+#ifdef NEW_STYLE
+void viz_end_round(void)
+#else
+void viz_end_round()
+#endif
+{
+    viz_round_t *entry;
+    viz_round_warrior_t *positions;
+    int w;
+
+    if (!viz_file)
+        return;
+    if (viz_header.version == VIZ_VERSION_FRAMES) {
+        viz_frame_close();
+        if (viz_live)
+            viz_frame_flush();
+    } else if (viz_live)
+        viz_submit_slot();
+    if (!viz_round_count)
+        return;
+
+    entry = &viz_rounds[viz_round_count - 1];
+    entry->event_count = (uint64_t)viz_event_count - entry->first_event;
+    entry->survivors = (uint32_t)warriorsLeft;
+    entry->end_cycle = (uint32_t)cycle;
+    positions = &viz_round_warriors[(viz_round_count - 1) * warriors];
+    for (w = 0; w < warriors; w++)
+        positions[w].tasks = (uint32_t)warrior[w].tasks;
+}
+
+/* Log a generic event: only stored in the current slot, which is written
+ * out in one piece when full. Types outside viz_mask are dropped. */
 #ifdef NEW_STYLE
 void viz_log_event(viz_event_type_t type, int address, int warrior_id, uint32_t data)
 #else
@@ -85,22 +1146,25 @@ int warrior_id;
 uint32_t data;
 #endif
 {
-    viz_event_t event;
-    
-    if (!viz_file)
-        return;
+    viz_record_t *record;
 
-    event.cycle = cycle;
-    event.address = (uint16_t)address;
-    event.event_type = (uint16_t)type;
-    event.warrior_id = (uint8_t)warrior_id;
-    event.padding1 = 0;
-    event.padding2 = 0;
-    event.padding3 = 0;
-    event.data = data;
+    if (!VIZ_ON(type))
+        return;
+    if (viz_header.version == VIZ_VERSION_FRAMES) {
+        viz_frame_event(type, address, warrior_id);
+        return;
+    }
 
-    fwrite(&event, sizeof(viz_event_t), 1, viz_file);
+    record = &viz_slot[viz_slot_fill];
+    record->cycle = (uint32_t)cycle;
+    record->address = (uint32_t)address;
+    record->data = data;
+    record->type = (uint16_t)type;
+    record->warrior_id = (uint8_t)warrior_id;
     viz_event_count++;
+
+    if (++viz_slot_fill == viz_slot_max)
+        viz_submit_slot();
 }
 
 /* Log instruction execution */
@@ -22,40 +22,160 @@ typedef enum {
     VIZ_EVENT_PUSH = 9      /* Task queue push */
 } viz_event_type_t;
 
-/* Binary file header (160 bytes) */
+/* Format versions: v1 is a flat array of viz_event_t, v2 a sequence of
+ * compressed blocks (viz_block_t) followed by a block index, v3 the same
+ * container holding aggregated frames instead of events */
+#define VIZ_VERSION_FLAT 1
+#define VIZ_VERSION_BLOCKS 2
+#define VIZ_VERSION_FRAMES 3
+
+/* Binary file header (168 bytes) */
 typedef struct {
     char magic[8];           /* "PMARSREC" */
-    uint32_t version;        /* Format version (1) */
+    uint32_t version;        /* Format version (1, 2 or 3) */
     uint32_t core_size;      /* Memory size */
     uint32_t total_cycles;   /* Battle length */
-    uint32_t total_events;   /* Number of events (filled at end) */
-    char warrior1_name[64];  /* Warrior names (64 chars each) */
-    char warrior2_name[64]; 
-    uint32_t warrior1_start; /* Starting positions */
+    uint32_t total_events;   /* Number of events, frames in v3 (filled at end) */
+    char warrior1_name[64];  /* First two warriors (64 chars each), see the */
+    char warrior2_name[64];  /* warrior table for all of them */
+    uint32_t warrior1_start; /* Starting positions in the first round */
     uint32_t warrior2_start;
-    uint32_t reserved[2];    /* Future use */
+    uint32_t index_offset[2]; /* v2/v3: file offset of the block index, v1: of
+                              * the trailer (low, high word), 0 if the
+                              * recording was not closed */
 } viz_header_t;
 
 /* Event record (16 bytes each) - properly aligned with uint16_t event_type */
 typedef struct {
     uint32_t cycle;          /* Cycle number (4 bytes) */
-    uint16_t address;        /* Memory address (2 bytes) */
+    uint16_t address;        /* Memory address, low 16 bits (2 bytes) */
     uint16_t event_type;     /* viz_event_type_t (2 bytes) */
-    uint8_t warrior_id;      /* 0 or 1 (1 byte) */
+    uint8_t warrior_id;      /* Warrior index (1 byte) */
     uint8_t padding1;        /* Padding byte (1 byte) */
-    uint8_t padding2;        /* Padding byte (1 byte) */
-    uint8_t padding3;        /* Padding byte (1 byte) */
+    uint16_t address_high;   /* Memory address, high 16 bits: 0 in cores of
+                              * up to 65536 cells, which older readers
+                              * treated as padding (2 bytes) */
     uint32_t data;           /* Context-specific data (4 bytes) */
 } viz_event_t;               /* Total: 16 bytes */
 
+/* v2 block kinds and codecs */
+#define VIZ_BLOCK_EVENTS 0       /* Encoded events, see viz_log_event */
+#define VIZ_BLOCK_INDEX 1        /* Array of viz_index_entry_t */
+#define VIZ_BLOCK_FRAMES 2       /* Encoded frames, see viz_frame_close */
+
+#define VIZ_CODEC_STORED 0
+#define VIZ_CODEC_ZLIB 1
+#define VIZ_CODEC_LZMA 2         /* Read by viz_format.py, never written here */
+
+#define VIZ_BLOCK_MAX_EVENTS 65536L /* Events per v2 block */
+#define VIZ_BLOCK_MAX_FRAMES 4096L  /* Frames per v3 block */
+
+/* v2 block header (16 bytes), followed by stored_size bytes of payload.
+ *
+ * An event block payload (after decompression) is a set of columns:
+ *   varint events, groups, and the byte lengths of the four varint columns
+ *   group cycles   zigzag varint delta from the previous group's cycle
+ *   group counts   varint number of events sharing that cycle
+ *   tags           one byte per event: type | VIZ_TAG_* flags
+ *   warriors       one byte per event
+ *   addresses      zigzag varint delta from the previous stored address,
+ *                  only for events without VIZ_TAG_NO_ADDRESS
+ *   data           varint, only for events with VIZ_TAG_DATA_VARINT
+ * Deltas start from 0 in every block, so blocks decode independently. */
+typedef struct {
+    uint8_t kind;            /* VIZ_BLOCK_* */
+    uint8_t codec;           /* VIZ_CODEC_* */
+    uint16_t flags;          /* Reserved (0) */
+    uint32_t stored_size;    /* Payload bytes in the file */
+    uint32_t raw_size;       /* Payload bytes after decompression */
+    uint32_t event_count;    /* Events in an event block, 0 otherwise */
+} viz_block_t;
+
+#define VIZ_TAG_TYPE 0x0F        /* viz_event_type_t */
+#define VIZ_TAG_DATA_CYCLE 0x10  /* data equals the cycle */
+#define VIZ_TAG_DATA_VARINT 0x20 /* data stored in the data column (else 0) */
+#define VIZ_TAG_NO_ADDRESS 0x40  /* address is 0 and not stored */
+
+/* A v3 frame block payload (after decompression) aggregates -K cycles per
+ * frame instead of storing events:
+ *   varint frames, warriors, and the byte lengths of the five columns
+ *   cycles     zigzag varint delta from the previous frame's cycle counter
+ *              at the start of the frame
+ *   tasks      varint process count per warrior at the end of the frame
+ *   sets       varint per frame, kind (executed, then written) and warrior:
+ *              cells << 1 | VIZ_SET_BITMAP
+ *   addresses  for list sets, varint deltas of the ascending cell addresses
+ *              (starting from 0 in every set)
+ *   bitmaps    for bitmap sets, (core_size + 7) / 8 bytes, cell n in bit
+ *              n % 8 of byte n / 8
+ * A cell is in the set of the warrior that executed (or wrote) it last in
+ * the frame. Deltas start from 0 in every block. */
+#define VIZ_SET_BITMAP 1
+
+/* Block index entry (24 bytes), one per event block */
+typedef struct {
+    uint64_t offset;         /* File offset of the viz_block_t */
+    uint64_t first_event;    /* Number of events before this block */
+    uint32_t event_count;
+    uint32_t first_cycle;    /* Cycle of the block's first event */
+} viz_index_entry_t;
+
+/* Trailer blocks, written when the recording is closed. They follow the
+ * block index in v2/v3 and the last event in v1. Their event_count holds the
+ * number of entries. */
+#define VIZ_BLOCK_WARRIORS 3     /* Array of viz_warrior_entry_t */
+#define VIZ_BLOCK_ROUNDS 4       /* Array of viz_round_t, followed by one
+                                  * viz_round_warrior_t per round and warrior */
+
+/* Warrior table entry (136 bytes), one per loaded warrior. Events store the
+ * warrior index in one byte, so only v3 frames tell more than 256 apart. */
+typedef struct {
+    char name[64];
+    char author[64];
+    uint32_t length;         /* Instructions */
+    uint32_t offset;         /* Entry point relative to the first instruction */
+} viz_warrior_entry_t;
+
+/* Round index entry (32 bytes), one per round played */
+typedef struct {
+    uint64_t first_event;    /* Events (frames in v3) recorded before the round */
+    uint64_t event_count;    /* Events recorded during the round */
+    uint32_t round;          /* Round number, from 1 */
+    uint32_t survivors;      /* Warriors alive at the end of the round */
+    uint32_t end_cycle;      /* Cycle counter at the end, 0 if time ran out */
+    uint32_t starter;        /* Warrior that moved first */
+} viz_round_t;
+
+typedef struct {
+    uint32_t position;       /* Load position in this round */
+    uint32_t tasks;          /* Processes left at the end, 0 if it died */
+} viz_round_warrior_t;
+
+/* Event type bits for the recording filter (-T file:exec,write,...) */
+#define VIZ_MASK(type) (1u << (type))
+#define VIZ_MASK_ALL (VIZ_MASK(VIZ_EVENT_PUSH + 1) - 1)
+#define VIZ_MASK_FRAMES (VIZ_MASK(VIZ_EVENT_EXEC) | VIZ_MASK(VIZ_EVENT_WRITE) | VIZ_MASK(VIZ_EVENT_CYCLE))
+
 /* Global variables */
 extern FILE *viz_file;       /* File handle for recording */
 extern long viz_event_count; /* Number of events recorded */
+extern unsigned viz_filter;  /* Event types selected with -T, 0 if not recording */
+extern unsigned viz_mask;    /* Event types recorded this cycle */
+extern long viz_window_lo;   /* Cycle window selected with -Z, */
+extern long viz_window_hi;   /* viz_window_hi is 0 without one */
+#ifdef PMARSLIB
+extern char *viz_memory;     /* Last recording, held in memory by the library */
+extern size_t viz_memory_size;
+#endif
 
 /* Function prototypes */
 #ifdef NEW_STYLE
+int viz_parse_target(char *target);
+int viz_parse_window(char *window);
 void viz_init(void);
 void viz_close(void);
+void viz_begin_round(void);
+void viz_end_round(void);
 void viz_log_event(viz_event_type_t type, int address, int warrior_id, uint32_t data);
 void viz_log_exec(int address);
 void viz_log_read(int address);
@@ -68,8 +188,12 @@ void viz_log_die(int warrior_id);
 void viz_log_cycle(void);
 void viz_log_push(int value);
 #else
+int viz_parse_target();
+int viz_parse_window();
 void viz_init();
 void viz_close();
+void viz_begin_round();
+void viz_end_round();
 void viz_log_event();
 void viz_log_exec();
 void viz_log_read();
@@ -83,16 +207,21 @@ void viz_log_cycle();
 void viz_log_push();
 #endif
 
-/* Macros for conditional logging */
-#define VIZ_EXEC(addr)        do { if (SWITCH_R) viz_log_event(VIZ_EVENT_EXEC, addr, W - warrior, memory[addr].opcode); } while(0)
-#define VIZ_READ(addr)        do { if (SWITCH_R) viz_log_event(VIZ_EVENT_READ, addr, W - warrior, 0); } while(0)
-#define VIZ_WRITE(addr)       do { if (SWITCH_R) viz_log_event(VIZ_EVENT_WRITE, addr, W - warrior, (memory[addr].A_value << 16) | memory[addr].B_value); } while(0)
-#define VIZ_DEC(addr)         do { if (SWITCH_R) viz_log_event(VIZ_EVENT_DEC, addr, W - warrior, 0); } while(0)
-#define VIZ_INC(addr)         do { if (SWITCH_R) viz_log_event(VIZ_EVENT_INC, addr, W - warrior, 0); } while(0)
-#define VIZ_SPL(wid, tasks)   do { if (SWITCH_R) viz_log_event(VIZ_EVENT_SPL, progCnt, wid, tasks); } while(0)
-#define VIZ_DAT(addr, wid, tasks) do { if (SWITCH_R) viz_log_event(VIZ_EVENT_DAT, addr, wid, tasks); } while(0)
-#define VIZ_DIE(wid)          do { if (SWITCH_R) viz_log_event(VIZ_EVENT_DIE, 0, wid, 0); } while(0)
-#define VIZ_CYCLE()           do { if (SWITCH_R) viz_log_event(VIZ_EVENT_CYCLE, 0, W - warrior, cycle); } while(0)
-#define VIZ_PUSH(val)         do { if (SWITCH_R) viz_log_event(VIZ_EVENT_PUSH, val, W - warrior, 0); } while(0)
+/* Macros for conditional logging: a filtered-out event type costs one test
+ * of viz_mask, which is 0 when not recording or outside the cycle window */
+#define VIZ_ON(type)          (viz_mask & VIZ_MASK(type))
+#define VIZ_WINDOW()          do { if (viz_window_hi) viz_mask = cycle >= viz_window_lo && cycle <= viz_window_hi ? viz_filter : 0; } while(0)
+#define VIZ_EXEC(addr)        do { if (VIZ_ON(VIZ_EVENT_EXEC)) viz_log_event(VIZ_EVENT_EXEC, addr, W - warrior, memory[addr].opcode); } while(0)
+#define VIZ_READ(addr)        do { if (VIZ_ON(VIZ_EVENT_READ)) viz_log_event(VIZ_EVENT_READ, addr, W - warrior, 0); } while(0)
+#define VIZ_WRITE(addr)       do { if (VIZ_ON(VIZ_EVENT_WRITE)) viz_log_event(VIZ_EVENT_WRITE, addr, W - warrior, (memory[addr].A_value << 16) | memory[addr].B_value); } while(0)
+#define VIZ_DEC(addr)         do { if (VIZ_ON(VIZ_EVENT_DEC)) viz_log_event(VIZ_EVENT_DEC, addr, W - warrior, 0); } while(0)
+#define VIZ_INC(addr)         do { if (VIZ_ON(VIZ_EVENT_INC)) viz_log_event(VIZ_EVENT_INC, addr, W - warrior, 0); } while(0)
+#define VIZ_SPL(wid, tasks)   do { if (VIZ_ON(VIZ_EVENT_SPL)) viz_log_event(VIZ_EVENT_SPL, progCnt, wid, tasks); } while(0)
+#define VIZ_DAT(addr, wid, tasks) do { if (VIZ_ON(VIZ_EVENT_DAT)) viz_log_event(VIZ_EVENT_DAT, addr, wid, tasks); } while(0)
+#define VIZ_DIE(wid)          do { if (VIZ_ON(VIZ_EVENT_DIE)) viz_log_event(VIZ_EVENT_DIE, 0, wid, 0); } while(0)
+#define VIZ_CYCLE()           do { VIZ_WINDOW(); if (VIZ_ON(VIZ_EVENT_CYCLE)) viz_log_event(VIZ_EVENT_CYCLE, 0, W - warrior, cycle); } while(0)
+#define VIZ_PUSH(val)         do { if (VIZ_ON(VIZ_EVENT_PUSH)) viz_log_event(VIZ_EVENT_PUSH, val, W - warrior, 0); } while(0)
+#define VIZ_ROUND_START()     do { if (viz_filter) viz_begin_round(); } while(0)
+#define VIZ_ROUND_END()       do { if (viz_filter) viz_end_round(); } while(0)
 
 #endif /* VISUALIZER_H */
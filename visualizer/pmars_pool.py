@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+pMARS match servers
+Plays matches on long-running `pmars --serve` processes, which keep their
+core and task queue allocated between matches (see src/serve.c). A
+ServerPool spreads matches over several of them for hills and tournaments.
+"""
+
+import os
+import queue
+import socket
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from pmars_sim import SimResult, SimulationError
+from viz_format import VIZ_EVENT_DTYPE
+
+PMARS_ENV = 'PMARS'             # Path of the pmars program, if not in ../src
+PMARS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src', 'pmars')
+
+def request_line(warrior_files: Sequence[str], rounds: int, options: Sequence[str]) -> str:
+    """One --serve request: the options and warriors of a match"""
+    words = ['-r', str(rounds)] + [str(option) for option in options] + [str(f) for f in warrior_files]
+    for word in words:
+        if '"' in word or '\n' in word:
+            raise ValueError(f"cannot pass {word!r} to pmars --serve")
+    return ' '.join(f'"{word}"' if not word or any(c in word for c in ' \t') else word for word in words) + '\n'
+
+class MatchServer:
+    """One pmars --serve process, or a connection to one listening on a
+    Unix socket (address 'unix:PATH'). Plays one match at a time."""
+
+    def __init__(self, pmars: Optional[str] = None, address: Optional[str] = None, quiet: bool = True):
+        self.process = None
+        if address:
+            if not address.startswith('unix:'):
+                raise ValueError(f"not a unix:PATH address: {address}")
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address[5:])
+            self.requests = self.socket.makefile('w')
+            self.replies = self.socket.makefile('r')
+        else:
+            self.socket = None
+            self.process = subprocess.Popen(
+                [pmars or os.environ.get(PMARS_ENV) or PMARS_PATH, '--serve'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL if quiet else None,   # assembly errors and warnings
+                text=True, bufsize=1)
+            self.requests = self.process.stdin
+            self.replies = self.process.stdout
+
+    def play(self, warrior_files: Sequence[str], rounds: int = 1, options: Sequence[str] = ()) -> SimResult:
+        """Play a match; options are further pmars command line options"""
+        self.requests.write(request_line(warrior_files, rounds, options))
+        self.requests.flush()
+        reply = self.replies.readline().split()
+        if not reply:
+            raise SimulationError("pmars --serve went away")
+        if reply[0] != 'ok':
+            raise SimulationError(f"pmars failed with error code {reply[1]}")
+
+        count = int(reply[1])
+        names, scores, results = [], [], []
+        for _ in range(count):
+            fields = self.replies.readline().rstrip('\n').split(' ', 2 * count)
+            scores.append(int(fields[0]))
+            results.append([int(n) for n in fields[1:2 * count]])
+            names.append(fields[2 * count] if len(fields) > 2 * count else '')
+        return SimResult(warriors=names, scores=np.array(scores, dtype=np.int64),
+                         results=np.array(results, dtype=np.int64).reshape(count, 2 * count - 1),
+                         header=None, battle=None, events=np.empty(0, dtype=VIZ_EVENT_DTYPE))
+
+    def close(self):
+        self.requests.close()
+        self.replies.close()
+        if self.socket:
+            self.socket.close()
+        if self.process:
+            self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ServerPool:
+    """A pool of pmars --serve processes; matches run on whichever is idle"""
+
+    def __init__(self, workers: Optional[int] = None, pmars: Optional[str] = None, quiet: bool = True):
+        self.workers = workers or os.cpu_count() or 1
+        self.servers = [MatchServer(pmars, quiet=quiet) for _ in range(self.workers)]
+        self.idle = queue.Queue()
+        for server in self.servers:
+            self.idle.put(server)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def play(self, warrior_files: Sequence[str], rounds: int = 1, options: Sequence[str] = ()) -> SimResult:
+        server = self.idle.get()
+        try:
+            return server.play(warrior_files, rounds, options)
+        finally:
+            self.idle.put(server)
+
+    def submit(self, warrior_files: Sequence[str], rounds: int = 1, options: Sequence[str] = ()):
+        """Queue a match; returns a concurrent.futures.Future of its SimResult"""
+        return self.executor.submit(self.play, warrior_files, rounds, options)
+
+    def map(self, matches: Iterable[Sequence[str]], rounds: int = 1, options: Sequence[str] = ()) -> List[SimResult]:
+        """Play every match (a list of warrior files each) with the same
+        settings; results in the order of matches"""
+        futures = [self.submit(files, rounds, options) for files in matches]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown()
+        for server in self.servers:
+            server.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+In-process pMARS simulation
+Plays matches through the shared library built with `make lib` in src/ and
+returns scores and recorded events as NumPy arrays, without starting pmars
+or writing a .viz file (see src/libpmars.c)
+"""
+
+import ctypes
+import io
+import os
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from viz_format import (HEADER_SIZE, VIZ_EVENT_DTYPE, VIZ_FLAT_EVENT_DTYPE, VizHeader, VizBattle, read_header,
+                        read_battle, events_from_flat)
+
+LIBRARY_ENV = 'PMARS_LIBRARY'   # Path of libpmars.so, if not next to the pmars sources
+LIBRARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src', 'libpmars.so')
+
+_library = None
+_lock = threading.Lock()        # The simulator keeps its state in globals
+
+class SimulationError(Exception):
+    """pMARS rejected the options or a warrior, or failed during the match"""
+
+@dataclass
+class SimResult:
+    """Outcome of a match played by simulate()"""
+    warriors: List[str]
+    scores: np.ndarray          # Score per warrior by the -= formula
+    results: np.ndarray         # (warriors, 2 * warriors - 1): rounds survived with 1..warriors
+                                # survivors, then deaths by order
+    header: Optional[VizHeader] # None without recording
+    battle: Optional[VizBattle]
+    events: np.ndarray          # VIZ_EVENT_DTYPE, empty without recording
+
+def load_library(path: Optional[str] = None) -> ctypes.CDLL:
+    """Load libpmars.so once: from path, $PMARS_LIBRARY or ../src"""
+    global _library
+    if _library is not None and path is None:
+        return _library
+    library = ctypes.CDLL(path or os.environ.get(LIBRARY_ENV) or LIBRARY_PATH)
+    library.pmars_run.argtypes = [ctypes.c_int, ctypes.POINTER(ctypes.c_char_p)]
+    library.pmars_run.restype = ctypes.c_int
+    library.pmars_warriors.restype = ctypes.c_int
+    library.pmars_name.argtypes = [ctypes.c_int]
+    library.pmars_name.restype = ctypes.c_char_p
+    library.pmars_score.argtypes = [ctypes.c_int]
+    library.pmars_score.restype = ctypes.c_int
+    library.pmars_results.argtypes = [ctypes.POINTER(ctypes.c_int)]
+    library.pmars_recording.argtypes = [ctypes.POINTER(ctypes.c_long)]
+    library.pmars_recording.restype = ctypes.c_void_p
+    library.pmars_release.restype = None
+    _library = library
+    return library
+
+def simulate(warrior_files: Sequence[str], rounds: int = 1, events: Optional[str] = 'all',
+             options: Sequence[str] = ()) -> SimResult:
+    """Play a match in this process.
+
+    options are further pmars command line options (e.g. ['-s', '8000',
+    '-F', '3000']). events selects the recorded event types like the list
+    after -T (e.g. 'exec,write,die'); None records nothing. Events go
+    through the same recording path as pmars -T and come back as one
+    VIZ_EVENT_DTYPE array, with the round index in battle.
+    """
+    library = load_library()
+    argv = ['pmars', '-r', str(rounds)] + list(options)
+    if events:
+        argv += ['-T', f"memory:{events}", '-Y', '1']  # Flat events need no decoding
+    argv += list(warrior_files)
+
+    with _lock:
+        args = (ctypes.c_char_p * (len(argv) + 1))(*[arg.encode() for arg in argv], None)  # argv[argc] is NULL
+        code = library.pmars_run(len(argv), args)
+        try:
+            if code:
+                raise SimulationError(f"pmars failed with error code {code}")
+            count = library.pmars_warriors()
+            names = [library.pmars_name(w).decode('ascii', 'replace') for w in range(count)]
+            scores = np.array([library.pmars_score(w) for w in range(count)], dtype=np.int64)
+            results = (ctypes.c_int * (count * max(1, 2 * count - 1)))()
+            library.pmars_results(results)
+            results = np.array(results, dtype=np.int64).reshape(count, -1)[:, :2 * count - 1]
+
+            size = ctypes.c_long()
+            pointer = library.pmars_recording(ctypes.byref(size))
+            recording = ctypes.string_at(pointer, size.value) if pointer and size.value else b''
+        finally:
+            library.pmars_release()
+
+    header = battle = None
+    event_array = np.empty(0, dtype=VIZ_EVENT_DTYPE)
+    if recording:
+        f = io.BytesIO(recording)
+        header = read_header(f)
+        battle = read_battle(f, header)
+        flat = np.frombuffer(recording, dtype=VIZ_FLAT_EVENT_DTYPE, count=header.total_events, offset=HEADER_SIZE)
+        event_array = events_from_flat(flat)
+    return SimResult(warriors=names, scores=scores, results=results, header=header, battle=battle,
+                     events=event_array)
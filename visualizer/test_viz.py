@@ -4,10 +4,22 @@ CoreWar Visualization File Inspector
 Analyzes .viz files to verify format and display battle information
 """
 
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
 import struct
 import sys
 import os
 
+import numpy as np
+
+from viz_format import (HEADER_SIZE, EVENT_SIZE, VERSION_BLOCKS, VERSION_FRAMES, VizEventType, iter_event_chunks,
+                        read_header, read_block_index, read_battle, load_frames, count_events, trailer_offset,
+                        load_summary, read_summary, last_per_address)
+
 # Event type mapping for better readability (matches visualizer.h)
 EVENT_TYPES = {
     0: "EXEC",      # Instruction execution
@@ -22,6 +34,10 @@ EVENT_TYPES = {
     9: "PUSH"       # Task queue push
 }
 
+ANALYTICS_SAMPLES = 100     # Points in the ownership and process series
+HEATMAP_BINS = 256          # Address bins of the write heatmap
+BATCH_CHUNK_FILES = 16      # Files handed to a batch worker at a time
+
 def format_bytes(num_bytes):
     """Format byte count with appropriate units"""
     if num_bytes < 1024:
@@ -31,36 +47,266 @@ def format_bytes(num_bytes):
     else:
         return f"{num_bytes / (1024 * 1024):.1f} MB"
 
-def analyze_events(events):
-    """Analyze event patterns and provide statistics"""
-    if not events:
+def analyze_events(summary, warriors=2):
+    """Analyze event patterns and provide statistics.
+    
+    Reads them off the recording's summary (see viz_format.load_summary),
+    which is built in one streaming pass the first time and then cached
+    next to the file.
+    """
+    if summary.total_events == 0:
         return {}
     
     # Count events by type
     type_counts = {}
-    warrior_activity = {0: 0, 1: 0}
-    cycle_range = [float('inf'), 0]
-    
-    for cycle, address, warrior_id, event_type, data in events:
-        # Event type statistics
+    for event_type in np.flatnonzero(summary.type_counts).tolist():
         event_name = EVENT_TYPES.get(event_type, f"UNKNOWN_{event_type}")
-        type_counts[event_name] = type_counts.get(event_name, 0) + 1
-        
-        # Warrior activity
-        if warrior_id in warrior_activity:
-            warrior_activity[warrior_id] += 1
-        
-        # Cycle range
-        cycle_range[0] = min(cycle_range[0], cycle)
-        cycle_range[1] = max(cycle_range[1], cycle)
+        type_counts[event_name] = int(summary.type_counts[event_type])
     
     return {
         'type_counts': type_counts,
-        'warrior_activity': warrior_activity,
-        'cycle_range': cycle_range,
-        'total_events': len(events)
+        'warrior_activity': {warrior_id: int(summary.warrior_events[warrior_id]) for warrior_id in range(warriors)},
+        'cycle_range': list(summary.cycle_range),
+        'total_events': summary.total_events
     }
 
+def print_battle(battle, max_rounds=20):
+    """Print the warrior table and round index of a closed recording"""
+    print(f"\n--- Warriors and Rounds ---")
+    names = battle.warrior_names()
+    for warrior_id, entry in enumerate(battle.warriors):
+        author = entry['author'].decode('ascii', 'replace')
+        print(f"  Warrior {warrior_id}: '{names[warrior_id]}' by {author or '?'}, {int(entry['length'])} instructions")
+    
+    for index, entry in enumerate(battle.rounds[:max_rounds]):
+        start, stop = battle.round_events(index)
+        winner = battle.winner(index)
+        outcome = f"won by {names[winner]}" if winner is not None else f"{int(entry['survivors'])} survived"
+        print(f"  Round {int(entry['round']):3d}: events {start:,}-{stop:,} ({stop - start:,}), {outcome}")
+    if len(battle) > max_rounds:
+        print(f"       ... and {len(battle) - max_rounds} more rounds")
+
+def analyze_frames(f, header, warrior_names):
+    """Print statistics for an aggregated (v3) recording"""
+    print(f"\n--- Frame Analysis ---")
+    frames = load_frames(f, header)
+    print(f"Frames Read: {len(frames):,}")
+    if len(frames) != header.total_events:
+        print(f"Warning: Frame count mismatch (header: {header.total_events}, actual: {len(frames)})")
+    if len(frames) == 0:
+        return False
+    
+    cells = np.diff(frames.cell_offsets)
+    print(f"Cycle Range: {int(frames.cycles.min())} - {int(frames.cycles.max())}")
+    print(f"Cells per Frame: {cells.mean():.1f} average, {int(cells.max())} max")
+    
+    print(f"\nWarrior Activity:")
+    executed = np.bincount(frames.cell_warriors[~frames.cell_written], minlength=frames.warriors)
+    written = np.bincount(frames.cell_warriors[frames.cell_written], minlength=frames.warriors)
+    for warrior_id in range(frames.warriors):
+        warrior_name = warrior_names[warrior_id] if warrior_id < len(warrior_names) else ""
+        print(f"  Warrior {warrior_id} ({warrior_name[:20]}...): {int(executed[warrior_id]):,} executed, "
+              f"{int(written[warrior_id]):,} written, peak {int(frames.tasks[:, warrior_id].max())} processes")
+    
+    print(f"\n--- File Integrity Summary ---")
+    f.seek(0)
+    print(f"Blocks: {len(read_block_index(f, header))}")
+    if trailer_offset(f, header):
+        print("OK Block index present")
+    else:
+        print("WARNING No block index - recording was not closed")
+    
+    addresses_ok = bool((frames.cell_addresses < header.core_size).all())
+    if addresses_ok and len(frames) == header.total_events:
+        print("OK All frames valid and complete")
+        return True
+    print("WARNING File contains invalid or missing frames")
+    return False
+
+class BattleTracker:
+    """Core ownership, process counts and write heatmap of a recording,
+    updated a slice of events (or frames) at a time.
+    
+    Callers split their input wherever a sample is taken or a round starts,
+    so every slice lies within one round.
+    """
+    
+    def __init__(self, core_size, warriors, heatmap_bins):
+        self.core_size = core_size
+        self.warriors = warriors
+        self.bin_size = max(1, -(-core_size // heatmap_bins))
+        self.heatmap = np.zeros((warriors, -(-core_size // self.bin_size)), dtype=np.int64)
+        self.round_execs = np.zeros(warriors, dtype=np.int64)
+        self.cycles = 0
+        self.cycle = None
+        self.round = -1
+        self.start_round()
+    
+    def start_round(self):
+        self.owner = np.full(self.core_size, -1, dtype=np.int16)
+        self.processes = np.ones(self.warriors, dtype=np.int64)
+        self.round += 1
+    
+    def count_execs(self, events):
+        """Accumulate EXEC events per round. Every living warrior executes
+        once per cycle, so a round lasts as many cycles as its busiest
+        warrior executed. Rounds are told apart by the cycle counter, which
+        runs down within a round and jumps back up when the next one starts
+        (also in recordings without a round index)."""
+        if not len(events):
+            return
+        cycles = events['cycle'].astype(np.int64)
+        previous = np.concatenate([[cycles[0] if self.cycle is None else self.cycle], cycles[:-1]])
+        is_exec = np.flatnonzero(events['event_type'] == VizEventType.EXEC)
+        parts = np.split(events['warrior_id'][is_exec], np.searchsorted(is_exec, np.flatnonzero(cycles > previous)))
+        for index, part in enumerate(parts):
+            if index:
+                self.cycles += int(self.round_execs.max())
+                self.round_execs[:] = 0
+            self.round_execs += np.bincount(part, minlength=self.warriors)
+        self.cycle = int(cycles[-1])
+    
+    def count_writes(self, warriors, addresses):
+        bins = self.heatmap.shape[1]
+        self.heatmap += np.bincount(warriors.astype(np.int64) * bins + addresses // self.bin_size,
+                                    minlength=self.heatmap.size).reshape(self.heatmap.shape)
+    
+    def apply_events(self, events):
+        events = events[(events['address'] < self.core_size) & (events['warrior_id'] < self.warriors)]
+        types = events['event_type']
+        addresses = events['address'].astype(np.int64)
+        warriors = events['warrior_id']
+        self.count_execs(events)
+        
+        claims = (types == VizEventType.EXEC) | (types == VizEventType.WRITE)
+        cells, owners = last_per_address(addresses[claims], warriors[claims])
+        self.owner[cells] = owners
+        
+        # SPL and DAT events carry the warrior's process count afterwards, DIE events 0
+        counted = (types == VizEventType.SPL) | (types == VizEventType.DAT) | (types == VizEventType.DIE)
+        ids, tasks = last_per_address(warriors[counted], events['data'][counted])
+        self.processes[ids] = tasks
+        
+        writes = types == VizEventType.WRITE
+        self.count_writes(warriors[writes], addresses[writes])
+    
+    def apply_frames(self, frames, first, last):
+        cells = slice(frames.cell_offsets[first], frames.cell_offsets[last])
+        addresses = frames.cell_addresses[cells].astype(np.int64)
+        warriors = frames.cell_warriors[cells]
+        if last > first:
+            self.cycle = int(frames.cycles[last - 1])
+            self.processes[:] = frames.tasks[last - 1]
+        
+        claimed, owners = last_per_address(addresses, warriors)
+        self.owner[claimed] = owners
+        written = frames.cell_written[cells]
+        self.count_writes(warriors[written], addresses[written])
+    
+    def owned(self):
+        return np.bincount(self.owner + 1, minlength=self.warriors + 1)[1:self.warriors + 1]
+    
+    def cycles_elapsed(self):
+        """Cycles simulated over all rounds"""
+        return self.cycles + int(self.round_execs.max())
+
+def battle_analytics(filename, samples=ANALYTICS_SAMPLES, heatmap_bins=HEATMAP_BINS):
+    """Bulk metrics of a recording, as a JSON-serializable dict.
+    
+    Events are streamed a chunk at a time and processed with NumPy, so
+    memory use does not depend on the length of the recording. Returns
+    per-warrior core ownership and process counts sampled at `samples`
+    evenly spaced points, per-warrior writes binned by address, and
+    instructions per cycle (event recordings only).
+    """
+    with open(filename, 'rb') as f:
+        header = read_header(f)
+        battle = read_battle(f, header)
+        frames = load_frames(f, header) if header.version == VERSION_FRAMES else None
+    names = battle.warrior_names() if battle is not None else [header.warrior1_name, header.warrior2_name]
+    warriors = len(names)
+    summary = load_summary(filename) if frames is None else None
+    total = len(frames) if frames is not None else summary.total_events
+    
+    round_starts = battle.rounds['first_event'].astype(np.int64) if battle is not None else np.zeros(0, np.int64)
+    interval = max(1, -(-total // max(1, samples)))
+    sample_points = np.minimum(np.arange(interval, total + interval, interval), total)
+    round_starts = round_starts[round_starts > 0]
+    bounds = np.union1d(sample_points, round_starts)
+    sample_set, round_set = set(sample_points.tolist()), set(round_starts.tolist())
+    
+    tracker = BattleTracker(header.core_size, warriors, heatmap_bins)
+    series = {'event': [], 'round': [], 'cycle': [], 'owned': [], 'processes': []}
+    
+    def advance(base, length, apply):
+        """Apply items base..base+length-1, stopping at every bound inside"""
+        pos = base
+        for bound in bounds[(bounds > base) & (bounds <= base + length)].tolist():
+            apply(pos - base, bound - base)
+            pos = bound
+            if bound in sample_set:
+                series['event'].append(bound)
+                series['round'].append(tracker.round)
+                series['cycle'].append(tracker.cycle or 0)
+                series['owned'].append(tracker.owned().tolist())
+                series['processes'].append(tracker.processes.tolist())
+            if bound in round_set:
+                tracker.start_round()
+        if pos < base + length:
+            apply(pos - base, length)
+    
+    if frames is not None:
+        advance(0, len(frames), lambda first, last: tracker.apply_frames(frames, first, last))
+    else:
+        base = 0
+        for chunk in iter_event_chunks(filename):
+            advance(base, len(chunk), lambda first, last: tracker.apply_events(chunk[first:last]))
+            base += len(chunk)
+    
+    result = {
+        'file': filename,
+        'version': header.version,
+        'core_size': header.core_size,
+        'warriors': names,
+        'rounds': len(battle) if battle is not None else None,
+        'winners': [battle.winner(index) for index in range(len(battle))] if battle is not None else None,
+        'total_events': total,
+        'heatmap': {'bin_size': tracker.bin_size, 'writes': tracker.heatmap.tolist()},
+        'series': series,
+    }
+    if summary is not None:
+        exec_counts = summary.exec_counts[:warriors]
+        cycles = tracker.cycles_elapsed()
+        result.update({
+            'cycles_elapsed': cycles,
+            'cycle_range': list(summary.cycle_range),
+            'type_counts': {EVENT_TYPES.get(event_type, f"UNKNOWN_{event_type}"): int(summary.type_counts[event_type])
+                            for event_type in np.flatnonzero(summary.type_counts).tolist()},
+            'warrior_events': summary.warrior_events[:warriors].tolist(),
+            'exec_counts': exec_counts.tolist(),
+            'ipc': float(exec_counts.sum()) / cycles if cycles else None,
+            'ipc_per_warrior': (exec_counts / cycles).tolist() if cycles else None,
+        })
+    return result
+
+def write_analytics_csv(analytics, out):
+    """Write the sampled series of battle_analytics as CSV rows, one per sample"""
+    names = range(len(analytics['warriors']))
+    writer = csv.writer(out)
+    writer.writerow(['file', 'event', 'round', 'cycle'] + [f"owned_{i}" for i in names] +
+                    [f"processes_{i}" for i in names])
+    series = analytics['series']
+    for row in zip(series['event'], series['round'], series['cycle'], series['owned'], series['processes']):
+        writer.writerow([analytics['file']] + list(row[:3]) + row[3] + row[4])
+
+def write_output(path, write):
+    """Call write(file) on path, or on stdout for '-'"""
+    if path == '-':
+        write(sys.stdout)
+    else:
+        with open(path, 'w', newline='') as out:
+            write(out)
+
 def test_viz_file(filename):
     """Test reading and analyze a .viz file"""
     print(f"=== CoreWar Visualization File Inspector ===")
@@ -125,34 +371,38 @@ def test_viz_file(filename):
                 print(f"Error parsing header: {e}")
                 return False
             
-            # Read and analyze events
+            # Warrior table and round index, written when the recording is closed
+            f.seek(0)
+            header = read_header(f)
+            if version >= VERSION_BLOCKS and not header.index_offset and trailer_offset(f, header):
+                # A live stream saved to a file: complete, but its header was
+                # written before anything was recorded
+                total_events = header.total_events = count_events(filename)
+                print(f"Recorded from a live stream, {total_events:,} events in its blocks")
+            battle = read_battle(f, header)
+            if battle is not None:
+                print_battle(battle)
+                warrior_names = battle.warrior_names()
+            else:
+                warrior_names = [warrior1_name, warrior2_name]
+            
+            # Aggregated recordings hold frames rather than events
+            if version == VERSION_FRAMES:
+                return analyze_frames(f, header, warrior_names)
+            
+            # Analyze events: valid ones lie inside the core and belong to a
+            # known warrior
             print(f"\n--- Event Analysis ---")
-            events = []
-            event_count = 0
-            invalid_events = 0
+            summary = load_summary(filename)
+            stats = analyze_events(summary, len(warrior_names))
+            event_count = int(summary.warrior_events_in_core[:len(warrior_names)].sum())
+            invalid_events = summary.total_events - event_count
             
-            while True:
-                event_data = f.read(16)  # Updated for 16-byte events
-                if len(event_data) < 16:
-                    break
-                
-                try:
-                    cycle, address, event_type, warrior_id, padding1, padding2, padding3, data = struct.unpack('<IHHBBBBI', event_data)
-                    
-                    # Basic validation
-                    if address >= core_size:
-                        invalid_events += 1
-                        continue
-                    
-                    if warrior_id > 1:
-                        invalid_events += 1
-                        continue
-                    
-                    events.append((cycle, address, warrior_id, event_type, data))
-                    event_count += 1
-                    
-                except struct.error:
-                    invalid_events += 1
+            samples = []
+            for chunk in iter_event_chunks(filename, chunk_events=1024):
+                valid = (chunk['address'] < core_size) & (chunk['warrior_id'] < len(warrior_names))
+                samples.extend(chunk[valid][:10 - len(samples)])
+                if len(samples) == 10:
                     break
             
             print(f"Events Read: {event_count:,}")
@@ -162,18 +412,19 @@ def test_viz_file(filename):
                 print(f"Warning: Event count mismatch (header: {total_events}, actual: {event_count})")
             
             # Display sample events
-            if events:
+            if samples:
                 print(f"\n--- Sample Events (first 10) ---")
-                for i, (cycle, address, warrior_id, event_type, data) in enumerate(events[:10]):
+                for i, event in enumerate(samples):
+                    cycle, address, event_type = int(event['cycle']), int(event['address']), int(event['event_type'])
+                    warrior_id, data = int(event['warrior_id']), int(event['data'])
                     event_name = EVENT_TYPES.get(event_type, f"UNK_{event_type}")
                     print(f"  {i+1:2d}: Cycle {cycle:5d} | Addr {address:4d} | W{warrior_id} | {event_name:5s} | Data {data}")
                 
-                if len(events) > 10:
-                    print(f"       ... and {len(events) - 10:,} more events")
+                if event_count > 10:
+                    print(f"       ... and {event_count - 10:,} more events")
             
             # Event statistics
-            if events:
-                stats = analyze_events(events)
+            if stats:
                 print(f"\n--- Event Statistics ---")
                 print(f"Cycle Range: {stats['cycle_range'][0]} - {stats['cycle_range'][1]}")
                 print(f"Total Events: {stats['total_events']:,}")
@@ -185,20 +436,36 @@ def test_viz_file(filename):
                 
                 print(f"\nWarrior Activity:")
                 for warrior_id, count in stats['warrior_activity'].items():
-                    warrior_name = warrior1_name if warrior_id == 0 else warrior2_name
+                    warrior_name = warrior_names[warrior_id]
                     percentage = (count / stats['total_events']) * 100
                     print(f"  Warrior {warrior_id} ({warrior_name[:20]}...): {count:6,} events ({percentage:5.1f}%)")
             
             # File integrity summary
             print(f"\n--- File Integrity Summary ---")
-            expected_size = 168 + (total_events * 16)  # 168-byte header + 16-byte events
-            print(f"Expected Size: {format_bytes(expected_size)}")
-            print(f"Actual Size: {format_bytes(file_size)}")
-            
-            if file_size == expected_size:
-                print("OK File size matches expected format")
+            flat_size = HEADER_SIZE + (total_events * EVENT_SIZE)  # 168-byte header + 16-byte events
+            if version >= VERSION_BLOCKS:
+                # Compressed blocks: the size cannot be predicted, check the index instead
+                f.seek(0)
+                index = read_block_index(f, read_header(f))
+                print(f"Blocks: {len(index)}")
+                print(f"Uncompressed (v1) Size: {format_bytes(flat_size)}")
+                print(f"Actual Size: {format_bytes(file_size)} ({flat_size / max(file_size, 1):.1f}x smaller)")
+                
+                if trailer_offset(f, header):
+                    print("OK Block index present")
+                else:
+                    print("WARNING No block index - recording was not closed")
             else:
-                print("WARNING File size mismatch - possible corruption")
+                # Closed recordings end their events where the trailer starts
+                events_end = header.index_offset or file_size
+                print(f"Expected Size: {format_bytes(flat_size)}")
+                print(f"Actual Size: {format_bytes(events_end)}" +
+                      (f" + {format_bytes(file_size - events_end)} trailer" if events_end < file_size else ""))
+                
+                if events_end == flat_size:
+                    print("OK File size matches expected format")
+                else:
+                    print("WARNING File size mismatch - possible corruption")
             
             if invalid_events == 0 and event_count == total_events:
                 print("OK All events valid and complete")
@@ -211,22 +478,168 @@ def test_viz_file(filename):
         print(f"Error reading file: {e}")
         return False
 
+def find_recordings(directory):
+    """Every .viz file below directory, in a stable order"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.endswith('.viz'))
+    return paths
+
+def inspect_recording(filename):
+    """Validate and summarize one recording for a batch run.
+    
+    Runs the full inspection with its report captured, so a batch applies
+    exactly the checks of a single-file run. Recordings whose sidecar
+    summary is still fresh are not scanned again.
+    """
+    result = {'file': filename, 'ok': False, 'cached': False, 'version': None, 'events': 0, 'rounds': None,
+              'warriors': [], 'winners': [], 'problems': []}
+    try:
+        result['cached'] = read_summary(filename) is not None
+    except OSError:
+        pass
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        result['ok'] = test_viz_file(filename)
+    result['problems'] = [line.strip() for line in report.getvalue().splitlines()
+                          if line.startswith(('Error', 'Warning', 'WARNING'))]
+    
+    try:
+        with open(filename, 'rb') as f:
+            header = read_header(f)
+            battle = read_battle(f, header)
+        summary = load_summary(filename)
+    except Exception:
+        return result
+    result['version'] = header.version
+    result['events'] = summary.total_events if summary is not None else header.total_events
+    if battle is not None:
+        names = battle.warrior_names()
+        result['rounds'] = len(battle)
+        result['warriors'] = names
+        result['winners'] = [None if winner is None else names[winner]
+                             for winner in (battle.winner(index) for index in range(len(battle)))]
+    else:
+        result['warriors'] = [header.warrior1_name, header.warrior2_name]
+    return result
+
+def inspect_directory(directory, jobs=1, out=sys.stdout):
+    """Inspect every recording below directory in a pool of jobs processes.
+    
+    Prints one line per file as results arrive, then the totals. Returns
+    the per-file results (in file order) and the totals.
+    """
+    paths = find_recordings(directory)
+    print(f"Inspecting {len(paths):,} recordings below {directory} with {jobs} processes", file=out)
+    results = []
+    with multiprocessing.Pool(max(1, jobs)) as pool:
+        for result in pool.imap_unordered(inspect_recording, paths, chunksize=BATCH_CHUNK_FILES):
+            results.append(result)
+            status = "OK  " if result['ok'] else "WARN"
+            rounds = f", {result['rounds']} rounds" if result['rounds'] is not None else ""
+            cached = ", cached" if result['cached'] else ""
+            print(f"{status} {result['file']}: v{result['version']}, {result['events']:,} events{rounds}{cached}",
+                  file=out)
+            for problem in result['problems']:
+                print(f"     {problem}", file=out)
+    results.sort(key=lambda result: result['file'])
+    
+    wins = {}
+    for result in results:
+        for winner in result['winners']:
+            key = winner if winner is not None else "(draw)"
+            wins[key] = wins.get(key, 0) + 1
+    totals = {
+        'files': len(results),
+        'ok': sum(result['ok'] for result in results),
+        'cached': sum(result['cached'] for result in results),
+        'events': sum(result['events'] for result in results),
+        'rounds': sum(result['rounds'] or 0 for result in results),
+        'wins': dict(sorted(wins.items(), key=lambda item: -item[1])),
+    }
+    
+    print(f"\n--- Batch Summary ---", file=out)
+    print(f"Recordings: {totals['files']:,} ({totals['ok']:,} OK, {totals['files'] - totals['ok']:,} with warnings, "
+          f"{totals['cached']:,} from fresh sidecars)", file=out)
+    print(f"Events: {totals['events']:,}", file=out)
+    print(f"Rounds: {totals['rounds']:,}", file=out)
+    if wins:
+        print(f"\nRounds Won:", file=out)
+        for name, count in totals['wins'].items():
+            print(f"  {name[:40]:40s}: {count:6,}", file=out)
+    return results, totals
+
+def write_batch_csv(results, out):
+    """Write the per-file results of inspect_directory as CSV rows"""
+    writer = csv.writer(out)
+    writer.writerow(['file', 'ok', 'cached', 'version', 'events', 'rounds', 'problems'])
+    for result in results:
+        writer.writerow([result['file'], int(result['ok']), int(result['cached']), result['version'],
+                         result['events'], result['rounds'] if result['rounds'] is not None else '',
+                         '; '.join(result['problems'])])
+
 def main():
     """Main entry point"""
-    if len(sys.argv) != 2:
-        print("CoreWar Visualization File Inspector")
-        print("Usage: python test_viz.py <file.viz>")
-        print("\nThis tool analyzes .viz files created by pmars with -T option")
-        print("and provides detailed information about the battle recording.")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="CoreWar Visualization File Inspector - analyzes .viz files created by pmars with the -T "
+                    "option and provides detailed information about the battle recording.")
+    parser.add_argument('viz_file', help='Recording to analyze (with --recursive: directory of recordings)')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Write bulk analytics (with --recursive: per-file results and totals) as JSON '
+                             '(- for stdout)')
+    parser.add_argument('--csv', metavar='FILE',
+                        help='Write the ownership and process series (with --recursive: per-file results) as CSV '
+                             '(- for stdout)')
+    parser.add_argument('--samples', type=int, default=ANALYTICS_SAMPLES,
+                        help=f'Points in the analytics series (default: {ANALYTICS_SAMPLES})')
+    parser.add_argument('--heatmap-bins', type=int, default=HEATMAP_BINS,
+                        help=f'Address bins of the write heatmap (default: {HEATMAP_BINS})')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Skip the report, only write analytics')
+    parser.add_argument('--recursive', '-R', action='store_true',
+                        help='Inspect every .viz file below the directory viz_file')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, metavar='N',
+                        help='Inspect N recordings in parallel (with --recursive, default: one per CPU)')
+    args = parser.parse_args()
     
-    filename = sys.argv[1]
+    if args.recursive:
+        if not os.path.isdir(args.viz_file):
+            print(f"Error: '{args.viz_file}' is not a directory")
+            sys.exit(1)
+        # The report goes to stderr when results are written to stdout
+        report = sys.stderr if '-' in (args.json, args.csv) else sys.stdout
+        results, totals = inspect_directory(args.viz_file, args.jobs,
+                                            open(os.devnull, 'w') if args.quiet else report)
+        if args.json:
+            write_output(args.json, lambda out: json.dump({'files': results, 'totals': totals}, out))
+        if args.csv:
+            write_output(args.csv, lambda out: write_batch_csv(results, out))
+        sys.exit(0 if totals['ok'] == totals['files'] else 1)
     
-    if not filename.endswith('.viz'):
+    filename = args.viz_file
+    # Analytics on stdout must not be mixed with the report
+    quiet = args.quiet or '-' in (args.json, args.csv)
+    
+    if not filename.endswith('.viz') and not quiet:
         print("Warning: File doesn't have .viz extension")
     
-    success = test_viz_file(filename)
+    success = True
+    if not quiet:
+        success = test_viz_file(filename)
+    
+    if args.json or args.csv:
+        try:
+            analytics = battle_analytics(filename, args.samples, args.heatmap_bins)
+        except Exception as e:
+            print(f"Error analyzing file: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            write_output(args.json, lambda out: json.dump(analytics, out))
+        if args.csv:
+            write_output(args.csv, lambda out: write_analytics_csv(analytics, out))
     
+    if quiet:
+        sys.exit(0 if success else 1)
     print(f"\n{'='*50}")
     if success:
         print("✓ File analysis completed successfully")
@@ -8,15 +8,28 @@ Usage: python visualizer.py <battle.viz>
 
 import pygame
 import sys
-import struct
 import time
 import math
 import argparse
 import numpy as np
 import os
-from typing import List, Dict, Tuple, Optional
+import shutil
+import subprocess
+import tempfile
+import multiprocessing
+import queue
+import socket
+import stat
+import threading
+from typing import List, Dict, Set, Tuple, Optional
 from dataclasses import dataclass
-from enum import IntEnum
+
+from viz_format import (VIZ_EVENT_DTYPE, STREAM_CHUNK_EVENTS, BLOCK_EVENTS, BLOCK_FRAMES, VizEventType, VizHeader,
+                        VizFrames, VizBattle, read_header, read_battle, load_events, iter_event_chunks,
+                        map_events, event_addresses, validate_events, is_block_format, is_frame_format, load_frames,
+                        iter_stream_blocks, battle_from_trailer, decode_event_block, decode_frame_block,
+                        empty_frames, concat_frames, slice_frames, last_per_address, VizSummary, load_summary,
+                        count_events, SUMMARY_CYCLE_STEP)
 
 try:
     import cv2
@@ -44,12 +57,24 @@ MAX_CELL_SIZE = 10          # Maximum size per memory cell in pixels
 MIN_CELL_SIZE = 2           # Minimum size per memory cell in pixels
 EXECUTION_TRAIL_LENGTH = 30 # Number of recent executions to show as trail
 EXECUTION_FADE_SPEED = 0.8  # How fast execution trail fades (0.0-1.0)
+KEYFRAME_INTERVAL = 5000    # Events between state snapshots used for seeking
+KEYFRAME_MEMORY = 64 << 20  # Bytes of snapshots kept; beyond it their interval doubles
+
+# Video Recording
+ENCODER_QUEUE_FRAMES = 8    # Captured frames that may wait for the encoder thread
+
+# Frames after which any activity flash or trail entry has faded out completely
+FADE_OUT_FRAMES = math.ceil(math.log(0.1) / math.log(EXECUTION_FADE_SPEED)) + 1
 
 # Colors (R, G, B)
 COLOR_BACKGROUND = (20, 20, 30)      # Dark blue background
 COLOR_MEMORY_EMPTY = (50, 50, 60)    # Empty memory cells
 COLOR_WARRIOR1 = (255, 80, 80)       # Warrior 1 (red)
 COLOR_WARRIOR2 = (80, 120, 255)      # Warrior 2 (blue)
+COLOR_WARRIORS_MELEE = [             # Further warriors of a melee, cycled
+    (80, 220, 120), (230, 120, 255), (255, 200, 60), (60, 220, 230),
+    (255, 130, 190), (170, 200, 90), (200, 160, 120), (140, 140, 255),
+]
 COLOR_EXECUTION = (255, 255, 100)    # Current execution (yellow)
 COLOR_READ = (100, 255, 100)         # Memory reads (green)
 COLOR_WRITE = (255, 150, 100)        # Memory writes (orange)
@@ -67,58 +92,59 @@ FONT_SIZE_SMALL = 14        # Small font size
 # END CONFIGURATION
 # ============================================================================
 
-# Initialize pygame
-pygame.init()
-
-class VizEventType(IntEnum):
-    """Event types for visualization recording"""
-    EXEC = 0      # Instruction execution
-    READ = 1      # Memory read
-    WRITE = 2     # Memory write
-    DEC = 3       # Memory decrement
-    INC = 4       # Memory increment
-    SPL = 5       # Process spawn
-    DAT = 6       # Process death
-    DIE = 7       # Warrior death
-    CYCLE = 8     # Cycle start
-    PUSH = 9      # Task queue push
-
 @dataclass
-class VizHeader:
-    """Binary file header structure"""
-    magic: str
-    version: int
-    core_size: int
-    total_cycles: int
-    total_events: int
-    warrior1_name: str
-    warrior2_name: str
-    warrior1_start: int
-    warrior2_start: int
-
-@dataclass
-class VizEvent:
-    """Event record structure"""
+class Keyframe:
+    """Snapshot of the reconstructed core state right before an event"""
+    event_index: int
     cycle: int
-    address: int
-    warrior_id: int
-    event_type: VizEventType
-    data: int
+    memory_owner: np.ndarray
+    memory_activity_type: np.ndarray
+    memory_activity_fade: np.ndarray
+    execution_trail: List[Tuple[int, float]]
+    warrior_eliminations: Set[int]
+    warrior_deaths: Set[int]
 
 class CoreWarVisualizer:
     """Main visualizer class"""
     
-    def __init__(self, viz_file: str, record_video: bool = False, video_output: str = None, video_fps: int = 30, video_speed: float = 50.0, target_duration: float = None, interactive_duration: float = None, headless: bool = False):
+    def __init__(self, viz_file: str, record_video: bool = False, video_output: str = None, video_fps: int = 30, video_speed: float = 50.0, target_duration: float = None, interactive_duration: float = None, headless: bool = False, use_mmap: bool = False, stream_events: bool = False, segment: Optional[Tuple[int, int]] = None, round_number: Optional[int] = None, live: bool = False):
         self.viz_file = viz_file
         self.header: Optional[VizHeader] = None
-        self.events: List[VizEvent] = []
+        self.battle: Optional[VizBattle] = None  # Warrior table and round index, if recorded
+        self.round_number = round_number  # Round shown when the recording has a round index
+        self.round_index = 0
+        self.event_base = 0     # Absolute file index of the round's first event
+        self.event_stop: Optional[int] = None  # Absolute file index after its last event
+        self.warrior_names: List[str] = []
+        self.warrior_starts: List[int] = []
+        self.events: np.ndarray = np.empty(0)  # structured array, see viz_format.VIZ_EVENT_DTYPE
+        self.frames: Optional[VizFrames] = None  # v3 recordings: frames take the place of events
+        self.summary: Optional[VizSummary] = None  # Whole-file statistics of event recordings (sidecar .idx)
+        self.summary_thread: Optional[threading.Thread] = None  # Loads or builds self.summary, see ensure_summary
+        self.cycle_span: Optional[Tuple[int, int]] = None  # First and last cycle of the indexed round shown, the scale of the progress bar
+        self.total_events = 0   # Events in the whole recording
+        self.chunk_start = 0    # Absolute index of self.events[0]
         self.current_event = 0
+        self.use_mmap = use_mmap  # Map events from disk instead of reading them into memory
+        self.stream_events = stream_events  # Read events in bounded chunks while playing
+        self.event_stream = None
+        self.live = live        # viz_file is a stream pmars is still writing, see open_live_source
+        self.live_queue: Optional[queue.Queue] = None  # Decoded blocks from the reader thread, None at the end
+        self.live_battle: Optional[VizBattle] = None  # Trailer of the stream, set by the reader thread
+        self.live_ended = False
+        self.live_last_cycle = 1 << 32  # Cycle of the last event applied (cycles count down within a round)
         
         # Video recording settings
         self.record_video = record_video and HAS_OPENCV
         self.video_output = video_output
         self.video_fps = video_fps
         self.video_writer = None
+        self.encoder_queue = None
+        self.encoder_thread = None
+        self.segment = segment  # (index, count): render only this share of the battle frames
+        self.segment_start = 0  # First frame rendered by this process
+        self.segment_end = None  # Frame to stop after when rendering a segment
+        self.frames_rendered = 0
         self.target_duration = target_duration
         self.interactive_duration = interactive_duration
         
@@ -130,14 +156,23 @@ class CoreWarVisualizer:
             print("Install with: pip install opencv-python")
             sys.exit(1)
         
-        # Set up headless mode if needed
-        if self.headless:
-            self._setup_headless_mode()
-        
-        # Initialize display
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        if not self.headless:
-            pygame.display.set_caption("CoreWar Battle Visualizer")
+        if self.record_video:
+            # Off-screen rendering: frames are drawn into a plain surface and
+            # handed to the encoder, so no display, window or event queue is
+            # needed and only the font module is initialized
+            pygame.font.init()
+            self.screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), depth=32)
+        else:
+            pygame.init()
+            
+            # Set up headless mode if needed
+            if self.headless:
+                self._setup_headless_mode()
+            
+            # Initialize display
+            self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            if not self.headless:
+                pygame.display.set_caption("CoreWar Battle Visualizer")
         self.clock = pygame.time.Clock()
         
         # Initialize fonts
@@ -159,9 +194,14 @@ class CoreWarVisualizer:
         
         # Simulation state
         self.current_cycle = 0
-        self.memory_state = {}  # address -> {'warrior': warrior_id, 'type': event_type}
+        core_size = self.header.core_size
+        self.memory_owner = np.full(core_size, -1, dtype=np.int16)  # Owning warrior per address, -1 = none
         self.execution_trail = []  # Recent execution positions with fade
-        self.memory_activity = {}  # address -> {'type': event_type, 'fade': float}
+        self.memory_activity_type = np.zeros(core_size, dtype=np.uint8)  # Last activity VizEventType per address
+        self.memory_activity_fade = np.zeros(core_size, dtype=np.float32)  # Activity intensity, 0.0 = none
+        self.keyframes: Dict[int, Keyframe] = {}  # event index -> snapshot, every keyframe_interval events
+        self.keyframe_interval = KEYFRAME_INTERVAL
+        self.progress_bar_rect = None  # Set by draw_ui, used for scrubbing
         
         # Animation state
         self.playing = True
@@ -185,7 +225,7 @@ class CoreWarVisualizer:
         
         # Battle result tracking
         self.battle_complete = False
-        self.battle_result = None  # 'warrior1', 'warrior2', or 'draw'
+        self.battle_result = None  # 'warrior1', 'warrior2' (or 'warriorN' in a melee), or 'draw'
         self.warrior_deaths = set()  # Track which warriors have died (final elimination)
         self.victory_animation_time = 0.0  # For victory screen animation
         self.victory_frames_recorded = 0  # Track victory screen duration
@@ -200,7 +240,7 @@ class CoreWarVisualizer:
     
     def calculate_optimal_speed(self, target_duration: float) -> float:
         """Calculate optimal animation speed to fit target duration"""
-        if not target_duration or len(self.events) == 0:
+        if not target_duration or self.total_events == 0:
             return 50.0  # Default speed
         
         # Reserve 3 seconds for victory screen
@@ -208,13 +248,13 @@ class CoreWarVisualizer:
         battle_duration = max(1.0, target_duration - victory_screen_duration)
         
         # Calculate required speed (events per second)
-        optimal_speed = len(self.events) / battle_duration
+        optimal_speed = self.total_events / battle_duration
         
         # Apply reasonable limits
         optimal_speed = max(0.1, min(optimal_speed, 50000.0))
         
         print(f"Target duration: {target_duration}s")
-        print(f"Battle events: {len(self.events)}")
+        print(f"Battle events: {self.total_events}")
         print(f"Calculated optimal speed: {optimal_speed:.1f} events/sec")
         print(f"Expected battle duration: {battle_duration:.1f}s + {victory_screen_duration}s victory screen")
         
@@ -234,77 +274,259 @@ class CoreWarVisualizer:
     def load_viz_file(self):
         """Load and parse the .viz file"""
         try:
+            if self.live:
+                self.open_live_stream()
+                return
+            
             with open(self.viz_file, 'rb') as f:
-                # Read header (168 bytes including reserved fields)
-                header_data = f.read(168)
-                if len(header_data) < 168:
-                    raise ValueError("Invalid viz file: header too short")
+                self.header = read_header(f)
+                header = self.header
                 
-                # Parse header
-                magic = header_data[0:8].decode('ascii').rstrip('\x00')
-                if magic != "PMARSREC":
-                    raise ValueError(f"Invalid magic number: {magic}")
+                print(f"Loaded viz file: {header.magic} v{header.version}")
+                print(f"Core size: {header.core_size}, Cycles: {header.total_cycles}, Events: {header.total_events}")
+                # With a round index only the chosen round is read, straight
+                # from its first event; older recordings play as one battle
+                self.battle = read_battle(f, header)
+                if self.battle is not None and len(self.battle):
+                    self.round_index = min(max(1, self.round_number or 1), len(self.battle)) - 1
+                    self.event_base, self.event_stop = self.battle.round_events(self.round_index)
+                    self.warrior_names = self.battle.warrior_names()
+                    self.warrior_starts = self.battle.positions[self.round_index].tolist()
+                    print(f"Round {self.round_index + 1}/{len(self.battle)}: "
+                          f"events {self.event_base}-{self.event_stop}")
+                else:
+                    self.battle = None
+                    self.warrior_names = [header.warrior1_name, header.warrior2_name]
+                    self.warrior_starts = [header.warrior1_start, header.warrior2_start]
+                print(f"Warriors: {' vs '.join(self.warrior_names)}")
+                print(f"Start positions: {', '.join(map(str, self.warrior_starts))}")
                 
-                # Unpack header fields (version, core_size, total_cycles, total_events)
-                (version, core_size, total_cycles, total_events) = struct.unpack('<IIII', header_data[8:24])
+                if self.use_mmap and is_block_format(header):
+                    print("Compressed v2 recording cannot be memory-mapped, loading it instead")
+                    self.use_mmap = False
                 
-                # Extract warrior names (bytes 24-87 and 88-151)
-                warrior1_name = header_data[24:88].decode('ascii').rstrip('\x00')
-                warrior2_name = header_data[88:152].decode('ascii').rstrip('\x00')
+                if is_frame_format(header):
+                    if self.stream_events:
+                        print("Frame recordings are small, loading it instead of streaming")
+                        self.stream_events = False
+                    # Each frame is one step of playback; self.events only
+                    # provides the length used by the chunk bookkeeping
+                    self.frames = load_frames(f, header, self.event_base, self.event_stop)
+                    self.events = self.event_cycles = self.frames.cycles
+                    self.total_events = len(self.frames)
+                    if self.battle is not None and self.total_events:
+                        self.cycle_span = int(self.event_cycles[0]), int(self.event_cycles[-1])
+                    print(f"Loaded {self.total_events} frames")
+                    return
                 
-                # Extract starting positions (bytes 152-155 and 156-159)
-                (warrior1_start, warrior2_start) = struct.unpack('<II', header_data[152:160])
+                # Deaths, execution activity and the cycle table come from the
+                # sidecar summary. Building it scans the whole file, so playback
+                # starts without it; segment workers only build it when needed.
+                if self.summary_thread is None and self.segment is None:
+                    self.start_summary()
                 
-                self.header = VizHeader(
-                    magic=magic,
-                    version=version,
-                    core_size=core_size,
-                    total_cycles=total_cycles,
-                    total_events=total_events,
-                    warrior1_name=warrior1_name,
-                    warrior2_name=warrior2_name,
-                    warrior1_start=warrior1_start,
-                    warrior2_start=warrior2_start
-                )
+                if self.stream_events:
+                    # Only one chunk is held at a time; size the battle from the
+                    # round index or the block index
+                    stop = self.event_stop if self.battle is not None else count_events(self.viz_file)
+                    self.total_events = stop - self.event_base
+                    self.open_event_stream()
+                    if self.battle is not None and self.total_events:
+                        last = load_events(f, header, self.event_base + self.total_events - 1, self.event_base + self.total_events)
+                        self.cycle_span = int(self.event_cycles[0]), int(last['cycle'][-1])
+                    print(f"Streaming {self.total_events} events in chunks of {STREAM_CHUNK_EVENTS}")
+                    return
                 
-                print(f"Loaded viz file: {magic} v{version}")
-                print(f"Core size: {core_size}, Cycles: {total_cycles}, Events: {total_events}")
-                print(f"Warriors: {warrior1_name} vs {warrior2_name}")
-                print(f"Start positions: {warrior1_start}, {warrior2_start}")
+                if self.use_mmap:
+                    # Zero-copy: events are paged in as playback reaches them.
+                    # Validation is skipped since it would touch every page;
+                    # unknown event types are simply ignored by process_event.
+                    events = map_events(self.viz_file)[self.event_base:self.event_stop]
+                else:
+                    # Read the whole event region in one pass and validate it in bulk
+                    events = load_events(f, header, self.event_base, self.event_stop)
+                    valid = validate_events(events)
+                    invalid_count = len(events) - int(np.count_nonzero(valid))
+                    if invalid_count:
+                        print(f"Warning: Skipping {invalid_count} invalid events")
+                        events = events[valid]
                 
-                # Read events (16 bytes each)
-                while True:
-                    event_data = f.read(16)
-                    if len(event_data) < 16:
-                        break
-                    
-                    try:
-                        cycle, address, event_type, warrior_id, padding1, padding2, padding3, data = struct.unpack('<IHHBBBBI', event_data)
-                     
-                        event = VizEvent(
-                            cycle=cycle,
-                            address=address,
-                            warrior_id=warrior_id,
-                            event_type=VizEventType(event_type),
-                            data=data
-                        )
-                        self.events.append(event)
-                    except (ValueError, struct.error) as e:
-                        print(f"Warning: Skipping invalid event at cycle {cycle}: {e}")
-                        continue
+                self.set_event_chunk(events, 0)
+                self.total_events = len(events)
+                if self.battle is not None and self.total_events:
+                    self.cycle_span = int(self.event_cycles[0]), int(self.event_cycles[-1])
                 
-                print(f"Loaded {len(self.events)} events")
+                print(f"{'Mapped' if self.use_mmap else 'Loaded'} {self.total_events} events")
                 
         except Exception as e:
             print(f"Error loading viz file: {e}")
             sys.exit(1)
     
+    def start_summary(self):
+        """Load or build the summary in a background thread"""
+        self.summary_thread = threading.Thread(target=self.summarize, daemon=True)
+        self.summary_thread.start()
+    
+    def summarize(self):
+        """Summary thread: read the sidecar, or build and save it"""
+        try:
+            self.summary = load_summary(self.viz_file)
+        except Exception as e:
+            print(f"Warning: Cannot summarize {self.viz_file}: {e}")
+    
+    def ensure_summary(self) -> Optional[VizSummary]:
+        """The summary of an event recording, waiting for it on first use.
+        None for frame recordings, live streams or when it cannot be built."""
+        if self.live or self.frames is not None:
+            return None
+        if self.summary_thread is None:
+            self.start_summary()
+        self.summary_thread.join()
+        return self.summary
+    
+    def open_live_stream(self):
+        """Read the header of a live recording and start the reader thread"""
+        self.live_input = open_live_source(self.viz_file)
+        self.header = read_header(self.live_input)
+        header = self.header
+        if not is_block_format(header):
+            raise ValueError("live streams are recorded as v2 or v3 blocks")
+        
+        print(f"Live viz stream: {header.magic} v{header.version}")
+        print(f"Core size: {header.core_size}, Cycles: {header.total_cycles}")
+        self.warrior_names = [header.warrior1_name, header.warrior2_name]
+        self.warrior_starts = [header.warrior1_start, header.warrior2_start]
+        print(f"Warriors: {' vs '.join(self.warrior_names)}")
+        
+        if is_frame_format(header):
+            self.frames = empty_frames()
+            self.events = self.event_cycles = self.frames.cycles
+        else:
+            self.set_event_chunk(np.empty(0, dtype=VIZ_EVENT_DTYPE), 0)
+        self.live_queue = queue.Queue()
+        threading.Thread(target=self.read_live_stream, daemon=True).start()
+    
+    def read_live_stream(self):
+        """Reader thread: decode blocks as they arrive and queue them for the display loop"""
+        trailer = {}
+        try:
+            for kind, count, payload in iter_stream_blocks(self.live_input):
+                if kind == BLOCK_EVENTS:
+                    self.live_queue.put(decode_event_block(payload))
+                elif kind == BLOCK_FRAMES:
+                    self.live_queue.put(decode_frame_block(payload, self.header.core_size))
+                else:
+                    trailer[kind] = (count, payload)
+        except Exception as e:
+            print(f"Live stream error: {e}")
+        self.live_battle = battle_from_trailer(trailer)
+        self.live_queue.put(None)
+    
+    def poll_live_stream(self):
+        """Apply everything the reader thread queued since the last frame.
+        
+        Whatever arrived during one display frame is applied in a single
+        aggregated pass, so drawing keeps up with pmars however fast it
+        records. While paused, blocks queue up and are applied at once on
+        resume.
+        """
+        if not self.playing or self.live_ended:
+            return
+        batches = []
+        ended = False
+        while not ended:
+            try:
+                batch = self.live_queue.get_nowait()
+            except queue.Empty:
+                break
+            ended = batch is None
+            if not ended:
+                batches.append(batch)
+        
+        if batches:
+            self.apply_live_batch(concat_frames(batches) if self.frames is not None else np.concatenate(batches))
+        if ended:
+            self.finish_live_stream()
+    
+    def apply_live_batch(self, batch):
+        """Apply a batch of live events (or frames), clearing the core between rounds.
+        
+        The cycle counter counts down within a round, so a new round starts
+        wherever it goes up.
+        """
+        cycles = (batch.cycles if self.frames is not None else batch['cycle']).astype(np.int64)
+        starts = set(np.flatnonzero(np.diff(cycles, prepend=self.live_last_cycle) > 0).tolist())
+        bounds = sorted(starts | {0, len(cycles)})
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if lo in starts:
+                self.start_live_round()
+            self.chunk_start = self.total_events
+            if self.frames is not None:
+                self.frames = slice_frames(batch, lo, hi)
+                self.events = self.event_cycles = self.frames.cycles
+                self.apply_frame_range(0, hi - lo)
+            else:
+                self.set_event_chunk(batch[lo:hi], self.chunk_start)
+                self.apply_event_range(0, hi - lo)
+            self.total_events += hi - lo
+        self.current_event = self.total_events
+        self.live_last_cycle = int(cycles[-1])
+    
+    def start_live_round(self):
+        """Clear the core for the next round of a live stream"""
+        self.round_index += 1
+        self.memory_owner.fill(-1)
+        self.memory_activity_fade.fill(0.0)
+        self.execution_trail.clear()
+        self.warrior_eliminations.clear()
+        self.warrior_deaths.clear()
+    
+    def finish_live_stream(self):
+        """The stream ended: take the outcome from its round index, if pmars got to write it"""
+        self.live_ended = True
+        self.battle = self.live_battle
+        if self.battle is not None and len(self.battle):
+            self.round_index = len(self.battle) - 1
+            self.warrior_names = self.battle.warrior_names()
+        print(f"Live stream ended after {self.total_events} {'frames' if self.frames is not None else 'events'}")
+    
+    def set_event_chunk(self, events: np.ndarray, start: int):
+        """Make events[0] correspond to absolute event index start"""
+        self.events = events
+        self.chunk_start = start
+        self.event_cycles = events['cycle']
+        # Mapped v1 records keep the address high half apart; joining them
+        # would read every page, and it is always 0 in cores up to 64K
+        large_core = self.header is not None and self.header.core_size > 0x10000
+        self.event_addresses = event_addresses(events) if large_core else events['address']
+        self.event_types = events['event_type']
+        self.event_warriors = events['warrior_id']
+        self.event_data = events['data']
+    
+    def open_event_stream(self, start: int = 0):
+        """(Re)start streaming from absolute event index start"""
+        self.event_stream = iter_event_chunks(self.viz_file, start=self.event_base + start, stop=self.event_stop)
+        self.set_event_chunk(np.empty(0, dtype=VIZ_EVENT_DTYPE), start)
+        self.next_event_chunk()
+    
+    def next_event_chunk(self) -> bool:
+        """Advance the stream to the chunk following the current one"""
+        chunk = next(self.event_stream, None)
+        if chunk is None:
+            return False
+        self.set_event_chunk(chunk, self.chunk_start + len(self.events))
+        return True
+    
     def calculate_memory_layout(self):
         """Calculate memory visualization layout"""
         if not self.header:
             return
             
-        core_size = self.header.core_size
+        # Cores with more cells than fit at MIN_CELL_SIZE are drawn as tiles of
+        # consecutive cells; from here on core_size counts grid positions
+        max_tiles = (MEMORY_GRID_WIDTH // MIN_CELL_SIZE) * (MEMORY_GRID_HEIGHT // MIN_CELL_SIZE)
+        self.cells_per_tile = max(1, math.ceil(self.header.core_size / max_tiles))
+        core_size = self.tile_count = math.ceil(self.header.core_size / self.cells_per_tile)
         
         # Calculate optimal grid layout (roughly square, but exact cell count)
         aspect_ratio = MEMORY_GRID_WIDTH / MEMORY_GRID_HEIGHT
@@ -331,81 +553,135 @@ class CoreWarVisualizer:
         self.memory_rows = rows
         self.memory_cols = cols
         
-        print(f"Memory layout: {rows}x{cols} grid ({rows*cols} cells), {self.cell_size}px cells")
+        tiles = f", {self.cells_per_tile} cells per tile" if self.cells_per_tile > 1 else ""
+        print(f"Memory layout: {rows}x{cols} grid ({rows*cols} cells), {self.cell_size}px cells{tiles}")
+        self.build_grid_renderer()
     
     def get_cell_position(self, address: int) -> Tuple[int, int]:
         """Get screen position for memory address"""
         if address >= self.header.core_size:
             return 0, 0
             
-        row = address // self.memory_cols
-        col = address % self.memory_cols
+        tile = address // self.cells_per_tile
+        row = tile // self.memory_cols
+        col = tile % self.memory_cols
         
         x = MEMORY_START_X + col * self.cell_size
         y = MEMORY_START_Y + row * self.cell_size
         
         return x, y
     
+    def build_grid_renderer(self):
+        """Precompute the lookup tables used by draw_memory"""
+        core_size = self.tile_count
+        cell = self.cell_size
+        width = self.memory_cols * cell
+        height = self.memory_rows * cell
+        
+        # Core cell (or tile) shown at each grid pixel, in surfarray (x, y) order.
+        # Each cell is (cell_size-1) pixels wide; the 1px gaps and the unused
+        # cells after the end of the core point at an extra background entry.
+        px = np.arange(width)
+        py = np.arange(height)
+        index = (py // cell)[np.newaxis, :] * self.memory_cols + (px // cell)[:, np.newaxis]
+        gap = (px % cell == cell - 1)[:, np.newaxis] | (py % cell == cell - 1)[np.newaxis, :]
+        index[gap | (index >= core_size)] = core_size
+        self.grid_pixel_index = index
+        
+        # Cells are packed into mapped 32-bit pixels so expanding them to the
+        # grid is a single integer gather
+        self.grid_surface = pygame.Surface((width, height), depth=32)
+        self.grid_shifts = self.grid_surface.get_shifts()[:3]
+        
+        # Ownership palette indexed by the owner, ending in the empty color
+        # that owner -1 selects
+        self.owner_palette = np.empty((257, 3), dtype=np.float64)
+        self.owner_palette[:] = COLOR_MEMORY_EMPTY
+        self.owner_palette[0] = COLOR_WARRIOR1
+        self.owner_palette[1] = COLOR_WARRIOR2
+        for warrior_id in range(2, 256):
+            self.owner_palette[warrior_id] = COLOR_WARRIORS_MELEE[(warrior_id - 2) % len(COLOR_WARRIORS_MELEE)]
+        
+        # Mapped cell colors for the current frame plus the trailing background entry
+        self.cell_colors = np.empty(core_size + 1, dtype=np.uint32)
+        self.cell_colors[core_size] = self.grid_surface.map_rgb(COLOR_BACKGROUND)
+        
+        # Tile of every core address and the number of addresses in each tile
+        # (the last tile may be short)
+        if self.cells_per_tile > 1:
+            self.tile_of_cell = np.arange(self.header.core_size, dtype=np.int64) // self.cells_per_tile
+            self.tile_sizes = np.bincount(self.tile_of_cell, minlength=core_size)
+    
+    def aggregate_tiles(self):
+        """Reduce per-address state to per-tile colors and activity for large cores.
+        
+        A tile takes the color of the warrior owning most of its addresses,
+        scaled by the fraction of the tile that is owned at all, and shows the
+        strongest activity of any address inside it.
+        """
+        tiles = self.tile_count
+        per_tile = self.cells_per_tile
+        
+        # Owner counts per tile; slot 0 counts empty addresses, slot 1 + id warriors
+        owner_slot = self.memory_owner.astype(np.int64) + 1
+        slots = int(owner_slot.max()) + 1
+        keys = self.tile_of_cell * slots + owner_slot
+        counts = np.bincount(keys, minlength=tiles * slots).reshape(tiles, slots)
+        owned = self.tile_sizes - counts[:, 0]
+        dominant = counts[:, 1:].argmax(axis=1) if slots > 1 else np.zeros(tiles, dtype=np.int64)
+        
+        empty = np.array(COLOR_MEMORY_EMPTY, dtype=np.float64)
+        density = np.where(owned > 0, 0.3 + 0.7 * owned / self.tile_sizes, 0.0)[:, np.newaxis]
+        color = empty + (self.owner_palette[dominant] - empty) * density
+        
+        # Strongest activity per tile, padding the last tile with idle cells
+        padding = tiles * per_tile - self.header.core_size
+        fade = np.pad(self.memory_activity_fade, (0, padding)).reshape(tiles, per_tile)
+        types = np.pad(self.memory_activity_type, (0, padding)).reshape(tiles, per_tile)
+        strongest = fade.argmax(axis=1)
+        rows = np.arange(tiles)
+        return color, types[rows, strongest], fade[rows, strongest]
+    
     def draw_memory(self):
         """Draw the memory visualization"""
         if not self.header:
             return
         
-        # Draw memory grid
-        for address in range(self.header.core_size):
-            x, y = self.get_cell_position(address)
-            
-            # Default color
-            color = COLOR_MEMORY_EMPTY
-            
-            # Color based on memory state
-            if address in self.memory_state:
-                warrior_id = self.memory_state[address]['warrior']
-                if warrior_id == 0:
-                    color = COLOR_WARRIOR1
-                elif warrior_id == 1:
-                    color = COLOR_WARRIOR2
-            
-            # Overlay memory activity (reads/writes with fading)
-            if address in self.memory_activity:
-                activity = self.memory_activity[address]
-                fade = activity['fade']
-                if activity['type'] == VizEventType.READ:
-                    activity_color = COLOR_READ
-                elif activity['type'] in [VizEventType.WRITE, VizEventType.INC, VizEventType.DEC]:
-                    activity_color = COLOR_WRITE
-                else:
-                    activity_color = color
-                
-                # Blend colors based on fade
-                color = self.blend_colors(color, activity_color, fade)
-            
-            # Draw cell
-            pygame.draw.rect(self.screen, color, (x, y, self.cell_size-1, self.cell_size-1))
+        core_size = self.tile_count
+        per_tile = self.cells_per_tile
         
-        # Draw execution trail
-        for i, (addr, fade) in enumerate(self.execution_trail):
-            if addr < self.header.core_size:
-                x, y = self.get_cell_position(addr)
-                
-                # Create fading execution highlight
-                exec_color = COLOR_EXECUTION
-                alpha = int(255 * fade)
-                
-                # Create surface with alpha for the execution highlight
-                surf = pygame.Surface((self.cell_size-1, self.cell_size-1))
-                surf.set_alpha(alpha)
-                surf.fill(exec_color)
-                self.screen.blit(surf, (x, y))
-    
-    def blend_colors(self, color1: Tuple[int, int, int], color2: Tuple[int, int, int], factor: float) -> Tuple[int, int, int]:
-        """Blend two colors with given factor (0.0 = color1, 1.0 = color2)"""
-        factor = max(0.0, min(1.0, factor))
-        return (
-            int(color1[0] * (1 - factor) + color2[0] * factor),
-            int(color1[1] * (1 - factor) + color2[1] * factor),
-            int(color1[2] * (1 - factor) + color2[2] * factor)
-        )
+        # Color based on memory state
+        if per_tile > 1:
+            color, activity_types, activity_fade = self.aggregate_tiles()
+        else:
+            color = self.owner_palette[self.memory_owner]
+            activity_types = self.memory_activity_type
+            activity_fade = self.memory_activity_fade
+        
+        # Overlay memory activity (reads/writes with fading)
+        activity_color = color.copy()
+        activity_color[activity_types == VizEventType.READ] = COLOR_READ
+        activity_color[(activity_types == VizEventType.WRITE) |
+                       (activity_types == VizEventType.INC) |
+                       (activity_types == VizEventType.DEC)] = COLOR_WRITE
+        fade = np.clip(activity_fade, 0.0, 1.0).astype(np.float64)[:, np.newaxis]
+        rgb = (color * (1 - fade) + activity_color * fade).astype(np.uint32)
+        
+        # Draw execution trail, alpha-blended in order like overlapping surfaces
+        exec_color = np.array(COLOR_EXECUTION, dtype=np.uint32)
+        for addr, trail_fade in self.execution_trail:
+            tile = addr // per_tile
+            if tile < core_size:
+                alpha = int(255 * trail_fade)
+                rgb[tile] = (exec_color * alpha + rgb[tile] * (255 - alpha)) // 255
+        
+        red_shift, green_shift, blue_shift = self.grid_shifts
+        cell_colors = self.cell_colors
+        cell_colors[:core_size] = (rgb[:, 0] << red_shift) | (rgb[:, 1] << green_shift) | (rgb[:, 2] << blue_shift)
+        
+        # Expand cells to pixels and draw the whole grid with a single blit
+        pygame.surfarray.blit_array(self.grid_surface, np.take(cell_colors, self.grid_pixel_index))
+        self.screen.blit(self.grid_surface, (MEMORY_START_X, MEMORY_START_Y))
     
     def draw_ui(self):
         """Draw the user interface"""
@@ -426,26 +702,42 @@ class CoreWarVisualizer:
         self.screen.blit(title, (ui_x + 10, ui_y + 10))
         current_y = ui_y + 50
         
+        # Frame recordings count frames instead of events and know process counts
+        step_name = "Frame" if self.frames is not None else "Event"
+        processes = ["", ""]
+        if self.frames is not None and self.current_event > self.chunk_start:
+            tasks = self.frames.tasks[self.current_event - self.chunk_start - 1]
+            processes = [f"  Processes: {tasks[warrior_id]}" if warrior_id < len(tasks) else ""
+                         for warrior_id in (0, 1)]
+        
+        # Melees list the first two warriors; the rest only get their colors
+        names = self.warrior_names + ["", ""]
+        starts = self.warrior_starts + [0, 0]
+        if self.battle is not None:
+            round_info = f"Round: {self.round_index + 1}/{len(self.battle)}"
+        else:
+            round_info = f"Round: {self.round_index + 1} (live)" if self.live else ""
+        
         # Battle info
         battle_info = [
             f"Core Size: {self.header.core_size}",
             f"Total Cycles: {self.header.total_cycles}",
-            f"Total Events: {self.header.total_events}",
-            "",
-            "Warriors:",
-            f"  {self.header.warrior1_name}",
-            f"  Start: {self.header.warrior1_start}",
+            f"Total Events: {self.total_events if self.live else self.header.total_events}",
+            round_info,
+            f"Warriors: {len(self.warrior_names)}" if len(self.warrior_names) > 2 else "Warriors:",
+            f"  {names[0]}",
+            f"  Start: {starts[0]}",
             f"  Status: {'ELIMINATED' if 0 in self.warrior_eliminations else 'Active'}",
-            "",
-            f"  {self.header.warrior2_name}",
-            f"  Start: {self.header.warrior2_start}",
+            processes[0],
+            f"  {names[1]}",
+            f"  Start: {starts[1]}",
             f"  Status: {'ELIMINATED' if 1 in self.warrior_eliminations else 'Active'}",
-            "",
+            processes[1],
             "Status:",
             f"  Cycle: {self.current_cycle}",
-            f"  Event: {self.current_event}/{len(self.events)}",
+            f"  {step_name}: {self.current_event}/{self.total_events}",
             f"  Playing: {'Yes' if self.playing else 'Paused'}",
-            f"  Speed: {self.animation_speed:.1f} events/sec",
+            f"  Speed: {self.animation_speed:.1f} {step_name.lower()}s/sec",
             "",
             "Progress:",
         ]
@@ -457,8 +749,13 @@ class CoreWarVisualizer:
             current_y += 20
         
         # Progress bar
-        if len(self.events) > 0:
-            progress = self.current_event / len(self.events)
+        if self.total_events > 0:
+            span = None if self.live else self.cycle_span
+            progress = self.current_event / self.total_events
+            if span is not None and span[0] > span[1]:
+                # The bar is a time axis, as scrubbing seeks by cycle
+                elapsed = span[0] - self.current_cycle if self.current_event else 0
+                progress = min(max(elapsed / (span[0] - span[1]), 0.0), 1.0)
             bar_width = ui_width - 40
             bar_height = 20
             bar_x = ui_x + 20
@@ -473,6 +770,14 @@ class CoreWarVisualizer:
             
             # Progress bar border
             pygame.draw.rect(self.screen, COLOR_TEXT, (bar_x, bar_y, bar_width, bar_height), 2)
+            self.progress_bar_rect = pygame.Rect(bar_x, bar_y, bar_width, bar_height)
+            
+            # Cycle under the mouse pointer, to aim a seek
+            if span is not None and not self.record_video:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                if self.progress_bar_rect.collidepoint(mouse_x, mouse_y):
+                    text = self.font_small.render(f"Cycle {self.cycle_at_bar(mouse_x)}", True, COLOR_TEXT)
+                    self.screen.blit(text, (bar_x, bar_y + bar_height + 2))
             
             current_y += 40
         
@@ -487,6 +792,8 @@ class CoreWarVisualizer:
             "  DOWN - Slow Down (0.5x)",
             "  HOME - Restart",
             "  END - Jump to End",
+            "  PGUP/PGDN - Prev/Next Round" if self.battle is not None and len(self.battle) > 1 else "",
+            "  CLICK BAR - Seek",
             "  ESC - Exit",
             "",
             "Legend:",
@@ -521,14 +828,9 @@ class CoreWarVisualizer:
     
     def update_memory_activity_fade(self):
         """Update fading for memory activity indicators"""
-        to_remove = []
-        for address in self.memory_activity:
-            self.memory_activity[address]['fade'] *= EXECUTION_FADE_SPEED
-            if self.memory_activity[address]['fade'] < 0.1:
-                to_remove.append(address)
-        
-        for address in to_remove:
-            del self.memory_activity[address]
+        fade = self.memory_activity_fade
+        fade *= EXECUTION_FADE_SPEED
+        fade[fade < 0.1] = 0.0
         
         # Update execution trail fade
         for i in range(len(self.execution_trail)):
@@ -538,47 +840,170 @@ class CoreWarVisualizer:
         # Remove very faded execution trail entries
         self.execution_trail = [(addr, fade) for addr, fade in self.execution_trail if fade > 0.1]
     
-    def process_event(self, event: VizEvent):
+    def process_event(self, index: int):
         """Process a single visualization event"""
-        if event.event_type == VizEventType.CYCLE:
-            self.current_cycle = event.cycle
+        if self.frames is not None:
+            self.apply_frame_range(index, index + 1)
+            return
+        
+        event_type = self.event_types[index]
+        address = int(self.event_addresses[index])
+        warrior_id = int(self.event_warriors[index])
+        
+        if address >= len(self.memory_owner):
+            return  # Outside the core (CYCLE and DIE always log address 0)
+        
+        if event_type == VizEventType.CYCLE:
+            self.current_cycle = int(self.event_cycles[index])
             
-        elif event.event_type == VizEventType.EXEC:
+        elif event_type == VizEventType.EXEC:
             # Mark execution at address
-            self.memory_state[event.address] = {'warrior': event.warrior_id, 'type': 'exec'}
+            self.memory_owner[address] = warrior_id
             
             # Add to execution trail
-            self.execution_trail.append((event.address, 1.0))
+            self.execution_trail.append((address, 1.0))
             if len(self.execution_trail) > EXECUTION_TRAIL_LENGTH:
                 self.execution_trail.pop(0)
                 
-        elif event.event_type == VizEventType.WRITE:
+        elif event_type == VizEventType.WRITE:
             # Mark memory write
-            self.memory_state[event.address] = {'warrior': event.warrior_id, 'type': 'write'}
-            self.memory_activity[event.address] = {'type': VizEventType.WRITE, 'fade': 1.0}
+            self.memory_owner[address] = warrior_id
+            self.memory_activity_type[address] = VizEventType.WRITE
+            self.memory_activity_fade[address] = 1.0
             
-        elif event.event_type == VizEventType.READ:
+        elif event_type == VizEventType.READ:
             # Show memory read activity
-            self.memory_activity[event.address] = {'type': VizEventType.READ, 'fade': 1.0}
+            self.memory_activity_type[address] = VizEventType.READ
+            self.memory_activity_fade[address] = 1.0
             
-        elif event.event_type in [VizEventType.INC, VizEventType.DEC]:
+        elif event_type == VizEventType.INC or event_type == VizEventType.DEC:
             # Show memory modification activity
-            self.memory_activity[event.address] = {'type': event.event_type, 'fade': 1.0}
+            self.memory_activity_type[address] = event_type
+            self.memory_activity_fade[address] = 1.0
             
-        elif event.event_type == VizEventType.DIE:
+        elif event_type == VizEventType.DIE:
             # Track warrior elimination (when last process dies)  
             # This event typically only occurs when a warrior is completely eliminated
-            if event.warrior_id not in self.warrior_eliminations:
-                self.warrior_eliminations.add(event.warrior_id)
-                self.warrior_deaths.add(event.warrior_id)  # Keep this for compatibility
+            if warrior_id not in self.warrior_eliminations:
+                self.warrior_eliminations.add(warrior_id)
+                self.warrior_deaths.add(warrior_id)  # Keep this for compatibility
+    
+    def apply_event_range(self, lo: int, hi: int):
+        """Apply events lo..hi-1 of the current chunk in one vectorized pass.
+        
+        Equivalent to calling process_event on each index in order: for every
+        address only the last ownership change and the last activity flash in
+        the range survive, so those are the only ones written.
+        """
+        if self.frames is not None:
+            self.apply_frame_range(lo, hi)
+            return
+        
+        addresses = self.event_addresses[lo:hi]
+        in_core = addresses < len(self.memory_owner)
+        addresses = addresses[in_core].astype(np.intp)
+        types = self.event_types[lo:hi][in_core]
+        warriors = self.event_warriors[lo:hi][in_core]
+        
+        is_cycle = types == VizEventType.CYCLE
+        if is_cycle.any():
+            self.current_cycle = int(self.event_cycles[lo:hi][in_core][is_cycle][-1])
+        
+        is_exec = types == VizEventType.EXEC
+        is_write = types == VizEventType.WRITE
+        owned = is_exec | is_write
+        if owned.any():
+            cells, values = last_per_address(addresses[owned], warriors[owned])
+            self.memory_owner[cells] = values
+        
+        flashed = is_write | (types == VizEventType.READ) | (types == VizEventType.INC) | (types == VizEventType.DEC)
+        if flashed.any():
+            cells, values = last_per_address(addresses[flashed], types[flashed])
+            self.memory_activity_type[cells] = values
+            self.memory_activity_fade[cells] = 1.0
+        
+        # Only the most recent executions can still be part of the trail
+        if is_exec.any():
+            recent = addresses[is_exec][-EXECUTION_TRAIL_LENGTH:]
+            self.execution_trail.extend((int(address), 1.0) for address in recent)
+            del self.execution_trail[:-EXECUTION_TRAIL_LENGTH]
+        
+        for warrior_id in np.unique(warriors[types == VizEventType.DIE]):
+            self.warrior_eliminations.add(int(warrior_id))
+            self.warrior_deaths.add(int(warrior_id))
+    
+    def apply_frame_range(self, lo: int, hi: int):
+        """Apply frames lo..hi-1 in one vectorized pass.
+        
+        Within a frame executed cells take ownership before written ones, and
+        a warrior whose process count reaches 0 has been eliminated.
+        """
+        frames = self.frames
+        cells = slice(frames.cell_offsets[lo], frames.cell_offsets[hi])
+        addresses = frames.cell_addresses[cells].astype(np.intp)
+        warriors = frames.cell_warriors[cells]
+        written = frames.cell_written[cells]
+        
+        self.current_cycle = int(frames.cycles[hi - 1])
+        
+        if len(addresses):
+            owner_cells, owners = last_per_address(addresses, warriors)
+            self.memory_owner[owner_cells] = owners
+        
+        if written.any():
+            flashed = addresses[written]
+            self.memory_activity_type[flashed] = VizEventType.WRITE
+            self.memory_activity_fade[flashed] = 1.0
+        
+        executed = addresses[~written]
+        if len(executed):
+            self.execution_trail.extend((int(address), 1.0) for address in executed[-EXECUTION_TRAIL_LENGTH:])
+            del self.execution_trail[:-EXECUTION_TRAIL_LENGTH]
+        
+        for warrior_id in np.flatnonzero((frames.tasks[lo:hi] == 0).any(axis=0)):
+            self.warrior_eliminations.add(int(warrior_id))
+            self.warrior_deaths.add(int(warrior_id))
+    
+    def apply_events(self, count: int):
+        """Advance by count events, batching them instead of stepping one by one.
+        
+        Batches are split at chunk and keyframe boundaries so streaming and
+        keyframe capture behave exactly as with step_forward.
+        """
+        target = min(self.current_event + count, self.total_events)
+        while self.current_event < target:
+            index = self.current_event - self.chunk_start
+            if index >= len(self.events):
+                if not self.next_event_chunk():
+                    return
+                index = 0
+            next_keyframe = (self.current_event // self.keyframe_interval + 1) * self.keyframe_interval
+            stop = min(target, next_keyframe, self.chunk_start + len(self.events))
+            self.apply_event_range(index, stop - self.chunk_start)
+            self.current_event = stop
+            if self.keyframe_due():
+                self.capture_keyframe()
     
     def determine_battle_result(self):
         """Determine the battle outcome based on events processed so far"""
-        if not self.battle_complete and self.current_event >= len(self.events):
+        if self.live and not self.live_ended:
+            return
+        if not self.battle_complete and self.current_event >= self.total_events:
             # Battle has ended
             self.battle_complete = True
             
-            # Primary method: Check for DIE events
+            # The round index records who survived
+            if self.battle is not None:
+                winner = self.battle.winner(self.round_index)
+                self.battle_result = 'draw' if winner is None else f'warrior{winner + 1}'
+                return
+            
+            # Primary method: Check for DIE events, all of which the summary
+            # knows even if playback skipped some
+            summary = self.ensure_summary()
+            if summary is not None:
+                stop = self.event_stop if self.event_stop is not None else summary.total_events
+                self.warrior_deaths = summary.deaths(self.event_base, stop)
             if len(self.warrior_deaths) == 1:
                 # One warrior died - the other won
                 if 0 in self.warrior_deaths:
@@ -594,18 +1019,19 @@ class CoreWarVisualizer:
     
     def determine_result_from_activity(self):
         """Fallback method to determine winner from execution activity when DIE events are missing"""
-        if not self.events:
+        if self.total_events == 0 or self.frames is not None:
+            # Frames carry process counts, so nobody dropping to 0 is a draw
             self.battle_result = 'draw'
             return
             
-        # Count execution events per warrior
-        warrior_exec_counts = {0: 0, 1: 0}
-        warrior_last_cycle = {0: -1, 1: -1}
-        
-        for event in self.events:
-            if event.event_type == VizEventType.EXEC and event.warrior_id in [0, 1]:
-                warrior_exec_counts[event.warrior_id] += 1
-                warrior_last_cycle[event.warrior_id] = max(warrior_last_cycle[event.warrior_id], event.cycle)
+        # Count execution events per warrior. Without a round index the
+        # battle is the whole file, which the summary has counted already.
+        summary = self.ensure_summary()
+        if summary is not None:
+            warrior_exec_counts = summary.exec_counts.tolist()
+            warrior_last_cycle = summary.last_exec_cycles.tolist()
+        else:
+            warrior_exec_counts, warrior_last_cycle = self.exec_activity(self.events)
         
         print(f"Execution analysis: Warrior 0: {warrior_exec_counts[0]} execs, Warrior 1: {warrior_exec_counts[1]} execs")
         print(f"Last cycles: Warrior 0: {warrior_last_cycle[0]}, Warrior 1: {warrior_last_cycle[1]}")
@@ -641,27 +1067,144 @@ class CoreWarVisualizer:
         else:
             self.battle_result = 'draw'  # True draw
     
+    def exec_activity(self, events: np.ndarray) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Per-warrior execution counts and last execution cycles"""
+        warrior_exec_counts = {0: 0, 1: 0}
+        warrior_last_cycle = {0: -1, 1: -1}
+        
+        is_exec = events['event_type'] == VizEventType.EXEC
+        for warrior_id in (0, 1):
+            exec_cycles = events['cycle'][is_exec & (events['warrior_id'] == warrior_id)]
+            if len(exec_cycles) > 0:
+                warrior_exec_counts[warrior_id] = len(exec_cycles)
+                warrior_last_cycle[warrior_id] = int(exec_cycles.max())
+        return warrior_exec_counts, warrior_last_cycle
+    
     def step_forward(self):
         """Step one event forward"""
-        if self.current_event < len(self.events):
-            event = self.events[self.current_event]
-            self.process_event(event)
+        if self.current_event < self.total_events:
+            index = self.current_event - self.chunk_start
+            if index >= len(self.events):
+                if not self.next_event_chunk():
+                    return
+                index = 0
+            self.process_event(index)
             self.current_event += 1
+            if self.keyframe_due():
+                self.capture_keyframe()
     
     def step_backward(self):
         """Step one event backward"""
         if self.current_event > 0:
-            self.current_event -= 1
-            # For true backward stepping, we'd need to rebuild state from beginning
-            # For now, just decrement counter
+            self.seek(self.current_event - 1)
+    
+    def keyframe_due(self) -> bool:
+        """Whether playing forward has reached a keyframe not taken yet.
+        
+        Recording never seeks back after start_segment, so it keeps only the
+        keyframe at event 0.
+        """
+        return (not self.record_video and self.current_event % self.keyframe_interval == 0 and
+                self.current_event not in self.keyframes)
+    
+    def capture_keyframe(self):
+        """Snapshot the current state so seeks can resume from here.
+        
+        Once the snapshots would exceed KEYFRAME_MEMORY the interval doubles
+        and every other one is dropped, so long battles (and streamed ones of
+        any length) keep a bounded number spread over the whole battle.
+        """
+        self.keyframes[self.current_event] = Keyframe(
+            event_index=self.current_event,
+            cycle=self.current_cycle,
+            memory_owner=self.memory_owner.copy(),
+            memory_activity_type=self.memory_activity_type.copy(),
+            memory_activity_fade=self.memory_activity_fade.copy(),
+            execution_trail=list(self.execution_trail),
+            warrior_eliminations=set(self.warrior_eliminations),
+            warrior_deaths=set(self.warrior_deaths)
+        )
+        size = self.memory_owner.nbytes + self.memory_activity_type.nbytes + self.memory_activity_fade.nbytes
+        if len(self.keyframes) > max(2, KEYFRAME_MEMORY // size):
+            self.keyframe_interval *= 2
+            self.keyframes = {index: keyframe for index, keyframe in self.keyframes.items()
+                              if index % self.keyframe_interval == 0}
+    
+    def restore_keyframe(self, keyframe: Keyframe):
+        """Put the visualizer back into the state captured by a keyframe"""
+        if self.stream_events:
+            self.open_event_stream(keyframe.event_index)
+        self.current_event = keyframe.event_index
+        self.current_cycle = keyframe.cycle
+        self.memory_owner[:] = keyframe.memory_owner
+        self.memory_activity_type[:] = keyframe.memory_activity_type
+        self.memory_activity_fade[:] = keyframe.memory_activity_fade
+        self.execution_trail = list(keyframe.execution_trail)
+        self.warrior_eliminations = set(keyframe.warrior_eliminations)
+        self.warrior_deaths = set(keyframe.warrior_deaths)
+        
+        self.battle_complete = False
+        self.battle_result = None
+        self.victory_animation_time = 0.0
+    
+    def seek(self, target: int):
+        """Move to absolute event index target.
+        
+        Restores the nearest keyframe at or before the target and replays only
+        the events in between. Keyframes are taken while playing forward, so
+        seeking past the furthest point reached so far replays from there.
+        """
+        target = max(0, min(target, self.total_events))
+        nearest = (target // self.keyframe_interval) * self.keyframe_interval
+        while nearest not in self.keyframes:
+            nearest -= self.keyframe_interval
+        
+        # Replaying from the current position is cheaper when it lies in between
+        if not (nearest <= self.current_event <= target):
+            self.restore_keyframe(self.keyframes[nearest])
+        self.apply_events(target - self.current_event)
+    
+    def seek_cycle(self, cycle: int):
+        """Move to the first event of cycle, or of the next cycle with events.
+        
+        The summary's cycle table lands within SUMMARY_CYCLE_STEP events of
+        it; the events in between are replayed up to the exact one. The
+        cycle counter counts down within a round.
+        """
+        start = 0
+        summary = self.ensure_summary()
+        if summary is not None:
+            start = summary.event_at_cycle(cycle, self.event_base, self.event_base + self.total_events) - self.event_base
+        self.seek(start)
+        while self.current_event < self.total_events:
+            index = self.current_event - self.chunk_start
+            if index >= len(self.events):
+                if not self.next_event_chunk():
+                    return
+                continue
+            cycles = self.event_cycles[index:index + SUMMARY_CYCLE_STEP].astype(np.int64)
+            before = int(np.searchsorted(-cycles, -cycle, side='left'))
+            self.apply_events(before)
+            if before < len(cycles):
+                return
+    
+    def cycle_at_bar(self, x: int) -> int:
+        """Cycle at position x of the progress bar, which runs from the first
+        to the last cycle"""
+        first, last = self.cycle_span
+        bar = self.progress_bar_rect
+        fraction = min(max((x - bar.x) / bar.width, 0.0), 1.0)
+        return int(round(first - (first - last) * fraction))
     
     def reset_to_start(self):
         """Reset to beginning of battle"""
+        if self.stream_events and self.chunk_start > 0:
+            self.open_event_stream()
         self.current_event = 0
         self.current_cycle = 0
-        self.memory_state.clear()
+        self.memory_owner.fill(-1)
         self.execution_trail.clear()
-        self.memory_activity.clear()
+        self.memory_activity_fade.fill(0.0)
         
         # Reset battle result state
         self.battle_complete = False
@@ -672,8 +1215,26 @@ class CoreWarVisualizer:
         
         # Mark initial warrior positions
         if self.header:
-            self.memory_state[self.header.warrior1_start] = {'warrior': 0, 'type': 'start'}
-            self.memory_state[self.header.warrior2_start] = {'warrior': 1, 'type': 'start'}
+            for warrior_id, start in enumerate(self.warrior_starts):
+                if start < len(self.memory_owner):
+                    self.memory_owner[start] = warrior_id
+        
+        if 0 not in self.keyframes:
+            self.capture_keyframe()
+    
+    def select_round(self, number: int):
+        """Switch to round number (from 1), reading only that round's events"""
+        if self.battle is None or not 1 <= number <= len(self.battle):
+            return
+        self.round_number = number
+        self.event_stream = None
+        self.cycle_span = None
+        self.frames = None
+        self.load_viz_file()
+        self.keyframes = {}
+        self.keyframe_interval = KEYFRAME_INTERVAL
+        self.reset_to_start()
+        self.playing = True
     
     def draw_victory_screen(self):
         """Draw the victory/draw screen with animation"""
@@ -690,14 +1251,11 @@ class CoreWarVisualizer:
         pulse_scale = 1.0 + 0.1 * abs(math.sin(self.victory_animation_time * 3))
         glow_alpha = int(128 + 127 * abs(math.sin(self.victory_animation_time * 2)))
         
-        # Determine victory message and colors
-        if self.battle_result == 'warrior1':
-            winner_name = self.header.warrior1_name
-            winner_color = COLOR_WARRIOR1
-            result_text = "VICTORY!"
-        elif self.battle_result == 'warrior2':
-            winner_name = self.header.warrior2_name
-            winner_color = COLOR_WARRIOR2
+        # Determine victory message and colors ('warriorN' is warrior N-1)
+        if self.battle_result.startswith('warrior'):
+            winner_id = int(self.battle_result[len('warrior'):]) - 1
+            winner_name = self.warrior_names[winner_id]
+            winner_color = tuple(int(c) for c in self.owner_palette[winner_id])
             result_text = "VICTORY!"
         else:
             winner_name = None
@@ -763,7 +1321,7 @@ class CoreWarVisualizer:
         stats_y = center_y + 80
         stats_lines = [
             f"Total Cycles: {self.current_cycle}",
-            f"Total Events: {len(self.events)}",
+            f"Total Events: {self.total_events}",
         ]
         
         for i, line in enumerate(stats_lines):
@@ -808,13 +1366,7 @@ class CoreWarVisualizer:
         
         # Generate output filename if not provided
         if not self.video_output:
-            viz_name = self.viz_file.replace('.viz', '').replace('\\', '_').replace('/', '_')
-            if self.header:
-                safe_name1 = self.header.warrior1_name.replace(' ', '_').replace('/', '_')
-                safe_name2 = self.header.warrior2_name.replace(' ', '_').replace('/', '_')
-                self.video_output = f"{viz_name}_{safe_name1}_vs_{safe_name2}.mp4"
-            else:
-                self.video_output = f"{viz_name}_battle.mp4"
+            self.video_output = default_video_output(self.viz_file, self.header, self.round_number)
         
         # Initialize video writer
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
@@ -825,6 +1377,12 @@ class CoreWarVisualizer:
             self.record_video = False
             return
         
+        # Encoding runs on its own thread so it overlaps with drawing the next
+        # frame; the bounded queue keeps the renderer from running far ahead
+        self.encoder_queue = queue.Queue(maxsize=ENCODER_QUEUE_FRAMES)
+        self.encoder_thread = threading.Thread(target=self.encode_frames, daemon=True)
+        self.encoder_thread.start()
+        
         print(f"Recording video to: {self.video_output}")
         print(f"Video settings: {WINDOW_WIDTH}x{WINDOW_HEIGHT} @ {self.video_fps}fps")
         print(f"Animation speed: {self.animation_speed} events/sec")
@@ -834,28 +1392,75 @@ class CoreWarVisualizer:
         if not self.record_video or not self.video_writer:
             return
         
-        # Get pygame surface as numpy array
-        frame_surface = pygame.surfarray.array3d(self.screen)
-        
-        # Convert from pygame (width, height, 3) to OpenCV (height, width, 3)
-        frame = np.transpose(frame_surface, (1, 0, 2))
-        
-        # Convert RGB to BGR (OpenCV format)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        # The screen is redrawn for the next frame, so hand the encoder a copy
+        width, height = self.screen.get_size()
+        if self.screen.get_bytesize() == 4 and self.screen.get_masks()[:3] == (0xFF0000, 0xFF00, 0xFF) and sys.byteorder == 'little':
+            # Pixels are stored as B, G, R, X bytes in rows: already OpenCV's
+            # (height, width) orientation, so only the padding byte is dropped
+            pixels = np.frombuffer(self.screen.get_buffer(), dtype=np.uint8)
+            pixels = pixels.reshape(height, self.screen.get_pitch() // 4, 4)[:, :width]
+            frame = cv2.cvtColor(pixels, cv2.COLOR_BGRA2BGR)
+        else:
+            pixels = np.frombuffer(pygame.image.tobytes(self.screen, 'RGB'), dtype=np.uint8)
+            frame = cv2.cvtColor(pixels.reshape(height, width, 3), cv2.COLOR_RGB2BGR)
         
-        # Write frame to video
-        self.video_writer.write(frame)
+        self.encoder_queue.put(frame)
+    
+    def encode_frames(self):
+        """Encoder thread: write queued frames until the None sentinel arrives"""
+        while True:
+            frame = self.encoder_queue.get()
+            if frame is None:
+                break
+            self.video_writer.write(frame)
     
     def finalize_video(self):
         """Finalize and close video file"""
+        if self.encoder_thread:
+            self.encoder_queue.put(None)
+            self.encoder_thread.join()
         if self.video_writer:
             self.video_writer.release()
             print(f"Video saved: {self.video_output}")
             
     def jump_to_end(self):
         """Jump to end of battle"""
-        while self.current_event < len(self.events):
-            self.step_forward()
+        self.seek(self.total_events)
+    
+    def record_events_per_frame(self) -> int:
+        """Events advanced per video frame while recording"""
+        return max(1, int(self.animation_speed / self.video_fps))
+    
+    def start_segment(self):
+        """Bring the state to the first frame of this process's segment.
+        
+        Battle frames are split evenly between segments; the last one also
+        records the victory screen. Activity flashes and the execution trail
+        fade out within FADE_OUT_FRAMES frames, so replaying that many frames
+        (without drawing) after a seek reproduces the exact state a serial
+        recording would have at the segment start.
+        """
+        index, count = self.segment
+        events_per_frame = self.record_events_per_frame()
+        battle_frames = max(1, math.ceil(self.total_events / events_per_frame))
+        first = battle_frames * index // count
+        if index < count - 1:
+            self.segment_end = battle_frames * (index + 1) // count
+        
+        warmup_start = max(0, first - FADE_OUT_FRAMES)
+        self.seek(warmup_start * events_per_frame)
+        for _ in range(warmup_start, first):
+            self.play_frame(events_per_frame)
+            self.update_memory_activity_fade()
+        self.segment_start = self.frames_rendered = first
+        print(f"Segment {index + 1}/{count}: frames {first}-{(self.segment_end or battle_frames) - 1} of {battle_frames}")
+    
+    def play_frame(self, events_per_frame: int):
+        """Advance playback by one frame's worth of events, pausing at the end"""
+        remaining = self.total_events - self.current_event
+        self.apply_events(events_per_frame)
+        if events_per_frame > remaining:
+            self.playing = False
     
     def run(self):
         """Main visualization loop"""
@@ -865,9 +1470,16 @@ class CoreWarVisualizer:
         if self.record_video:
             self.playing = True
             print("Video recording mode: Auto-playing battle...")
+            if self.segment:
+                self.start_segment()
+                running = self.segment_end is None or self.segment_start < self.segment_end
         
         while running:
-            dt = self.clock.tick(self.video_fps if self.record_video else 60) / 1000.0
+            # Recording runs on a virtual clock instead: frame N shows time
+            # N / fps however fast it is produced, so exports are not held to
+            # real time and come out the same on every run
+            if not self.record_video:
+                dt = self.clock.tick(60) / 1000.0
             
             # Handle events (only if not recording video)
             if not self.record_video:
@@ -880,6 +1492,8 @@ class CoreWarVisualizer:
                             running = False
                         elif event.key == pygame.K_SPACE:
                             self.playing = not self.playing
+                        elif self.live:
+                            pass  # A live stream plays as it arrives and cannot seek
                         elif event.key == pygame.K_RIGHT:
                             self.step_forward()
                         elif event.key == pygame.K_LEFT:
@@ -888,6 +1502,10 @@ class CoreWarVisualizer:
                             self.reset_to_start()
                         elif event.key == pygame.K_END:
                             self.jump_to_end()
+                        elif event.key == pygame.K_PAGEUP:
+                            self.select_round(self.round_index)
+                        elif event.key == pygame.K_PAGEDOWN:
+                            self.select_round(self.round_index + 2)
                         elif event.key == pygame.K_UP:
                             # Speed up animation
                             self.animation_speed = min(self.animation_speed * 2.0, 9999999999999999.0)
@@ -896,36 +1514,30 @@ class CoreWarVisualizer:
                             # Slow down animation
                             self.animation_speed = max(self.animation_speed / 2.0, 0.1)
                             print(f"Animation speed: {self.animation_speed:.1f} events/sec")
-            else:
-                # In video mode, just handle quit events
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        running = False
+                    
+                    elif ((event.type == pygame.MOUSEBUTTONDOWN and event.button == 1) or
+                          (event.type == pygame.MOUSEMOTION and event.buttons[0])):
+                        # Scrub by clicking or dragging on the progress bar
+                        bar = self.progress_bar_rect
+                        if bar and not self.live and bar.collidepoint(event.pos):
+                            if self.cycle_span and self.cycle_span[0] > self.cycle_span[1]:
+                                self.seek_cycle(self.cycle_at_bar(event.pos[0]))
+                            else:
+                                self.seek(int(self.total_events * (event.pos[0] - bar.x) / bar.width))
             
             # Auto-advance animation
-            if self.playing:
+            if self.live:
+                self.poll_live_stream()
+            elif self.playing:
                 if self.record_video:
                     # In record mode: process multiple events per frame based on animation speed
-                    events_per_frame = max(1, int(self.animation_speed / self.video_fps))
-                    
-                    for _ in range(events_per_frame):
-                        if self.current_event < len(self.events):
-                            self.step_forward()
-                        else:
-                            self.playing = False
-                            break
+                    self.play_frame(self.record_events_per_frame())
                 else:
                     # In interactive mode: use high-speed processing for speeds above 1000 events/sec
                     if self.animation_speed > 1000.0:
                         # High speed mode: process multiple events per frame
                         events_per_frame = max(1, int(self.animation_speed / 60))  # 60 FPS target
-                        
-                        for _ in range(events_per_frame):
-                            if self.current_event < len(self.events):
-                                self.step_forward()
-                            else:
-                                self.playing = False
-                                break
+                        self.play_frame(events_per_frame)
                     else:
                         # Low speed mode: use timing-based animation for smooth visualization
                         current_time = time.time()
@@ -934,7 +1546,7 @@ class CoreWarVisualizer:
                             self.last_event_time = current_time
                               
                             # Stop at end
-                            if self.current_event >= len(self.events):
+                            if self.current_event >= self.total_events:
                                 self.playing = False
             
             # Check if battle is complete
@@ -945,15 +1557,16 @@ class CoreWarVisualizer:
             
             # Update victory animation
             if self.battle_complete:
-                self.victory_animation_time += dt
-                
                 # In video mode, record victory screen for a few seconds then exit
                 if self.record_video:
                     self.victory_frames_recorded += 1
+                    self.victory_animation_time = self.victory_frames_recorded / self.video_fps
                     # Record victory screen for ~3 seconds
                     if self.victory_frames_recorded > (self.video_fps * 3):
                         print("Video recording complete!")
                         running = False
+                else:
+                    self.victory_animation_time += dt
             
             # Draw everything
             self.screen.fill(COLOR_BACKGROUND)
@@ -964,15 +1577,18 @@ class CoreWarVisualizer:
             if self.battle_complete:
                 self.draw_victory_screen()
             
-            pygame.display.flip()
-            
             # Capture frame for video recording
             if self.record_video:
                 self.capture_frame()
+                self.frames_rendered += 1
+                if self.segment_end is not None and self.frames_rendered >= self.segment_end:
+                    running = False
                 
                 # Exit when battle is complete and no victory screen to record
                 if self.battle_complete and not self.battle_result:
                     running = False
+            else:
+                pygame.display.flip()
         
         # Cleanup
         if self.record_video:
@@ -980,6 +1596,92 @@ class CoreWarVisualizer:
         
         pygame.quit()
 
+def open_live_source(source: str):
+    """Open the byte stream of a --live source: '-' for stdin, 'unix:PATH' to
+    listen on a Unix socket until pmars connects to it, otherwise a FIFO"""
+    if source == '-':
+        return sys.stdin.buffer
+    if source.startswith('unix:'):
+        path = source[len('unix:'):]
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.unlink(path)  # Left behind by an earlier viewer
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        print(f"Waiting for pmars -T {source} ...")
+        try:
+            connection, _ = server.accept()
+        finally:
+            server.close()
+            os.unlink(path)
+        return connection.makefile('rb')
+    return open(source, 'rb')
+
+def default_video_output(viz_file: str, header: Optional[VizHeader], round_number: Optional[int] = None) -> str:
+    """Video filename derived from the recording, warrior names and round"""
+    viz_name = viz_file.replace('.viz', '').replace('\\', '_').replace('/', '_')
+    if round_number:
+        viz_name += f"_round{round_number}"
+    if header:
+        safe_name1 = header.warrior1_name.replace(' ', '_').replace('/', '_')
+        safe_name2 = header.warrior2_name.replace(' ', '_').replace('/', '_')
+        return f"{viz_name}_{safe_name1}_vs_{safe_name2}.mp4"
+    return f"{viz_name}_battle.mp4"
+
+def render_segment(options: dict, index: int, count: int):
+    """Worker process: record one segment of the battle to its own file"""
+    visualizer = CoreWarVisualizer(segment=(index, count), **options)
+    visualizer.run()
+    if visualizer.frames_rendered == visualizer.segment_start:
+        return None  # More processes than battle frames
+    return visualizer.video_output
+
+def concat_videos(parts: List[str], output: str, fps: int):
+    """Join segment videos into one file, without re-encoding when ffmpeg is available"""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg:
+        list_file = output + '.parts.txt'
+        with open(list_file, 'w') as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        try:
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                            '-i', list_file, '-c', 'copy', output], check=True)
+        finally:
+            os.remove(list_file)
+        return
+    
+    # No ffmpeg: decode the segments and write their frames into a single file
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps, (WINDOW_WIDTH, WINDOW_HEIGHT))
+    for part in parts:
+        capture = cv2.VideoCapture(part)
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            writer.write(frame)
+        capture.release()
+    writer.release()
+
+def record_parallel(options: dict, jobs: int):
+    """Record a video by rendering segments of the battle in parallel processes"""
+    output = options['video_output']
+    if not output:
+        with open(options['viz_file'], 'rb') as f:
+            output = default_video_output(options['viz_file'], read_header(f), options['round_number'])
+    
+    print(f"Rendering {output} with {jobs} processes...")
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output))) as tmp:
+        worker_args = []
+        for index in range(jobs):
+            part_options = dict(options, video_output=os.path.join(tmp, f"part{index:03d}.mp4"))
+            worker_args.append((part_options, index, jobs))
+        # Spawned rather than forked so every worker gets its own SDL state
+        with multiprocessing.get_context('spawn').Pool(jobs) as pool:
+            parts = pool.starmap(render_segment, worker_args)
+        concat_videos([part for part in parts if part], output, options['video_fps'])
+    print(f"Video saved: {output}")
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(
@@ -1001,9 +1703,19 @@ Examples:
   
   # Record video with custom settings  
   python visualizer.py battle.viz --record --output my_battle.mp4 --fps 60 --speed 100
+  
+  # Record using 8 processes, each rendering part of the battle
+  python visualizer.py battle.viz --record --duration 60 --jobs 8
+  
+  # Start at round 3 of a multi-round recording (PGUP/PGDN switch rounds)
+  python visualizer.py battle.viz --round 3
+  
+  # Watch a battle while pmars plays it
+  pmars -r 10 -T - warrior1.red warrior2.red | python visualizer.py --live -
+  python visualizer.py --live unix:/tmp/pmars.sock   (then: pmars -T unix:/tmp/pmars.sock ...)
         """)
     
-    parser.add_argument('viz_file', help='Input .viz file to visualize')
+    parser.add_argument('viz_file', help='Input .viz file to visualize (with --live: -, unix:PATH or a FIFO)')
     parser.add_argument('--record', action='store_true', 
                         help='Record visualization as MP4 video')
     parser.add_argument('--output', '-o', metavar='FILE', 
@@ -1016,11 +1728,25 @@ Examples:
                         help='Target video duration in seconds (auto-calculates speed, overrides --speed)')
     parser.add_argument('--interactive-duration', type=float, metavar='SECONDS',
                         help='Target duration for interactive visualization (auto-calculates speed for long battles)')
+    source_group = parser.add_mutually_exclusive_group()
+    source_group.add_argument('--mmap', action='store_true',
+                              help='Memory-map the event stream instead of loading it (instant start for large files)')
+    source_group.add_argument('--stream', action='store_true',
+                              help='Read events in fixed-size chunks during playback (bounded memory for huge recordings)')
+    source_group.add_argument('--live', action='store_true',
+                              help='Watch a recording while pmars writes it to stdin, a Unix socket or a FIFO')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Render the video in N parallel processes (with --record)')
+    parser.add_argument('--round', type=int, metavar='N', dest='round_number',
+                        help='Round to play when the recording has a round index (default: 1)')
     
     args = parser.parse_args()
     
     # Validate input file
-    if not args.viz_file.endswith('.viz'):
+    if args.live and (args.record or args.round_number):
+        print("Error: --live cannot be combined with --record or --round")
+        sys.exit(1)
+    if not args.live and not args.viz_file.endswith('.viz'):
         print("Error: File must have .viz extension")
         sys.exit(1)
     
@@ -1030,16 +1756,29 @@ Examples:
         print("Install with: pip install opencv-python")
         sys.exit(1)
     
+    if args.jobs > 1 and not args.record:
+        print("Error: --jobs requires --record")
+        sys.exit(1)
+    
+    options = dict(
+        viz_file=args.viz_file,
+        record_video=args.record,
+        video_output=args.output,
+        video_fps=args.fps,
+        video_speed=args.speed,
+        target_duration=args.duration,
+        interactive_duration=args.interactive_duration,
+        use_mmap=args.mmap,
+        stream_events=args.stream,
+        round_number=args.round_number,
+        live=args.live
+    )
+    
     try:
-        visualizer = CoreWarVisualizer(
-            viz_file=args.viz_file,
-            record_video=args.record,
-            video_output=args.output,
-            video_fps=args.fps,
-            video_speed=args.speed,
-            target_duration=args.duration,
-            interactive_duration=args.interactive_duration
-        )
+        if args.jobs > 1:
+            record_parallel(options, args.jobs)
+            return
+        visualizer = CoreWarVisualizer(**options)
         visualizer.run()
     except KeyboardInterrupt:
         print("\nExiting...")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+CoreWar Visualization File Converter
+Rewrites .viz recordings between format versions and block codecs
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from viz_format import (VERSION_FLAT, VERSION_BLOCKS, VERSION_FRAMES, CODEC_STORED, CODEC_ZLIB, CODEC_LZMA,
+                        read_header, read_battle, load_events, write_viz, frames_from_events, concat_frames,
+                        write_frames, VizBattle)
+
+CODECS = {'stored': CODEC_STORED, 'zlib': CODEC_ZLIB, 'lzma': CODEC_LZMA}
+
+def frames_by_round(events, battle, warriors, frame_cycles):
+    """Aggregate each round on its own, as pmars does, and renumber the round index to frames"""
+    parts = [frames_from_events(events[slice(*battle.round_events(index))], warriors, frame_cycles)
+             for index in range(len(battle))]
+    rounds = battle.rounds.copy()
+    rounds['event_count'] = [len(part) for part in parts]
+    rounds['first_event'] = np.cumsum([0] + [len(part) for part in parts[:-1]])
+    return concat_frames(parts), VizBattle(warriors=battle.warriors, rounds=rounds,
+                                           positions=battle.positions, tasks=battle.tasks)
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(
+        description="Convert CoreWar .viz recordings between format versions",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compress a version-1 recording
+  python viz_convert.py battle.viz battle_v2.viz
+
+  # Smallest file, slower to write
+  python viz_convert.py battle.viz battle_v2.viz --codec lzma
+
+  # Back to fixed-size events (e.g. for --mmap)
+  python viz_convert.py battle_v2.viz battle_v1.viz --version 1
+
+  # Aggregate into frames of 10 cycles (lossy, like pmars -Y 3 -K 10)
+  python viz_convert.py battle.viz battle_v3.viz --version 3 --frame-cycles 10
+        """)
+    parser.add_argument('input', help='Input .viz file')
+    parser.add_argument('output', help='Output .viz file')
+    parser.add_argument('--version', type=int, choices=(VERSION_FLAT, VERSION_BLOCKS, VERSION_FRAMES),
+                        default=VERSION_BLOCKS, help='Output format version (default: 2)')
+    parser.add_argument('--codec', choices=sorted(CODECS), default='zlib',
+                        help='Block compression for versions 2 and 3 (default: zlib)')
+    parser.add_argument('--frame-cycles', type=int, default=1,
+                        help='Cycles per frame for version 3 (default: 1)')
+    args = parser.parse_args()
+
+    try:
+        with open(args.input, 'rb') as f:
+            header = read_header(f)
+            events = load_events(f, header)
+            battle = read_battle(f, header)
+        if args.version == VERSION_FRAMES:
+            frame_cycles = max(1, args.frame_cycles)
+            if battle is not None:
+                frames, battle = frames_by_round(events, battle, len(battle.warriors), frame_cycles)
+            else:
+                warriors = max(2, int(events['warrior_id'].max()) + 1) if len(events) else 2
+                frames = frames_from_events(events, warriors, frame_cycles)
+            write_frames(args.output, header, frames, codec=CODECS[args.codec], battle=battle)
+        else:
+            write_viz(args.output, header, events, version=args.version, codec=CODECS[args.codec], battle=battle)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"Converted {len(events):,} events: v{header.version} {os.path.getsize(args.input):,} bytes -> "
+          f"v{args.version} {os.path.getsize(args.output):,} bytes")
+
+if __name__ == "__main__":
+    main()
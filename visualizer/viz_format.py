@@ -0,0 +1,1027 @@
+#!/usr/bin/env python3
+"""
+CoreWar Visualization File Format
+Shared reader for .viz recordings produced by pmars -T (see src/visualizer.h)
+"""
+
+import lzma
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+VIZ_MAGIC = "PMARSREC"
+HEADER_SIZE = 168           # viz_header_t including the index offset
+EVENT_SIZE = 16             # viz_event_t
+
+# Format versions: v1 stores a flat array of viz_event_t, v2 a sequence of
+# independently compressed blocks followed by a block index, v3 the same
+# container with aggregated frames instead of events
+VERSION_FLAT = 1
+VERSION_BLOCKS = 2
+VERSION_FRAMES = 3
+
+# v2/v3 block kinds and codecs (viz_block_t)
+BLOCK_EVENTS = 0
+BLOCK_INDEX = 1
+BLOCK_FRAMES = 2
+BLOCK_WARRIORS = 3          # Trailer: warrior table
+BLOCK_ROUNDS = 4            # Trailer: round index
+CODEC_STORED = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+BLOCK_HEADER = struct.Struct('<BBHIII')  # kind, codec, flags, stored_size, raw_size, event_count
+BLOCK_MAX_EVENTS = 65536    # Events per block written by pmars
+BLOCK_MAX_FRAMES = 4096     # Frames per block written by pmars for two warriors
+
+# Event tag byte: type in the low bits plus flags for omitted fields
+TAG_TYPE = 0x0F
+TAG_DATA_CYCLE = 0x10       # data equals the cycle
+TAG_DATA_VARINT = 0x20      # data stored in the data column (else 0)
+TAG_NO_ADDRESS = 0x40       # address is 0 and not stored
+
+# v3 frame set flag: cells stored as a bitmap instead of an address list
+SET_BITMAP = 1
+
+class VizEventType(IntEnum):
+    """Event types for visualization recording"""
+    EXEC = 0      # Instruction execution
+    READ = 1      # Memory read
+    WRITE = 2     # Memory write
+    DEC = 3       # Memory decrement
+    INC = 4       # Memory increment
+    SPL = 5       # Process spawn
+    DAT = 6       # Process death
+    DIE = 7       # Warrior death
+    CYCLE = 8     # Cycle start
+    PUSH = 9      # Task queue push
+
+# Column layout of viz_event_t, so a v1 event region can be read in one pass.
+# Addresses are split in two halves; address_high is 0 in cores up to 64K.
+VIZ_FLAT_EVENT_DTYPE = np.dtype([
+    ('cycle', '<u4'),
+    ('address', '<u2'),
+    ('event_type', '<u2'),
+    ('warrior_id', 'u1'),
+    ('padding', 'u1'),
+    ('address_high', '<u2'),
+    ('data', '<u4'),
+])
+assert VIZ_FLAT_EVENT_DTYPE.itemsize == EVENT_SIZE
+
+# Decoded events as returned by the readers, with whole 32-bit addresses
+VIZ_EVENT_DTYPE = np.dtype([
+    ('cycle', '<u4'),
+    ('address', '<u4'),
+    ('event_type', '<u2'),
+    ('warrior_id', 'u1'),
+    ('padding', 'u1'),
+    ('data', '<u4'),
+])
+
+def events_from_flat(flat: np.ndarray) -> np.ndarray:
+    """Convert v1 records to VIZ_EVENT_DTYPE, joining the address halves"""
+    events = np.empty(len(flat), dtype=VIZ_EVENT_DTYPE)
+    for name in ('cycle', 'event_type', 'warrior_id', 'data'):
+        events[name] = flat[name]
+    events['padding'] = 0
+    events['address'] = event_addresses(flat)
+    return events
+
+def flat_from_events(events: np.ndarray) -> np.ndarray:
+    """Convert events to v1 records, splitting the addresses"""
+    flat = np.zeros(len(events), dtype=VIZ_FLAT_EVENT_DTYPE)
+    for name in ('cycle', 'event_type', 'warrior_id', 'data'):
+        flat[name] = events[name]
+    addresses = event_addresses(events).astype(np.uint32)
+    flat['address'] = addresses & 0xFFFF
+    flat['address_high'] = addresses >> 16
+    return flat
+
+def event_addresses(events: np.ndarray) -> np.ndarray:
+    """Whole addresses of decoded events or of (mapped) v1 records"""
+    if 'address_high' not in events.dtype.names:
+        return events['address']
+    return events['address'] | (events['address_high'].astype(np.uint32) << 16)
+
+@dataclass
+class VizHeader:
+    """Binary file header structure"""
+    magic: str
+    version: int
+    core_size: int
+    total_cycles: int
+    total_events: int
+    warrior1_name: str
+    warrior2_name: str
+    warrior1_start: int
+    warrior2_start: int
+    index_offset: int = 0   # v2/v3: file offset of the block index, v1: of the trailer, 0 if absent
+
+def parse_header(header_data: bytes) -> VizHeader:
+    """Parse the fixed-size file header, raising ValueError if it is malformed"""
+    if len(header_data) < HEADER_SIZE:
+        raise ValueError("Invalid viz file: header too short")
+
+    magic = header_data[0:8].decode('ascii').rstrip('\x00')
+    if magic != VIZ_MAGIC:
+        raise ValueError(f"Invalid magic number: {magic}")
+
+    # version, core_size, total_cycles, total_events
+    (version, core_size, total_cycles, total_events) = struct.unpack('<IIII', header_data[8:24])
+
+    # Warrior names (bytes 24-87 and 88-151)
+    warrior1_name = header_data[24:88].decode('ascii').rstrip('\x00')
+    warrior2_name = header_data[88:152].decode('ascii').rstrip('\x00')
+
+    # Starting positions (bytes 152-155 and 156-159)
+    (warrior1_start, warrior2_start) = struct.unpack('<II', header_data[152:160])
+    
+    # Block index offset, low and high word (bytes 160-167)
+    (index_low, index_high) = struct.unpack('<II', header_data[160:168])
+
+    return VizHeader(
+        magic=magic,
+        version=version,
+        core_size=core_size,
+        total_cycles=total_cycles,
+        total_events=total_events,
+        warrior1_name=warrior1_name,
+        warrior2_name=warrior2_name,
+        warrior1_start=warrior1_start,
+        warrior2_start=warrior2_start,
+        index_offset=index_low | (index_high << 32)
+    )
+
+def pack_header(header: VizHeader) -> bytes:
+    """Serialize a header in the viz_header_t layout"""
+    return struct.pack('<8sIIII64s64sIIII', header.magic.encode('ascii'), header.version,
+                       header.core_size, header.total_cycles, header.total_events,
+                       header.warrior1_name.encode('ascii')[:63], header.warrior2_name.encode('ascii')[:63],
+                       header.warrior1_start, header.warrior2_start,
+                       header.index_offset & 0xFFFFFFFF, header.index_offset >> 32)
+
+def read_header(f) -> VizHeader:
+    """Read and parse the header from an open binary file"""
+    return parse_header(f.read(HEADER_SIZE))
+
+STREAM_CHUNK_EVENTS = 1 << 16  # Events per chunk when streaming (1 MB)
+
+# Block index entry (viz_index_entry_t)
+VIZ_INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('first_event', '<u8'),
+    ('event_count', '<u4'),
+    ('first_cycle', '<u4'),
+])
+
+# Trailer entries (viz_warrior_entry_t, viz_round_t, viz_round_warrior_t)
+VIZ_WARRIOR_DTYPE = np.dtype([
+    ('name', 'S64'),
+    ('author', 'S64'),
+    ('length', '<u4'),
+    ('offset', '<u4'),
+])
+VIZ_ROUND_DTYPE = np.dtype([
+    ('first_event', '<u8'),
+    ('event_count', '<u8'),
+    ('round', '<u4'),
+    ('survivors', '<u4'),
+    ('end_cycle', '<u4'),
+    ('starter', '<u4'),
+])
+VIZ_ROUND_WARRIOR_DTYPE = np.dtype([
+    ('position', '<u4'),
+    ('tasks', '<u4'),
+])
+
+@dataclass
+class VizBattle:
+    """Warrior table and round index of a closed recording.
+
+    Event indices are absolute, so a round can be read on its own with
+    load_events(f, header, *battle.round_events(n)).
+    """
+    warriors: np.ndarray        # VIZ_WARRIOR_DTYPE, one entry per warrior
+    rounds: np.ndarray          # VIZ_ROUND_DTYPE, one entry per round played
+    positions: np.ndarray       # (rounds, warriors) load positions
+    tasks: np.ndarray           # (rounds, warriors) processes left at the end, 0 if it died
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def warrior_names(self) -> List[str]:
+        return [name.decode('ascii', 'replace') for name in self.warriors['name']]
+
+    def round_events(self, index: int) -> Tuple[int, int]:
+        """Event (frame in v3) range start, stop of the round at index"""
+        first = int(self.rounds['first_event'][index])
+        return first, first + int(self.rounds['event_count'][index])
+
+    def winner(self, index: int) -> Optional[int]:
+        """Warrior that outlived all others in the round at index, None for a draw"""
+        alive = np.flatnonzero(self.tasks[index])
+        return int(alive[0]) if len(alive) == 1 and len(self.warriors) > 1 else None
+
+def read_varint(data, pos: int):
+    """Decode one varint at pos, returning (value, next position)"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode a run of little-endian base-128 varints in one vectorized pass"""
+    if len(data) == 0:
+        return np.empty(0, dtype=np.uint64)
+    last = data < 0x80
+    starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    owner = np.cumsum(last) - last  # Value each byte belongs to
+    shifts = (np.arange(len(data)) - starts[owner]).astype(np.uint64) * np.uint64(7)
+    return np.bitwise_or.reduceat((data & 0x7F).astype(np.uint64) << shifts, starts)
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Inverse of decode_varints for unsigned values below 2**35"""
+    values = np.asarray(values).astype(np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28):
+        lengths += values >= (1 << bits)
+    offsets = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(int(lengths.max(initial=0))):
+        has = lengths > byte
+        low_bits = ((values[has] >> np.uint64(7 * byte)) & np.uint64(0x7F)).astype(np.uint8)
+        out[offsets[has] + byte] = low_bits | np.where(lengths[has] > byte + 1, 0x80, 0).astype(np.uint8)
+    return out.tobytes()
+
+def zigzag_decode(values: np.ndarray) -> np.ndarray:
+    """Zigzag varint values back to wrapped 32-bit differences"""
+    values = values.astype(np.uint32)
+    return (values >> np.uint32(1)) ^ (np.uint32(0) - (values & np.uint32(1)))
+
+def zigzag_encode(deltas: np.ndarray) -> np.ndarray:
+    """Map wrapped 32-bit differences to zigzag form, small magnitudes first"""
+    deltas = deltas.astype(np.uint32)
+    return (deltas << np.uint32(1)) ^ (np.uint32(0) - (deltas >> np.uint32(31)))
+
+def decode_event_block(payload: bytes) -> np.ndarray:
+    """Decode the columns of a decompressed v2 event block (see src/visualizer.h)"""
+    fields = []
+    pos = 0
+    for _ in range(6):
+        value, pos = read_varint(payload, pos)
+        fields.append(value)
+    count, groups, cycles_len, counts_len, addresses_len, data_len = fields
+
+    data = np.frombuffer(payload, dtype=np.uint8)
+    columns = {}
+    for name, length in (('cycles', cycles_len), ('counts', counts_len), ('tags', count),
+                         ('warriors', count), ('addresses', addresses_len), ('data', data_len)):
+        columns[name] = data[pos:pos + length]
+        pos += length
+    if pos > len(data):
+        raise ValueError("Invalid viz block: truncated payload")
+
+    group_cycles = np.cumsum(zigzag_decode(decode_varints(columns['cycles'])), dtype=np.uint32)
+    group_counts = decode_varints(columns['counts']).astype(np.int64)
+    tags = columns['tags']
+
+    events = np.zeros(count, dtype=VIZ_EVENT_DTYPE)
+    events['cycle'] = np.repeat(group_cycles, group_counts)
+    events['event_type'] = tags & TAG_TYPE
+    events['warrior_id'] = columns['warriors']
+    stored_address = (tags & TAG_NO_ADDRESS) == 0
+    addresses = np.cumsum(zigzag_decode(decode_varints(columns['addresses'])), dtype=np.uint32)
+    events['address'][stored_address] = addresses.astype(events['address'].dtype)
+    data_cycle = (tags & TAG_DATA_CYCLE) != 0
+    events['data'][data_cycle] = events['cycle'][data_cycle]
+    events['data'][(tags & TAG_DATA_VARINT) != 0] = decode_varints(columns['data']).astype(np.uint32)
+    return events
+
+def encode_event_block(events: np.ndarray) -> bytes:
+    """Encode events as an uncompressed v2 event block payload"""
+    count = len(events)
+    cycles = events['cycle'].astype(np.uint32)
+    group_starts = np.flatnonzero(np.concatenate(([True], cycles[1:] != cycles[:-1])))[:count]
+    group_cycles = cycles[group_starts]
+    group_counts = np.diff(np.append(group_starts, count))
+
+    addresses = event_addresses(events).astype(np.uint32)
+    stored_address = addresses != 0
+    data = events['data'].astype(np.uint32)
+    data_cycle = (data == cycles) & (data != 0)
+    data_varint = (data != 0) & ~data_cycle
+    tags = ((events['event_type'] & TAG_TYPE) | np.where(stored_address, 0, TAG_NO_ADDRESS)
+            | np.where(data_cycle, TAG_DATA_CYCLE, 0) | np.where(data_varint, TAG_DATA_VARINT, 0)).astype(np.uint8)
+
+    columns = [
+        encode_varints(zigzag_encode(np.diff(group_cycles, prepend=np.uint32(0)))),
+        encode_varints(group_counts),
+        tags.tobytes(),
+        events['warrior_id'].astype(np.uint8).tobytes(),
+        encode_varints(zigzag_encode(np.diff(addresses[stored_address], prepend=np.uint32(0)))),
+        encode_varints(data[data_varint]),
+    ]
+    lengths = [count, len(group_counts), len(columns[0]), len(columns[1]), len(columns[4]), len(columns[5])]
+    return encode_varints(np.array(lengths)) + b''.join(columns)
+
+@dataclass
+class VizFrames:
+    """Aggregated frames of a v3 recording (see src/visualizer.h).
+
+    The cells of frame i are cell_offsets[i]..cell_offsets[i + 1] - 1 of the
+    cell arrays: the cells executed by each warrior, then those written,
+    each in ascending address order.
+    """
+    warriors: int
+    cycles: np.ndarray          # Cycle counter at the start of each frame
+    tasks: np.ndarray           # (frames, warriors) process counts at the end of each frame
+    cell_offsets: np.ndarray    # frames + 1 offsets into the cell arrays
+    cell_addresses: np.ndarray
+    cell_warriors: np.ndarray
+    cell_written: np.ndarray    # True for written cells, False for executed ones
+
+    def __len__(self) -> int:
+        return len(self.cycles)
+
+def empty_frames(warriors: int = 2) -> VizFrames:
+    """A VizFrames holding no frames"""
+    return VizFrames(warriors=warriors, cycles=np.empty(0, dtype=np.uint32),
+                     tasks=np.empty((0, warriors), dtype=np.uint32), cell_offsets=np.zeros(1, dtype=np.int64),
+                     cell_addresses=np.empty(0, dtype=np.uint32), cell_warriors=np.empty(0, dtype=np.uint16),
+                     cell_written=np.empty(0, dtype=bool))
+
+def concat_frames(parts: list) -> VizFrames:
+    """Join consecutive VizFrames into one"""
+    if not parts:
+        return empty_frames()
+    cell_starts = np.cumsum([0] + [len(part.cell_addresses) for part in parts])
+    return VizFrames(
+        warriors=parts[0].warriors,
+        cycles=np.concatenate([part.cycles for part in parts]),
+        tasks=np.concatenate([part.tasks for part in parts]),
+        cell_offsets=np.concatenate([[0]] + [part.cell_offsets[1:] + start for part, start in zip(parts, cell_starts)]),
+        cell_addresses=np.concatenate([part.cell_addresses for part in parts]),
+        cell_warriors=np.concatenate([part.cell_warriors for part in parts]),
+        cell_written=np.concatenate([part.cell_written for part in parts]))
+
+def slice_frames(frames: VizFrames, first: int, last: int) -> VizFrames:
+    """Frames first..last-1 as a VizFrames of their own"""
+    cells = slice(frames.cell_offsets[first], frames.cell_offsets[last])
+    return VizFrames(warriors=frames.warriors, cycles=frames.cycles[first:last], tasks=frames.tasks[first:last],
+                     cell_offsets=frames.cell_offsets[first:last + 1] - frames.cell_offsets[first],
+                     cell_addresses=frames.cell_addresses[cells], cell_warriors=frames.cell_warriors[cells],
+                     cell_written=frames.cell_written[cells])
+
+def decode_frame_block(payload: bytes, core_size: int) -> VizFrames:
+    """Decode the columns of a decompressed v3 frame block (see src/visualizer.h)"""
+    fields = []
+    pos = 0
+    for _ in range(7):
+        value, pos = read_varint(payload, pos)
+        fields.append(value)
+    frames, warriors, cycles_len, tasks_len, sets_len, addresses_len, bitmaps_len = fields
+
+    data = np.frombuffer(payload, dtype=np.uint8)
+    columns = {}
+    for name, length in (('cycles', cycles_len), ('tasks', tasks_len), ('sets', sets_len),
+                         ('addresses', addresses_len), ('bitmaps', bitmaps_len)):
+        columns[name] = data[pos:pos + length]
+        pos += length
+    if pos > len(data):
+        raise ValueError("Invalid viz block: truncated payload")
+
+    sets = decode_varints(columns['sets']).astype(np.int64)
+    if len(sets) != frames * 2 * warriors:
+        raise ValueError("Invalid viz block: frame sets do not match the frame count")
+    lengths = sets >> 1
+    is_bitmap = (sets & SET_BITMAP) != 0
+    set_offsets = np.concatenate(([0], np.cumsum(lengths)))
+    set_of = np.repeat(np.arange(len(sets)), lengths)
+
+    # List sets: running sums of the deltas, restarted at every set
+    addresses = np.empty(int(set_offsets[-1]), dtype=np.uint32)
+    list_lengths = lengths[~is_bitmap]
+    running = np.cumsum(decode_varints(columns['addresses']), dtype=np.uint64)
+    before = np.concatenate(([0], running)).astype(np.uint64)[np.cumsum(list_lengths) - list_lengths]
+    addresses[~is_bitmap[set_of]] = (running - np.repeat(before, list_lengths)).astype(np.uint32)
+
+    core_bytes = (core_size + 7) // 8
+    for number, index in enumerate(np.flatnonzero(is_bitmap)):
+        bits = np.unpackbits(columns['bitmaps'][number * core_bytes:(number + 1) * core_bytes], bitorder='little')
+        addresses[set_offsets[index]:set_offsets[index + 1]] = np.flatnonzero(bits[:core_size])
+
+    # Sets are ordered by frame, then kind (executed, written), then warrior
+    return VizFrames(
+        warriors=warriors,
+        cycles=np.cumsum(zigzag_decode(decode_varints(columns['cycles'])), dtype=np.uint32),
+        tasks=decode_varints(columns['tasks']).astype(np.uint32).reshape(frames, warriors),
+        cell_offsets=set_offsets[::2 * warriors],
+        cell_addresses=addresses,
+        cell_warriors=(set_of % warriors).astype(np.uint16),
+        cell_written=(set_of // warriors) % 2 == 1)
+
+def encode_frame_block(frames: VizFrames, core_size: int) -> bytes:
+    """Encode frames as an uncompressed v3 frame block payload, choosing list
+    or bitmap storage per set like pmars"""
+    count, warriors = len(frames), frames.warriors
+    core_bytes = (core_size + 7) // 8
+    frame_of = np.repeat(np.arange(count), np.diff(frames.cell_offsets))
+    set_of = (frame_of * 2 + frames.cell_written) * warriors + frames.cell_warriors
+    order = np.lexsort((frames.cell_addresses, set_of))
+    set_of = set_of[order]
+    addresses = frames.cell_addresses[order].astype(np.int64)
+
+    lengths = np.bincount(set_of, minlength=count * 2 * warriors)
+    is_bitmap = lengths * 5 >= core_bytes
+    set_starts = np.concatenate(([True], set_of[1:] != set_of[:-1]))
+    deltas = np.where(set_starts, addresses, np.diff(addresses, prepend=0))
+    bitmaps = []
+    for index in np.flatnonzero(is_bitmap):
+        bits = np.zeros(core_bytes * 8, dtype=np.uint8)
+        bits[addresses[set_of == index]] = 1
+        bitmaps.append(np.packbits(bits, bitorder='little').tobytes())
+
+    columns = [
+        encode_varints(zigzag_encode(np.diff(frames.cycles.astype(np.uint32), prepend=np.uint32(0)))),
+        encode_varints(frames.tasks.reshape(-1)),
+        encode_varints((lengths << 1) | is_bitmap),
+        encode_varints(deltas[~is_bitmap[set_of]]),
+        b''.join(bitmaps),
+    ]
+    return encode_varints(np.array([count, warriors] + [len(column) for column in columns])) + b''.join(columns)
+
+def frames_from_events(events: np.ndarray, warriors: int, frame_cycles: int = 1) -> VizFrames:
+    """Aggregate an event recording into frames as pmars -Y 3 -K frame_cycles
+    records them.
+
+    Needs the CYCLE, EXEC, WRITE, SPL and DAT events of an unfiltered
+    recording: frames follow the cycle counter, process counts are rebuilt
+    from SPL (data = tasks after the split) and DAT (data = tasks before the
+    death) events, and a new round starts with SPL events of one task.
+    """
+    types = events['event_type']
+    counters = events['cycle'].astype(np.int64)
+    cycle_index = np.flatnonzero(types == VizEventType.CYCLE)
+    if len(cycle_index) == 0:
+        return empty_frames(warriors)
+    cycle_values = counters[cycle_index]
+    span = frame_cycles * warriors
+
+    # Frames start at the first cycle of a round or once the counter has
+    # dropped by span since the frame started
+    new_round = np.concatenate(([True], cycle_values[1:] >= cycle_values[:-1]))
+    round_starts = np.append(np.flatnonzero(new_round), len(cycle_values))
+    starts = []
+    for first, end in zip(round_starts[:-1], round_starts[1:]):
+        position = first
+        while position < end:
+            starts.append(position)
+            later = -cycle_values[position:end]
+            position += max(1, int(np.searchsorted(later, span - cycle_values[position])))
+    starts = np.array(starts)
+    frame_first = cycle_index[starts]
+
+    # A frame ends where the next one starts, or for the last frame of a
+    # round at the first round-start SPL before the next round's first cycle
+    frame_end = np.append(frame_first[1:], len(events))
+    is_split = types == VizEventType.SPL
+    resets = np.flatnonzero(is_split & (events['data'] == 1))
+    round_last = np.flatnonzero(np.append(new_round[starts][1:], True))
+    previous_cycle = np.append(cycle_index, len(events))[np.searchsorted(cycle_index, frame_end[round_last]) - 1]
+    after = np.searchsorted(resets, previous_cycle, side='right')
+    has_reset = after < len(resets)
+    reset_at = np.where(has_reset, resets[np.minimum(after, len(resets) - 1)], len(events))
+    frame_end[round_last] = np.minimum(frame_end[round_last], reset_at)
+
+    # Process counts: the last SPL/DAT of each warrior before the frame end
+    is_death = types == VizEventType.DAT
+    changes = np.flatnonzero(is_split | is_death)
+    values = events['data'][changes].astype(np.int64) - is_death[changes]
+    tasks = np.zeros((len(starts), warriors), dtype=np.uint32)
+    for warrior_id in range(warriors):
+        mine = events['warrior_id'][changes] == warrior_id
+        last = np.searchsorted(changes[mine], frame_end) - 1
+        tasks[:, warrior_id] = np.where(last >= 0, values[mine][np.maximum(last, 0)], 0)
+
+    # Cells: the last warrior to execute (or write) each address in the frame
+    frame_of = np.searchsorted(frame_first, np.arange(len(events)), side='right') - 1
+    touched = ((types == VizEventType.EXEC) | (types == VizEventType.WRITE)) & (frame_of >= 0)
+    touched &= np.arange(len(events)) < frame_end[np.maximum(frame_of, 0)]
+    written = (types[touched] == VizEventType.WRITE)
+    addresses = event_addresses(events)[touched].astype(np.int64)
+    key = (frame_of[touched] * 2 + written) * (int(addresses.max(initial=0)) + 1) + addresses
+    order = np.argsort(key, kind='stable')
+    last = np.append(key[order][1:] != key[order][:-1], True)
+    cells = order[last]
+    set_of = (frame_of[touched][cells] * 2 + written[cells]) * warriors + events['warrior_id'][touched][cells]
+    cells = cells[np.lexsort((addresses[cells], set_of))]
+    cell_frames = frame_of[touched][cells]
+
+    return VizFrames(
+        warriors=warriors,
+        cycles=cycle_values[starts].astype(np.uint32),
+        tasks=tasks,
+        cell_offsets=np.searchsorted(cell_frames, np.arange(len(starts) + 1)),
+        cell_addresses=addresses[cells].astype(np.uint32),
+        cell_warriors=events['warrior_id'][touched][cells].astype(np.uint16),
+        cell_written=written[cells])
+
+def decompress_block(codec: int, payload: bytes) -> bytes:
+    """Undo the codec a block was stored with"""
+    if codec == CODEC_STORED:
+        return payload
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(payload)
+    if codec == CODEC_LZMA:
+        return lzma.decompress(payload)
+    raise ValueError(f"Invalid viz block: unknown codec {codec}")
+
+def compress_block(codec: int, payload: bytes):
+    """Apply codec to a payload, returning (codec used, stored bytes)"""
+    if codec == CODEC_ZLIB:
+        stored = zlib.compress(payload)
+    elif codec == CODEC_LZMA:
+        stored = lzma.compress(payload)
+    else:
+        return CODEC_STORED, payload
+    # Like pmars, keep payloads that do not shrink uncompressed
+    if len(stored) >= len(payload):
+        return CODEC_STORED, payload
+    return codec, stored
+
+def read_block(f, offset: int):
+    """Read the block at offset, returning (kind, event_count, decompressed payload)"""
+    f.seek(offset)
+    block_header = f.read(BLOCK_HEADER.size)
+    if len(block_header) < BLOCK_HEADER.size:
+        raise ValueError("Invalid viz file: truncated block header")
+    kind, codec, _, stored_size, raw_size, event_count = BLOCK_HEADER.unpack(block_header)
+    payload = f.read(stored_size)
+    if len(payload) < stored_size:
+        raise ValueError("Invalid viz file: truncated block")
+    return kind, event_count, decompress_block(codec, payload)
+
+def walk_blocks(f):
+    """Yield (offset, kind, stored_size, event_count) for each complete block
+    of a v2/v3 file, following the block headers from the end of the header"""
+    f.seek(0, 2)
+    file_size = f.tell()
+    offset = HEADER_SIZE
+    while offset + BLOCK_HEADER.size <= file_size:
+        f.seek(offset)
+        kind, _, _, stored_size, _, event_count = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        if offset + BLOCK_HEADER.size + stored_size > file_size:
+            return
+        yield offset, kind, stored_size, event_count
+        offset += BLOCK_HEADER.size + stored_size
+
+def iter_stream_blocks(f):
+    """Yield (kind, event_count, decompressed payload) for each block of a
+    live stream (pipe, FIFO or socket) positioned after the header.
+
+    Reads block by block without seeking and ends when the stream does.
+    """
+    while True:
+        block_header = f.read(BLOCK_HEADER.size)
+        if len(block_header) < BLOCK_HEADER.size:
+            return
+        kind, codec, _, stored_size, _, event_count = BLOCK_HEADER.unpack(block_header)
+        payload = f.read(stored_size)
+        if len(payload) < stored_size:
+            return
+        yield kind, event_count, decompress_block(codec, payload)
+
+def read_block_index(f, header: VizHeader) -> np.ndarray:
+    """Locate the event (or frame) blocks of a v2 or v3 file.
+
+    Uses the index written when the recording was closed. A recording that
+    was cut short, or captured from a live stream, has none, so its complete
+    blocks are found by walking the block headers instead (first_cycle is 0
+    for those entries).
+    """
+    if header.index_offset:
+        kind, _, payload = read_block(f, header.index_offset)
+        if kind != BLOCK_INDEX:
+            raise ValueError("Invalid viz file: index offset does not point at a block index")
+        return np.frombuffer(payload, dtype=VIZ_INDEX_DTYPE)
+
+    entries = []
+    first_event = 0
+    for offset, kind, _, event_count in walk_blocks(f):
+        if kind in (BLOCK_EVENTS, BLOCK_FRAMES):
+            entries.append((offset, first_event, event_count, 0))
+            first_event += event_count
+    return np.array(entries, dtype=VIZ_INDEX_DTYPE)
+
+def blocks_in_range(index: np.ndarray, start: int, stop: Optional[int]) -> np.ndarray:
+    """Entries of a block index holding any of events start..stop-1"""
+    ends = index['first_event'].astype(np.int64) + index['event_count']
+    last = len(index) if stop is None else np.searchsorted(index['first_event'], stop, side='left')
+    return index[np.searchsorted(ends, start, side='right'):last]
+
+def trailer_offset(f, header: VizHeader) -> int:
+    """File offset of the trailer blocks (warrior table, round index), 0 if absent.
+
+    They follow the block index in v2/v3; in v1 the header points at them.
+    A live stream saved to a file has a header that was never completed, so
+    its block index is looked for by walking the blocks.
+    """
+    if not is_block_format(header):
+        return header.index_offset
+    if not header.index_offset:
+        for offset, kind, stored_size, _ in walk_blocks(f):
+            if kind == BLOCK_INDEX:
+                return offset + BLOCK_HEADER.size + stored_size
+        return 0
+    f.seek(header.index_offset)
+    _, _, _, stored_size, _, _ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+    return header.index_offset + BLOCK_HEADER.size + stored_size
+
+def read_battle(f, header: VizHeader) -> Optional[VizBattle]:
+    """Read the warrior table and round index, None for recordings without them"""
+    offset = trailer_offset(f, header)
+    if not offset:
+        return None
+    f.seek(0, 2)
+    file_size = f.tell()
+    trailer = {}
+    while offset + BLOCK_HEADER.size <= file_size:
+        kind, count, payload = read_block(f, offset)
+        trailer[kind] = (count, payload)
+        offset = f.tell()
+    return battle_from_trailer(trailer)
+
+def battle_from_trailer(trailer: dict) -> Optional[VizBattle]:
+    """Build the battle from trailer blocks given as {kind: (event_count, payload)},
+    None unless both the warrior table and the round index are present"""
+    if BLOCK_WARRIORS not in trailer or BLOCK_ROUNDS not in trailer:
+        return None
+
+    warriors = np.frombuffer(trailer[BLOCK_WARRIORS][1], dtype=VIZ_WARRIOR_DTYPE)
+    count, payload = trailer[BLOCK_ROUNDS]
+    rounds = np.frombuffer(payload, dtype=VIZ_ROUND_DTYPE, count=count)
+    per_warrior = np.frombuffer(payload, dtype=VIZ_ROUND_WARRIOR_DTYPE, offset=rounds.nbytes,
+                                count=count * len(warriors)).reshape(count, len(warriors))
+    return VizBattle(warriors=warriors, rounds=rounds, positions=per_warrior['position'], tasks=per_warrior['tasks'])
+
+def is_block_format(header: VizHeader) -> bool:
+    """True if events are stored in compressed blocks rather than a flat array"""
+    return header.version >= VERSION_BLOCKS
+
+def is_frame_format(header: VizHeader) -> bool:
+    """True if the recording holds aggregated frames rather than events"""
+    return header.version == VERSION_FRAMES
+
+def check_event_format(header: VizHeader):
+    """Raise ValueError for recordings that have no events to read"""
+    if is_frame_format(header):
+        raise ValueError("v3 recordings hold aggregated frames, not events")
+
+def flat_event_count(f, header: VizHeader) -> int:
+    """Number of complete events in an open v1 file, which end at the trailer"""
+    end = header.index_offset
+    if not end:
+        f.seek(0, 2)
+        end = f.tell()
+    return max(0, end - HEADER_SIZE) // EVENT_SIZE
+
+def count_events(path: str) -> int:
+    """Number of complete events (frames in v3) in a file"""
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        if is_block_format(header):
+            return int(read_block_index(f, header)['event_count'].sum())
+        return flat_event_count(f, header)
+
+def load_events(f, header: VizHeader, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+    """Read events start..stop-1 (by default all) of an open file into a structured array.
+
+    Only the blocks holding that range are decoded, so a single round of a
+    long recording is read without touching the others.
+    """
+    check_event_format(header)
+    if is_block_format(header):
+        blocks = []
+        for entry in blocks_in_range(read_block_index(f, header), start, stop):
+            first = int(entry['first_event'])
+            block = decode_event_block(read_block(f, int(entry['offset']))[2])
+            blocks.append(block[max(0, start - first):None if stop is None else stop - first])
+        return np.concatenate(blocks) if blocks else np.empty(0, dtype=VIZ_EVENT_DTYPE)
+
+    count = flat_event_count(f, header)
+    stop = count if stop is None else min(stop, count)
+    f.seek(HEADER_SIZE + start * EVENT_SIZE)
+    return events_from_flat(np.fromfile(f, dtype=VIZ_FLAT_EVENT_DTYPE, count=max(0, stop - start)))
+
+def iter_event_chunks(path: str, chunk_events: int = STREAM_CHUNK_EVENTS, start: int = 0,
+                      stop: Optional[int] = None):
+    """Yield the event region as consecutive structured arrays of bounded size.
+
+    Only one chunk is alive at a time, so memory use does not depend on the
+    size of the recording. Iteration covers absolute event indices
+    start..stop-1 (by default to the end). v2 recordings are decoded one block
+    at a time, beginning with the block that contains start.
+    """
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        check_event_format(header)
+        if is_block_format(header):
+            for entry in blocks_in_range(read_block_index(f, header), start, stop):
+                first = int(entry['first_event'])
+                block = decode_event_block(read_block(f, int(entry['offset']))[2])
+                block = block[max(0, start - first):None if stop is None else stop - first]
+                for pos in range(0, len(block), chunk_events):
+                    yield block[pos:pos + chunk_events]
+            return
+
+        count = flat_event_count(f, header)
+        remaining = (count if stop is None else min(stop, count)) - start
+        f.seek(HEADER_SIZE + start * EVENT_SIZE)
+        while remaining > 0:
+            chunk = events_from_flat(np.fromfile(f, dtype=VIZ_FLAT_EVENT_DTYPE, count=min(chunk_events, remaining)))
+            if len(chunk) == 0:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def map_events(path: str) -> np.ndarray:
+    """Memory-map the event region of a file without copying it.
+
+    Pages are only read in when the corresponding events are touched, and
+    every process mapping the same recording shares the OS page cache.
+    Only v1 recordings can be mapped, since v2 blocks are compressed. The
+    records keep the v1 layout, so take addresses through event_addresses().
+    """
+    with open(path, 'rb') as f:
+        if is_block_format(read_header(f)):
+            raise ValueError("v2 recordings are compressed and cannot be memory-mapped")
+    count = count_events(path)
+    if count == 0:
+        return np.empty(0, dtype=VIZ_FLAT_EVENT_DTYPE)
+    return np.memmap(path, dtype=VIZ_FLAT_EVENT_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+def load_frames(f, header: VizHeader, start: int = 0, stop: Optional[int] = None) -> VizFrames:
+    """Read frames start..stop-1 (by default all) of an open v3 file"""
+    entries = blocks_in_range(read_block_index(f, header), start, stop)
+    frames = concat_frames([decode_frame_block(read_block(f, int(entry['offset']))[2], header.core_size)
+                            for entry in entries])
+    if len(entries) == 0:
+        return frames
+    first = int(entries[0]['first_event'])
+    return slice_frames(frames, max(0, start - first), len(frames) if stop is None else min(stop - first, len(frames)))
+
+def write_blocks(f, kind: int, blocks, codec: int) -> int:
+    """Write (payload, count, first cycle) blocks and their index, returning the index offset"""
+    index = []
+    first = 0
+    for payload, count, first_cycle in blocks:
+        used, stored = compress_block(codec, payload)
+        index.append((f.tell(), first, count, first_cycle))
+        f.write(BLOCK_HEADER.pack(kind, used, 0, len(stored), len(payload), count))
+        f.write(stored)
+        first += count
+    index_offset = f.tell()
+    payload = np.array(index, dtype=VIZ_INDEX_DTYPE).tobytes()
+    f.write(BLOCK_HEADER.pack(BLOCK_INDEX, CODEC_STORED, 0, len(payload), len(payload), 0))
+    f.write(payload)
+    return index_offset
+
+def write_trailer(f, battle: VizBattle, codec: int):
+    """Write the warrior table and round index at the current position"""
+    per_warrior = np.empty(battle.positions.shape, dtype=VIZ_ROUND_WARRIOR_DTYPE)
+    per_warrior['position'] = battle.positions
+    per_warrior['tasks'] = battle.tasks
+    warriors = np.ascontiguousarray(battle.warriors, dtype=VIZ_WARRIOR_DTYPE)
+    rounds = np.ascontiguousarray(battle.rounds, dtype=VIZ_ROUND_DTYPE)
+    for kind, count, payload in ((BLOCK_WARRIORS, len(warriors), warriors.tobytes()),
+                                 (BLOCK_ROUNDS, len(rounds), rounds.tobytes() + per_warrior.tobytes())):
+        used, stored = compress_block(codec, payload)
+        f.write(BLOCK_HEADER.pack(kind, used, 0, len(stored), len(payload), count))
+        f.write(stored)
+
+def write_header(f, header: VizHeader, version: int, count: int, index_offset: int):
+    """Rewrite the header of a file written by write_viz or write_frames"""
+    f.seek(0)
+    f.write(pack_header(VizHeader(
+        magic=VIZ_MAGIC, version=version, core_size=header.core_size,
+        total_cycles=header.total_cycles, total_events=count,
+        warrior1_name=header.warrior1_name, warrior2_name=header.warrior2_name,
+        warrior1_start=header.warrior1_start, warrior2_start=header.warrior2_start,
+        index_offset=index_offset)))
+
+def write_viz(path: str, header: VizHeader, events: np.ndarray, version: int = VERSION_BLOCKS,
+              codec: int = CODEC_ZLIB, block_events: int = BLOCK_MAX_EVENTS, battle: Optional[VizBattle] = None):
+    """Write events to a new recording in either format version, laid out as pmars -T does.
+
+    With battle the warrior table and round index are written as the trailer.
+    """
+    def blocks():
+        for first in range(0, len(events), block_events):
+            block = events[first:first + block_events]
+            yield encode_event_block(block), len(block), int(block['cycle'][0])
+
+    with open(path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))
+        index_offset = 0
+        if version >= VERSION_BLOCKS:
+            index_offset = write_blocks(f, BLOCK_EVENTS, blocks(), codec)
+        else:
+            flat_from_events(events).tofile(f)
+            if battle is not None:
+                index_offset = f.tell()
+        if battle is not None:
+            write_trailer(f, battle, codec)
+        write_header(f, header, version, len(events), index_offset)
+
+def write_frames(path: str, header: VizHeader, frames: VizFrames, codec: int = CODEC_ZLIB,
+                 battle: Optional[VizBattle] = None):
+    """Write frames to a new v3 recording, laid out as pmars -Y 3 does"""
+    block_frames = max(1, BLOCK_MAX_FRAMES * 2 // frames.warriors)
+
+    def blocks():
+        for first in range(0, len(frames), block_frames):
+            block = slice_frames(frames, first, min(first + block_frames, len(frames)))
+            yield encode_frame_block(block, header.core_size), len(block), int(block.cycles[0])
+
+    with open(path, 'wb') as f:
+        f.write(bytes(HEADER_SIZE))
+        index_offset = write_blocks(f, BLOCK_FRAMES, blocks(), codec)
+        if battle is not None:
+            write_trailer(f, battle, codec)
+        write_header(f, header, VERSION_FRAMES, len(frames), index_offset)
+
+def last_per_address(addresses: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique addresses with the value of their last occurrence ("last write wins")"""
+    cells, first_from_end = np.unique(addresses[::-1], return_index=True)
+    return cells, values[::-1][first_from_end]
+
+def validate_events(events: np.ndarray) -> np.ndarray:
+    """Boolean mask of events whose type is a known VizEventType"""
+    return events['event_type'] <= max(VizEventType)
+
+SUMMARY_SUFFIX = '.idx'       # Sidecar file next to the recording
+SUMMARY_VERSION = 1
+SUMMARY_CYCLE_STEP = 4096     # Events between entries of the cycle table
+SUMMARY_TYPE_SLOTS = 16       # Event type values counted; larger ones are counted in the last slot
+SUMMARY_WARRIOR_SLOTS = 256   # Every warrior_id value
+
+@dataclass
+class VizSummary:
+    """Whole-file statistics of an event recording, cached in a sidecar file.
+
+    Built in one streaming pass and saved as <recording>.idx, so opening the
+    recording again needs no scan. The sidecar stores the size and
+    modification time of the recording it describes and is rebuilt when
+    either changes.
+    """
+    total_events: int
+    cycle_range: Tuple[int, int]    # Lowest and highest cycle of any event, (0, 0) if empty
+    type_counts: np.ndarray         # Events per event_type value
+    warrior_events: np.ndarray      # Events per warrior_id value
+    warrior_events_in_core: np.ndarray  # The same, for events with an address inside the core
+    exec_counts: np.ndarray         # EXEC events per warrior_id value
+    last_exec_cycles: np.ndarray    # Highest cycle of each warrior's EXEC events, -1 if none
+    die_events: np.ndarray          # Event index of every DIE event
+    die_warriors: np.ndarray        # The warrior of each
+    cycle_table: np.ndarray         # Cycle of events 0, SUMMARY_CYCLE_STEP, 2 * SUMMARY_CYCLE_STEP, ...
+
+    def cycle_at(self, index: int) -> int:
+        """Cycle at absolute event index, to within SUMMARY_CYCLE_STEP events"""
+        if not len(self.cycle_table):
+            return 0
+        return int(self.cycle_table[min(max(0, index) // SUMMARY_CYCLE_STEP, len(self.cycle_table) - 1)])
+
+    def event_at_cycle(self, cycle: int, start: int = 0, stop: Optional[int] = None) -> int:
+        """Event index at most SUMMARY_CYCLE_STEP events before the first event
+        of cycle, or of a later cycle, among the events start..stop-1 of one round.
+
+        The cycle counter counts down within a round, so this is the last
+        sampled event whose cycle is still above cycle, or start. Replaying
+        from it finds the exact event.
+        """
+        stop = self.total_events if stop is None else stop
+        first = -(-start // SUMMARY_CYCLE_STEP)
+        samples = self.cycle_table[first:-(-stop // SUMMARY_CYCLE_STEP)].astype(np.int64)
+        above = int(np.searchsorted(-samples, -cycle, side='left'))
+        return (first + above - 1) * SUMMARY_CYCLE_STEP if above else start
+
+    def deaths(self, start: int = 0, stop: Optional[int] = None) -> set:
+        """Warriors with a DIE event among events start..stop-1"""
+        dying = self.die_events >= start
+        if stop is not None:
+            dying &= self.die_events < stop
+        return set(self.die_warriors[dying].tolist())
+
+def summary_path(path: str) -> str:
+    return path + SUMMARY_SUFFIX
+
+def build_summary(path: str) -> VizSummary:
+    """Scan an event recording once, a chunk at a time"""
+    with open(path, 'rb') as f:
+        core_size = read_header(f).core_size
+    type_counts = np.zeros(SUMMARY_TYPE_SLOTS, dtype=np.int64)
+    warrior_events = np.zeros(SUMMARY_WARRIOR_SLOTS, dtype=np.int64)
+    warrior_events_in_core = np.zeros(SUMMARY_WARRIOR_SLOTS, dtype=np.int64)
+    exec_counts = np.zeros(SUMMARY_WARRIOR_SLOTS, dtype=np.int64)
+    last_exec_cycles = np.full(SUMMARY_WARRIOR_SLOTS, -1, dtype=np.int64)
+    die_events, die_warriors, cycle_table = [], [], []
+    cycle_low, cycle_high = None, 0
+    total = 0
+
+    for chunk in iter_event_chunks(path):
+        if not len(chunk):
+            continue
+        types = chunk['event_type']
+        warriors = chunk['warrior_id']
+        cycles = chunk['cycle']
+        type_counts += np.bincount(np.minimum(types, SUMMARY_TYPE_SLOTS - 1), minlength=SUMMARY_TYPE_SLOTS)
+        warrior_events += np.bincount(warriors, minlength=SUMMARY_WARRIOR_SLOTS)
+        in_core = chunk['address'] < core_size
+        warrior_events_in_core += np.bincount(warriors[in_core], minlength=SUMMARY_WARRIOR_SLOTS)
+
+        is_exec = types == VizEventType.EXEC
+        exec_counts += np.bincount(warriors[is_exec], minlength=SUMMARY_WARRIOR_SLOTS)
+        np.maximum.at(last_exec_cycles, warriors[is_exec], cycles[is_exec].astype(np.int64))
+
+        is_die = np.flatnonzero(types == VizEventType.DIE)
+        die_events.append(is_die + total)
+        die_warriors.append(warriors[is_die])
+        cycle_table.append(cycles[-total % SUMMARY_CYCLE_STEP::SUMMARY_CYCLE_STEP])
+
+        low, high = int(cycles.min()), int(cycles.max())
+        cycle_low = low if cycle_low is None else min(cycle_low, low)
+        cycle_high = max(cycle_high, high)
+        total += len(chunk)
+
+    def joined(parts, dtype):
+        return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+    return VizSummary(total_events=total, cycle_range=(cycle_low or 0, cycle_high),
+                      type_counts=type_counts, warrior_events=warrior_events,
+                      warrior_events_in_core=warrior_events_in_core, exec_counts=exec_counts,
+                      last_exec_cycles=last_exec_cycles, die_events=joined(die_events, np.int64),
+                      die_warriors=joined(die_warriors, np.uint8), cycle_table=joined(cycle_table, np.uint32))
+
+def read_summary(path: str) -> Optional[VizSummary]:
+    """The sidecar summary of a recording, None if missing, unreadable or stale"""
+    source = os.stat(path)
+    try:
+        with np.load(summary_path(path), allow_pickle=False) as data:
+            if (int(data['version']) != SUMMARY_VERSION or int(data['source_size']) != source.st_size or
+                    int(data['source_mtime_ns']) != source.st_mtime_ns):
+                return None
+            cycle_range = data['cycle_range']
+            return VizSummary(total_events=int(data['total_events']),
+                              cycle_range=(int(cycle_range[0]), int(cycle_range[1])),
+                              **{name: data[name] for name in ('type_counts', 'warrior_events',
+                                                               'warrior_events_in_core', 'exec_counts',
+                                                               'last_exec_cycles', 'die_events',
+                                                               'die_warriors', 'cycle_table')})
+    except (OSError, ValueError, KeyError):
+        return None
+
+def write_summary(path: str, summary: VizSummary):
+    """Save the sidecar summary of a recording, replacing any previous one atomically"""
+    source = os.stat(path)
+    temp = f"{summary_path(path)}.{os.getpid()}.tmp"  # Parallel renderers may race to write it
+    try:
+        with open(temp, 'wb') as f:
+            np.savez(f, version=SUMMARY_VERSION, source_size=source.st_size, source_mtime_ns=source.st_mtime_ns,
+                     total_events=summary.total_events, cycle_range=np.array(summary.cycle_range),
+                     type_counts=summary.type_counts, warrior_events=summary.warrior_events,
+                     warrior_events_in_core=summary.warrior_events_in_core, exec_counts=summary.exec_counts,
+                     last_exec_cycles=summary.last_exec_cycles, die_events=summary.die_events,
+                     die_warriors=summary.die_warriors, cycle_table=summary.cycle_table)
+        os.replace(temp, summary_path(path))
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+def load_summary(path: str) -> Optional[VizSummary]:
+    """Summary of an event recording: from its sidecar when that is current,
+    otherwise built and saved for next time. None for frame recordings.
+
+    A recording in a read-only directory is summarized without caching.
+    """
+    summary = read_summary(path)
+    if summary is not None:
+        return summary
+    with open(path, 'rb') as f:
+        if is_frame_format(read_header(f)):
+            return None
+    summary = build_summary(path)
+    try:
+        write_summary(path, summary)
+    except OSError:
+        pass
+    return summary